@@ -0,0 +1 @@
+"""Benchmarks for the Hiking Time Predictor pipeline."""
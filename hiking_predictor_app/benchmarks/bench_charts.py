@@ -0,0 +1,83 @@
+"""
+Size and build time of the result charts with and without decimation.
+
+"full" plots every segment the way the computed vars used to; "decimated"
+plots the series from chart_series. Sizes are the Plotly JSON sent to the
+browser for both figures. Larger inputs repeat the sample points --scale times.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_charts --scale 1 15
+"""
+
+import argparse
+import time
+
+import plotly.graph_objects as go
+
+from hiking_predictor_app.chart_decimation import DECIMATION_METHODS, chart_series
+from hiking_predictor_app.gpx_reader import read_gpx
+from hiking_predictor_app.model_utils import load_model, predict_hike_time
+from benchmarks.bench_gpx_reader import scaled
+from benchmarks.samples import MODEL_PATH, sample_gpx_files
+
+
+def figures(time_h, distance_km, speed_x, speed, elevation_x, elevation):
+    """The two result figures, without layout."""
+    progress = go.Figure(go.Scatter(x=time_h, y=distance_km, mode='lines'))
+    profile = go.Figure([go.Scatter(x=speed_x, y=speed, mode='lines'),
+                         go.Scatter(x=elevation_x, y=elevation, mode='lines', yaxis='y2')])
+    return progress, profile
+
+
+def full_figures(segments):
+    distances = [seg['cumulative_distance_km'] for seg in segments]
+    return figures([seg['cumulative_time_hours'] for seg in segments], distances,
+                   distances, [seg['predicted_speed_kmh'] for seg in segments],
+                   distances, [seg['elevation_m'] for seg in segments])
+
+
+def decimated_figures(series):
+    return figures(series['time_hours'], series['distance_km'],
+                   series['speed_distance_km'], series['speed_kmh'],
+                   series['elevation_distance_km'], series['elevation_m'])
+
+
+def json_kb(figs) -> float:
+    return sum(len(fig.to_json()) for fig in figs) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 15])
+    parser.add_argument('--points', type=int, default=2000, help='Target points per trace')
+    parser.add_argument('--method', choices=DECIMATION_METHODS, default='lttb')
+    args = parser.parse_args()
+
+    model, feature_cols = load_model(str(MODEL_PATH))
+
+    print(f"{'route':<36} {'segments':>8} {'full':>10} {'decimated':>10} {'decimate':>9} "
+          f"{'full build':>10} {'dec. build':>10}")
+    for path in sample_gpx_files():
+        data = path.read_bytes()
+        for scale in args.scale:
+            segments = predict_hike_time(read_gpx(scaled(data, scale)), model, feature_cols)['segments']
+
+            start = time.perf_counter()
+            full = full_figures(segments)
+            full_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            series = chart_series(segments, args.points, args.method)
+            decimate_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            decimated = decimated_figures(series)
+            build_s = time.perf_counter() - start
+
+            label = f"{path.parent.name}/{path.name} x{scale}"
+            print(f"{label[-36:]:<36} {len(segments):>8} {json_kb(full):>8.0f}KB {json_kb(decimated):>8.0f}KB "
+                  f"{decimate_s * 1e3:>7.1f}ms {full_s * 1e3:>8.1f}ms {build_s * 1e3:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
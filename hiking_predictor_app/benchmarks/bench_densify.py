@@ -0,0 +1,85 @@
+"""
+Route densification: geodesy.densify against the notebook's interpolate_route_path.
+
+Fixed-count output (20 points per segment) must match the notebook bit for
+bit. The spacing columns show densify with --spacing and what it does to the
+prediction of the route: predicted hours and pipeline time on the bare
+waypoints vs the densified route. Longer routes repeat the waypoints of each
+sample --scale times; the notebook loop only runs up to --reference-max
+waypoints.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_densify --scale 1 10 100
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from hiking_predictor_app.geodesy import densify
+from hiking_predictor_app.gpx_reader import read_gpx
+from hiking_predictor_app.model_utils import load_model, predict_hike_time
+from benchmarks.bench_gpx_reader import scaled
+from benchmarks.reference import interpolate_route_path_reference
+from benchmarks.samples import MODEL_PATH, sample_gpx_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--points-per-segment', type=int, default=20)
+    parser.add_argument('--spacing', type=float, default=10.0, help='Spacing in meters')
+    parser.add_argument('--reference-max', type=int, default=2000)
+    args = parser.parse_args()
+
+    model, feature_cols = load_model(str(MODEL_PATH))
+
+    print(f"{'route':<34} {'waypoints':>9} {'notebook':>9} {'fixed':>8} {'identical':>9} | "
+          f"{'spacing':>8} {'points':>8} | {'hours':>6} {'densified':>9} {'predict':>8} {'densified':>9}")
+    for path in sample_gpx_files(kinds=('routes',)):
+        data = path.read_bytes()
+        for scale in args.scale:
+            points = read_gpx(scaled(data, scale))
+            n = len(points)
+
+            start = time.perf_counter()
+            fixed = densify(points.latitude, points.longitude, points.elevation,
+                            points_per_segment=args.points_per_segment)
+            fixed_s = time.perf_counter() - start
+
+            notebook, identical = '-', '-'
+            if n <= args.reference_max:
+                route_df = pd.DataFrame({'latitude': points.latitude, 'longitude': points.longitude,
+                                         'elevation': points.elevation, 'time': None,
+                                         'route_name': points.name})
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    expected = interpolate_route_path_reference(route_df, args.points_per_segment)
+                notebook = f"{time.perf_counter() - start:.3f}s"
+                identical = str(all(np.array_equal(expected[col].to_numpy(dtype=float), values)
+                                    for col, values in zip(('latitude', 'longitude', 'elevation'), fixed)))
+
+            start = time.perf_counter()
+            dense = densify(points.latitude, points.longitude, points.elevation, spacing_m=args.spacing)
+            spacing_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            bare = predict_hike_time(points, model, feature_cols, route_spacing_m=0)
+            bare_s = time.perf_counter() - start
+            start = time.perf_counter()
+            densified = predict_hike_time(points, model, feature_cols, route_spacing_m=args.spacing)
+            densified_s = time.perf_counter() - start
+
+            label = f"{path.name} x{scale}"
+            print(f"{label[-34:]:<34} {n:>9} {notebook:>9} {fixed_s * 1e3:>6.1f}ms {identical:>9} | "
+                  f"{spacing_s * 1e3:>6.1f}ms {len(dense[0]):>8} | "
+                  f"{bare['total_time_hours']:>6.2f} {densified['total_time_hours']:>9.2f} "
+                  f"{bare_s:>7.3f}s {densified_s:>8.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Cost of pipeline diagnostics and backend metrics relative to a prediction.
+
+"predict" is predict_hike_time without diagnostics (best of --repeat runs).
+Run to run noise of a prediction is several percent, far above the cost
+being measured, so the parts are timed on their own: "timers" is the stage
+timers and model-call counters (which run whether diagnostics are requested
+or not, timed on empty stages), "block" assembling the diagnostics block (a
+memoized predict with and without it) and "record" Metrics.record_route on
+the result. "overhead" is (timers + block + record) / predict.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_diagnostics --scale 1 10
+"""
+
+import argparse
+import time
+
+from hiking_predictor_app.gpx_reader import read_gpx
+from hiking_predictor_app.metrics import Metrics
+from hiking_predictor_app.model_utils import RoutePipeline, count_model_call, load_model, predict_hike_time
+from benchmarks.bench_gpx_reader import scaled
+from benchmarks.samples import MODEL_PATH, sample_gpx_files
+
+
+def per_call(func, n: int = 100_000) -> float:
+    """Seconds per call of func, averaged over n calls."""
+    start = time.perf_counter()
+    for i in range(n):
+        func(i)
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--inference', default='exact')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    model, feature_cols = load_model(str(MODEL_PATH))
+    metrics = Metrics()
+
+    # Bookkeeping of one computed stage (two clock reads, three dict updates) and one model call
+    pipeline = RoutePipeline(read_gpx(sample_gpx_files()[0].read_bytes()))
+    stage_s = per_call(lambda i: pipeline._stage('bench', (i,), lambda: None))
+    call_s = per_call(count_model_call)
+    print(f"per computed stage {stage_s * 1e9:.0f} ns, per model call {call_s * 1e9:.0f} ns")
+
+    print(f"{'route':<34} {'points':>8} {'calls':>6} {'predict':>8} {'timers':>8} {'block':>8} {'record':>8} "
+          f"{'overhead':>8}")
+    for path in sample_gpx_files():
+        data = path.read_bytes()
+        for scale in args.scale:
+            points = read_gpx(scaled(data, scale))
+            predict_s = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                predict_hike_time(points, model, feature_cols, inference=args.inference)
+                predict_s.append(time.perf_counter() - start)
+
+            pipeline = RoutePipeline(points)
+            results = pipeline.predict(model, feature_cols, inference=args.inference, diagnostics=True)
+            block_s = (per_call(lambda i: pipeline.predict(model, feature_cols, inference=args.inference,
+                                                           diagnostics=True), 2000)
+                       - per_call(lambda i: pipeline.predict(model, feature_cols, inference=args.inference), 2000))
+            record_s = per_call(lambda i: metrics.record_route(results, 'worker', 0.1), 2000)
+
+            diagnostics = results['diagnostics']
+            timers_s = len(diagnostics['stage_seconds']) * stage_s + diagnostics['model_calls'] * call_s
+            predict = min(predict_s)
+            overhead = (timers_s + max(block_s, 0) + record_s) / predict
+            label = f"{path.name} x{scale}"
+            print(f"{label[-34:]:<34} {len(points):>8} {diagnostics['model_calls']:>6} {predict:>7.3f}s "
+                  f"{timers_s * 1e6:>6.1f}us {block_s * 1e6:>6.1f}us {record_s * 1e6:>6.1f}us {overhead:>8.3%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Check the evaluation module against the notebook's validation and error analysis and time both.
+
+The bundled tracks go through the training_data pipeline, then the
+notebook's validate_on_tracks, the per-track/date loop of plot_track_analysis
+(without plots) and its terrain × fatigue tables are compared with
+evaluation.validate_on_tracks, predict_segments, error_table and
+error_pivots. Day selection, order and counts must match exactly, floats to
+1e-9 relative (group sums add in a different order). --scale repeats the
+tracks as separate hikes a year apart; the notebook masks the whole frame
+once per track and day, so its time grows with the square of the archive.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_evaluation --scale 1 4 16
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from hiking_predictor_app.evaluation import error_pivots, error_table, predict_segments, validate_on_tracks
+from hiking_predictor_app.model_utils import load_model
+from hiking_predictor_app.training_data import (calculate_hiking_metrics, filter_long_breaks, prepare_features,
+                                                smooth_track_elevations)
+from benchmarks.bench_training_data import load_tracks
+from benchmarks.reference import error_analysis_reference, track_curves_reference, validate_on_tracks_reference
+from benchmarks.samples import MODEL_PATH
+
+CURVE_COLUMNS = ['cumulative_distance_km', 'predicted_time_s', 'cumulative_actual_time_h',
+                 'cumulative_predicted_time_h']
+
+
+def same(expected: pd.DataFrame, actual: pd.DataFrame) -> bool:
+    try:
+        pd.testing.assert_frame_equal(expected, actual, check_dtype=False, check_names=False,
+                                      check_categorical=False, rtol=1e-9, atol=1e-9)
+    except AssertionError:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 4, 16])
+    args = parser.parse_args()
+
+    model, feature_cols = load_model(str(MODEL_PATH))
+
+    print(f"{'scale':>5} {'segments':>8} {'days':>5} {'notebook':>9} {'module':>9} {'speedup':>8} "
+          f"{'days':>5} {'curves':>6} {'tables':>6}")
+    for scale in args.scale:
+        points = smooth_track_elevations(filter_long_breaks(load_tracks(scale)))
+        segments = prepare_features(calculate_hiking_metrics(points), feature_cols)
+
+        start = time.perf_counter()
+        days_ref = validate_on_tracks_reference(segments, model, feature_cols)
+        curves_ref = track_curves_reference(segments, model, feature_cols)
+        _, tables_ref = error_analysis_reference(segments.copy(), model, feature_cols)
+        ref_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        analyzed = predict_segments(segments, model, feature_cols)
+        days = validate_on_tracks(analyzed)
+        tables = {'terrain': error_table(analyzed, 'terrain_type'),
+                  'fatigue': error_table(analyzed, 'fatigue_level'), **error_pivots(analyzed)}
+        new_s = time.perf_counter() - start
+
+        days_match = same(days_ref, days)
+        curves_match = all(same(curve[CURVE_COLUMNS], analyzed.loc[curve.index, CURVE_COLUMNS])
+                           for curve in curves_ref.values())
+        # Unobserved terrain × fatigue cells: NaN counts in the notebook, 0 here
+        tables_ref['count'] = tables_ref['count'].fillna(0)
+        tables_match = all(same(tables_ref[name], tables[name]) for name in tables_ref)
+        print(f"{scale:>5} {len(segments):>8} {len(days):>5} {ref_s:>8.3f}s {new_s:>8.4f}s "
+              f"{ref_s / new_s:>7.0f}x {str(days_match):>5} {str(curves_match):>6} {str(tables_match):>6}")
+        if not days_match:
+            print(days_ref.compare(days) if len(days_ref) == len(days) else np.setdiff1d(
+                days_ref['track_name'], days['track_name']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Memory and throughput of the streaming GPX reader against gpxpy.parse.
+
+The gpxpy path is the one the upload handler used to take: decode the bytes,
+build the gpxpy object tree and copy every point into a list of dicts.
+Larger inputs are made by repeating the points of each sample --scale times.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_gpx_reader --scale 1 20
+"""
+
+import argparse
+from pathlib import Path
+import re
+import time
+import tracemalloc
+
+import gpxpy
+import numpy as np
+
+from hiking_predictor_app.gpx_reader import read_gpx
+from benchmarks.samples import sample_gpx_files
+
+POINT_RE = re.compile(rb'<(trkpt|rtept)\b.*?</\1>', re.S)
+
+
+def scaled(data: bytes, scale: int) -> bytes:
+    """Repeat the point elements of a GPX file scale times."""
+    if scale == 1:
+        return data
+    points = [m.group(0) for m in POINT_RE.finditer(data)]
+    last = data.rindex(points[-1]) + len(points[-1])
+    return data[:last] + b''.join(points) * (scale - 1) + data[last:]
+
+
+def gpxpy_points(data: bytes):
+    gpx = gpxpy.parse(data.decode('utf-8'))
+    points = []
+    for track in gpx.tracks:
+        for segment in track.segments:
+            for point in segment.points:
+                points.append({
+                    'latitude': point.latitude,
+                    'longitude': point.longitude,
+                    'elevation': point.elevation if point.elevation else 0,
+                })
+    if len(points) == 0:
+        for route in gpx.routes:
+            for point in route.points:
+                points.append({
+                    'latitude': point.latitude,
+                    'longitude': point.longitude,
+                    'elevation': point.elevation if point.elevation else 0,
+                })
+    return points
+
+
+def measure(func, data):
+    """Return (result, seconds, peak traced bytes); timing runs without tracemalloc."""
+    start = time.perf_counter()
+    result = func(data)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 20])
+    parser.add_argument('files', nargs='*', type=Path, help='GPX files (defaults to the bundled samples)')
+    args = parser.parse_args()
+
+    print(f"{'file':<34} {'scale':>5} {'points':>8} {'MB':>6} {'parser':<8} {'time':>8} "
+          f"{'pts/s':>10} {'peak MB':>8} {'peak/file':>9}")
+    for path in args.files or sample_gpx_files():
+        raw = path.read_bytes()
+        for scale in args.scale:
+            data = scaled(raw, scale)
+            size_mb = len(data) / 1e6
+
+            reference, ref_s, ref_peak = measure(gpxpy_points, data)
+            points, new_s, new_peak = measure(read_gpx, data)
+
+            assert len(points) == len(reference)
+            assert np.array_equal(points.latitude, [p['latitude'] for p in reference])
+            assert np.array_equal(np.nan_to_num(points.elevation), [p['elevation'] for p in reference])
+
+            label = f"{path.parent.name}/{path.name}"[-34:]
+            for name, seconds, peak in (('gpxpy', ref_s, ref_peak), ('stream', new_s, new_peak)):
+                print(f"{label:<34} {scale:>5} {len(points):>8} {size_mb:>6.1f} {name:<8} {seconds:>7.3f}s "
+                      f"{len(points) / seconds:>10.0f} {peak / 1e6:>8.1f} {peak / len(data):>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Training-data ingestion: the notebook's gpxpy loop vs GPXStore.
+
+The archive is --files distinct copies of the bundled tracks in a temporary
+directory. "gpxpy" parses every file into a DataFrame the way the notebook's
+load_all_tracks did; "cold" fills an empty store with a process pool; "warm"
+memory-maps everything from the store; "one new" adds a single file to the
+archive, which is the only one parsed.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_gpx_store --files 50 200
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import gpxpy
+import pandas as pd
+
+from hiking_predictor_app.gpx_store import GPXStore
+from hiking_predictor_app.training_data import points_frame
+from benchmarks.samples import sample_gpx_files
+
+
+def make_archive(directory: Path, n_files: int, first: int = 0):
+    """Write distinct GPX files first..n_files-1 (copies of the samples with a unique comment)."""
+    samples = [path.read_bytes() for path in sample_gpx_files(kinds=('tracks',))]
+    for k in range(first, n_files):
+        data = samples[k % len(samples)] + f"<!-- copy {k} -->\n".encode()
+        (directory / f"track_{k:05d}.gpx").write_bytes(data)
+
+
+def gpxpy_frame(paths) -> pd.DataFrame:
+    frames = []
+    for path in paths:
+        with open(path) as f:
+            gpx = gpxpy.parse(f)
+        frame = pd.DataFrame([{'latitude': p.latitude, 'longitude': p.longitude,
+                               'elevation': p.elevation, 'time': p.time,
+                               'track_name': track.name or path.stem}
+                              for track in gpx.tracks for segment in track.segments
+                              for p in segment.points])
+        frame['file_name'] = path.name
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True).sort_values('time').reset_index(drop=True)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, nargs='+', default=[50, 200])
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"{'files':>6} {'points':>9} {'gpxpy':>9} {'cold':>9} {'warm':>9} {'one new':>9} {'parsed':>7}")
+    for n_files in args.files:
+        with tempfile.TemporaryDirectory() as archive, tempfile.TemporaryDirectory() as store_dir:
+            archive = Path(archive)
+            make_archive(archive, n_files)
+            paths = sorted(archive.glob('*.gpx'))
+
+            expected, gpxpy_s = timed(lambda: gpxpy_frame(paths))
+
+            def ingest():
+                store = GPXStore(store_dir, max_workers=args.workers)
+                frame = points_frame(store.ingest(sorted(archive.glob('*.gpx'))))
+                return frame.sort_values('time').reset_index(drop=True), store
+
+            (frame, _), cold_s = timed(ingest)
+            _, warm_s = timed(ingest)
+            make_archive(archive, n_files + 1, first=n_files)
+            (_, store), new_s = timed(ingest)
+
+            assert frame[['latitude', 'longitude', 'elevation']].equals(
+                expected[['latitude', 'longitude', 'elevation']])
+            print(f"{n_files:>6} {len(frame):>9} {gpxpy_s:>8.2f}s {cold_s:>8.2f}s {warm_s:>8.3f}s "
+                  f"{new_s:>8.3f}s {store.parsed:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Compare the fatigue resolution modes of predict_hike_time on the sample GPX files.
+
+Reports wall time per mode and how far each total time is from the original
+sequential (one DataFrame per segment) result.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_inference
+"""
+
+import argparse
+from pathlib import Path
+import time
+
+import gpxpy
+
+from hiking_predictor_app.model_utils import INFERENCE_MODES, load_model, predict_hike_time
+from benchmarks.samples import MODEL_PATH, sample_gpx_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=str(MODEL_PATH))
+    parser.add_argument('files', nargs='*', type=Path, help='GPX files (defaults to the bundled samples)')
+    args = parser.parse_args()
+
+    model, feature_cols = load_model(args.model)
+    files = args.files or sample_gpx_files()
+
+    print(f"{'file':<40} {'mode':<11} {'segments':>8} {'time':>9} {'total (h)':>10} {'diff vs seq (s)':>16}")
+    for path in files:
+        with open(path) as f:
+            gpx = gpxpy.parse(f)
+
+        results = {}
+        for mode in ('sequential',) + tuple(m for m in INFERENCE_MODES if m != 'sequential'):
+            start = time.perf_counter()
+            results[mode] = predict_hike_time(gpx, model, feature_cols, inference=mode)
+            elapsed = time.perf_counter() - start
+
+            total = results[mode]['total_time_hours']
+            diff_s = (total - results['sequential']['total_time_hours']) * 3600
+            print(f"{str(path)[-40:]:<40} {mode:<11} {len(results[mode]['segments']):>8} "
+                  f"{elapsed:>8.3f}s {total:>10.4f} {diff_s:>16.3g}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Cold-start cost of the pickled model against the .npz artifact.
+
+Each run starts a fresh interpreter that imports the app's model utilities,
+loads the model and predicts the first sample route, so imports pulled in by
+unpickling (sklearn) count towards the pickle's load time.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_model_load --runs 5
+"""
+
+import argparse
+from pathlib import Path
+import json
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from hiking_predictor_app.model_artifact import export_model
+from hiking_predictor_app.model_utils import load_model
+from benchmarks.samples import APP_DIR, MODEL_PATH, sample_gpx_files
+
+# Runs in a fresh interpreter; prints the timings as JSON
+COLD_START = """
+import json, sys, time
+start = time.perf_counter()
+from hiking_predictor_app.gpx_reader import read_gpx
+from hiking_predictor_app.model_utils import load_model, predict_hike_time
+imported = time.perf_counter()
+model, feature_cols = load_model(sys.argv[1])
+loaded = time.perf_counter()
+result = predict_hike_time(read_gpx(sys.argv[2]), model, feature_cols)
+predicted = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'load': loaded - imported,
+    'first_prediction': predicted - loaded,
+    'total_time_hours': float(result['total_time_hours']),
+}))
+"""
+
+
+def cold_start(model_path: Path, gpx_path: Path) -> dict:
+    output = subprocess.run([sys.executable, '-c', COLD_START, str(model_path), str(gpx_path)],
+                            cwd=APP_DIR, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', type=Path, default=MODEL_PATH)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per format')
+    parser.add_argument('gpx', nargs='?', type=Path, default=None,
+                        help='Route for the first prediction (defaults to the first sample)')
+    args = parser.parse_args()
+
+    gpx_path = args.gpx or sample_gpx_files()[0]
+    model, feature_cols = load_model(str(args.model))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = export_model(model, feature_cols, Path(tmp) / 'model.npz')
+        formats = {'pickle': args.model, 'npz': artifact}
+
+        print(f"{'format':<8} {'size':>9} {'import':>9} {'load':>9} {'1st pred':>9} {'total (h)':>10}")
+        for name, path in formats.items():
+            runs = [cold_start(path, gpx_path) for _ in range(args.runs)]
+            median = {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+            print(f"{name:<8} {path.stat().st_size / 1024:>7.0f}KB {median['import']:>8.3f}s "
+                  f"{median['load']:>8.3f}s {median['first_prediction']:>8.3f}s "
+                  f"{median['total_time_hours']:>10.6f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Track resampling: prediction time and total time vs full resolution.
+
+Each recorded track is predicted at full resolution and with its smoothed
+profile resampled every --spacing meters (track_spacing_m). "speedup" is the
+prediction time at full resolution over the resampled one (best of --repeat
+runs); "change" is how much the predicted total time moves. Synthetic tracks
+(benchmarks.samples.synthetic_gpx, a point every 3 to 6 m) of --synthetic
+points are added to the bundled samples.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_resample --spacing 10 15 25 50
+"""
+
+import argparse
+import time
+
+from hiking_predictor_app.gpx_reader import read_gpx
+from hiking_predictor_app.model_utils import load_model, predict_hike_time
+from benchmarks.samples import MODEL_PATH, sample_gpx_files, synthetic_gpx
+
+
+def best_of(repeat: int, func):
+    """Return (last result, best seconds) over repeat calls."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--spacing', type=float, nargs='+', default=[10.0, 15.0, 25.0, 50.0])
+    parser.add_argument('--synthetic', type=int, nargs='+', default=[20000, 200000])
+    parser.add_argument('--inference', default='exact')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    model, feature_cols = load_model(str(MODEL_PATH))
+    inputs = [(path.name, read_gpx(path.read_bytes())) for path in sample_gpx_files(kinds=('tracks',))]
+    inputs += [(f"synthetic-{n}", read_gpx(synthetic_gpx(n))) for n in args.synthetic]
+
+    print(f"{'track':<28} {'spacing':>7} {'segments':>8} {'predict':>8} {'speedup':>7} {'hours':>7} "
+          f"{'change':>8} {'change':>7}")
+    for name, points in inputs:
+        full, full_s = best_of(args.repeat, lambda: predict_hike_time(points, model, feature_cols,
+                                                                       inference=args.inference))
+        print(f"{name[-28:]:<28} {'full':>7} {len(full['segments']):>8} {full_s:>7.3f}s {'':>7} "
+              f"{full['total_time_hours']:>7.3f}")
+        for spacing in args.spacing:
+            resampled, resampled_s = best_of(args.repeat, lambda: predict_hike_time(
+                points, model, feature_cols, inference=args.inference, track_spacing_m=spacing))
+            change_h = resampled['total_time_hours'] - full['total_time_hours']
+            print(f"{'':<28} {spacing:>6.0f}m {len(resampled['segments']):>8} {resampled_s:>7.3f}s "
+                  f"{full_s / resampled_s:>6.1f}x {resampled['total_time_hours']:>7.3f} "
+                  f"{change_h * 60:>+6.1f}min {change_h / full['total_time_hours']:>+7.2%}")
+
+
+if __name__ == '__main__':
+    main()
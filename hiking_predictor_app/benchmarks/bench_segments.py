@@ -0,0 +1,84 @@
+"""
+Per-session memory of a prediction: per-segment dicts vs the columnar SegmentTable.
+
+"dicts" is the former session state: prediction_results with one dict of
+numpy floats per segment, sent to the browser as is. "columnar" is the
+current state: results with a SegmentTable kept on the server, plus the
+summary and decimated chart series sent to the browser. Memory is measured
+with tracemalloc while the structure is built; "pickled" is what a state
+manager, the prediction cache and worker IPC store or copy; "to browser" is
+the JSON of the frontend state.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_segments --scale 1 15
+"""
+
+import argparse
+import json
+import pickle
+import tracemalloc
+
+import numpy as np
+
+from hiking_predictor_app.chart_decimation import chart_series
+from hiking_predictor_app.gpx_reader import read_gpx
+from hiking_predictor_app.model_utils import SEGMENT_COLUMNS, load_model, predict_hike_time
+from benchmarks.bench_gpx_reader import scaled
+from benchmarks.samples import MODEL_PATH, sample_gpx_files
+
+
+def traced(build):
+    """Return (result, bytes still allocated by build)."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def dict_segments(table):
+    """The former list of per-segment dicts, holding numpy float scalars."""
+    columns = [table.column(name) for name in SEGMENT_COLUMNS]
+    return [dict(zip(SEGMENT_COLUMNS, (column[k] for column in columns))) for k in range(len(table))]
+
+
+def kb(n: int) -> str:
+    return f"{n / 1024:>8.0f}KB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 15])
+    args = parser.parse_args()
+
+    model, feature_cols = load_model(str(MODEL_PATH))
+
+    print(f"{'route':<36} {'segments':>8} | {'dicts: memory':>13} {'pickled':>10} {'to browser':>10} | "
+          f"{'columnar: memory':>16} {'pickled':>10} {'to browser':>10}")
+    for path in sample_gpx_files():
+        data = path.read_bytes()
+        for scale in args.scale:
+            results = predict_hike_time(read_gpx(scaled(data, scale)), model, feature_cols)
+            table = results['segments']
+            summary = {k: v for k, v in results.items() if k != 'segments'}
+
+            legacy, legacy_mem = traced(lambda: {**summary, 'segments': dict_segments(table)})
+            legacy_json = len(json.dumps(legacy, default=float))
+
+            _, table_mem = traced(lambda: type(table)(*(table.column(name).copy()
+                                                        for name in table.__slots__)))
+            charts, charts_mem = traced(lambda: chart_series(table))
+            columnar_json = len(json.dumps({'prediction_results': summary, 'charts': charts}, default=float))
+
+            label = f"{path.parent.name}/{path.name} x{scale}"
+            print(f"{label[-36:]:<36} {len(table):>8} | {kb(legacy_mem):>13} "
+                  f"{kb(len(pickle.dumps(legacy, protocol=pickle.HIGHEST_PROTOCOL)))} {kb(legacy_json)} | "
+                  f"{kb(table_mem + charts_mem):>16} "
+                  f"{kb(len(pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)))} {kb(columnar_json)}")
+            assert all(np.array_equal([seg[name] for seg in legacy['segments']], table.column(name))
+                       for name in SEGMENT_COLUMNS)
+
+
+if __name__ == '__main__':
+    main()
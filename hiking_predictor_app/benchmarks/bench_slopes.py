@@ -0,0 +1,61 @@
+"""
+Check calculate_slopes against per-index calculate_slope_window and time both.
+
+Results must match bit for bit. Inputs are the sample GPX files plus
+synthetic profiles with duplicate points (zero-length spans).
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_slopes
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from hiking_predictor_app.geodesy import cumulative_distances
+from hiking_predictor_app.gpx_reader import read_gpx
+from hiking_predictor_app.model_utils import calculate_slope_window, calculate_slopes, smooth_elevation
+from benchmarks.bench_smoothing import synthetic_profile
+from benchmarks.samples import sample_gpx_files
+
+
+def profiles(sizes):
+    for path in sample_gpx_files():
+        points = read_gpx(path)
+        distances = cumulative_distances(points.latitude, points.longitude)
+        elevations = np.nan_to_num(points.elevation)
+        yield f"{path.parent.name}/{path.name}", elevations, distances
+    for n in sizes:
+        elevations, distances = synthetic_profile(n)
+        # Repeat some points to create zero-length spans
+        repeat = np.random.default_rng(n).random(n) < 0.05
+        yield f"synthetic {n}", np.repeat(elevations, 1 + repeat), np.repeat(distances, 1 + repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--window', type=float, default=100.0)
+    args = parser.parse_args()
+
+    print(f"{'profile':<40} {'points':>8} {'per-index':>10} {'array':>9} {'speedup':>8} {'identical':>9}")
+    for label, elevations, distances in profiles(args.sizes):
+        smoothed = smooth_elevation(elevations, distances, window_m=args.window)
+
+        start = time.perf_counter()
+        expected = np.array([calculate_slope_window(smoothed, distances, i, window_m=args.window)
+                             for i in range(len(distances))], dtype=float)
+        loop_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        slopes = calculate_slopes(smoothed, distances, window_m=args.window)
+        array_s = time.perf_counter() - start
+
+        identical = np.array_equal(slopes, expected)
+        print(f"{label[-40:]:<40} {len(distances):>8} {loop_s:>9.3f}s {array_s:>8.4f}s "
+              f"{loop_s / array_s:>7.0f}x {str(identical):>9}")
+
+
+if __name__ == '__main__':
+    main()
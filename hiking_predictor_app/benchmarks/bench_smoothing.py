@@ -0,0 +1,60 @@
+"""
+Benchmark the vectorized smooth_elevation against the original O(n^2) loop.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_smoothing
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from hiking_predictor_app.model_utils import smooth_elevation
+from benchmarks.reference import smooth_elevation_reference
+
+TOLERANCE_M = 1e-9
+
+
+def synthetic_profile(n_points: int, seed: int = 0):
+    """Build a GPS-like profile: 1-10 m spacing, rolling terrain plus noise."""
+    rng = np.random.default_rng(seed)
+    distances = np.concatenate([[0.0], np.cumsum(rng.uniform(1.0, 10.0, n_points - 1))])
+    elevations = (300 + 150 * np.sin(distances / 2000.0)
+                  + np.cumsum(rng.normal(0, 0.5, n_points))
+                  + rng.normal(0, 5, n_points))
+    return elevations, distances
+
+
+def run(sizes, sample_rows: int, window_m: float):
+    print(f"{'points':>8} {'vectorized':>12} {'reference':>12} {'speedup':>9} {'max |diff| (m)':>15}")
+    for n in sizes:
+        elevations, distances = synthetic_profile(n)
+
+        start = time.perf_counter()
+        smoothed = smooth_elevation(elevations, distances, window_m=window_m)
+        fast_s = time.perf_counter() - start
+
+        # The reference costs O(n) per row, so time a row sample and extrapolate
+        rows = np.linspace(0, n - 1, min(sample_rows, n)).astype(int)
+        start = time.perf_counter()
+        expected = smooth_elevation_reference(elevations, distances, window_m=window_m, rows=rows)
+        ref_s = (time.perf_counter() - start) * n / len(rows)
+
+        max_diff = np.max(np.abs(smoothed[rows] - expected))
+        status = "ok" if max_diff <= TOLERANCE_M else "MISMATCH"
+        print(f"{n:>8} {fast_s:>11.3f}s {ref_s:>11.1f}s {ref_s / fast_s:>8.0f}x {max_diff:>12.2e} {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--sample-rows', type=int, default=200,
+                        help='Rows timed with the reference loop (extrapolated to n)')
+    parser.add_argument('--window', type=float, default=100.0)
+    args = parser.parse_args()
+    run(args.sizes, args.sample_rows, args.window)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Added latency of the time uncertainty bands and accuracy of their stacked evaluation.
+
+Speed quantile models (--quantiles) are trained on the bundled tracks with
+the default 'gbr' parameters and saved with the app model as a pickle and an
+.npz artifact. Each input is predicted with predict_hike_time without and
+with time_bands (best of --repeat), with the model and bands of both files:
+the pickle's bands run one sklearn predict per quantile on the route's
+feature matrix, the artifact's one stacked NumPy pass for all quantiles. The
+stacked pass must match the quantile models' own predict to 1e-9.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_time_bands --points 20000 100000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from hiking_predictor_app.gpx_reader import read_gpx
+from hiking_predictor_app.model_artifact import export_model
+from hiking_predictor_app.model_utils import build_feature_matrix, load_model, predict_hike_time
+from hiking_predictor_app.time_bands import DEFAULT_QUANTILES, load_time_bands
+from hiking_predictor_app.training import save_model, train_quantile_models
+from hiking_predictor_app.training_data import (calculate_hiking_metrics, filter_long_breaks, prepare_features,
+                                                smooth_track_elevations)
+from benchmarks.bench_training_data import load_tracks
+from benchmarks.samples import MODEL_PATH, sample_gpx_files, synthetic_gpx
+
+TOLERANCE = 1e-9
+
+
+def best_seconds(predict, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quantiles', type=float, nargs='+', default=list(DEFAULT_QUANTILES))
+    parser.add_argument('--points', type=int, nargs='*', default=[20000],
+                        help='Synthetic track sizes, after the bundled samples')
+    parser.add_argument('--repeat', type=int, default=9)
+    args = parser.parse_args()
+
+    model, feature_cols = load_model(str(MODEL_PATH))
+    segments = prepare_features(calculate_hiking_metrics(smooth_track_elevations(filter_long_breaks(
+        load_tracks(1)))), feature_cols)
+    quantile_models, report = train_quantile_models(segments, 'gbr', args.quantiles, feature_cols)
+    print(f"{len(quantile_models)} speed quantile models trained in {report['band_fit_seconds']:.1f}s, "
+          f"{report['band_coverage_pct']:.1f}% of test segments within the outer quantiles\n")
+
+    inputs = [(path.name, path.read_bytes()) for path in sample_gpx_files()]
+    inputs += [(f"synthetic {n}", synthetic_gpx(n)) for n in args.points]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = save_model(model, feature_cols, Path(tmp) / "model.pkl", quantile_models=quantile_models)
+        npz_path = export_model(model, feature_cols, Path(tmp) / "model.npz", quantile_models=quantile_models)
+        sources = [(path.suffix[1:], *load_model(str(path)), load_time_bands(path))
+                   for path in (pickle_path, npz_path)]
+
+        print(f"{'input':<28} {'segments':>8} {'model':<5} {'no bands':>9} {'bands':>9} {'added':>7} "
+              f"{'time range (h)':>15} {'same':>5}")
+        for name, data in inputs:
+            gpx = read_gpx(data)
+            for kind, source_model, source_cols, bands in sources:
+                plain = predict_hike_time(gpx, source_model, source_cols)
+                banded = predict_hike_time(gpx, source_model, source_cols, time_bands=bands)
+                plain_s = best_seconds(lambda: predict_hike_time(gpx, source_model, source_cols), args.repeat)
+                banded_s = best_seconds(lambda: predict_hike_time(gpx, source_model, source_cols,
+                                                                  time_bands=bands), args.repeat)
+
+                segment_table = banded['segments']
+                fatigue = np.concatenate(([0.0], segment_table.cumulative_time_hours[:-1]))
+                X = build_feature_matrix(segment_table.slope_percent, fatigue, feature_cols)
+                expected = np.stack([quantile_models[q].predict(X) for q in sorted(quantile_models)])
+                same = (plain['total_time_hours'] == banded['total_time_hours']
+                        and np.allclose(bands.predict(X), expected, rtol=TOLERANCE, atol=TOLERANCE))
+                totals = banded['time_bands']['cumulative_time_hours'][:, -1]
+                print(f"{name:<28} {len(segment_table):>8} {kind:<5} {plain_s * 1e3:>7.1f}ms "
+                      f"{banded_s * 1e3:>7.1f}ms {(banded_s / plain_s - 1) * 100:>6.1f}% "
+                      f"{totals[0]:>7.2f}-{totals[-1]:<7.2f} {str(same):>5}")
+
+
+if __name__ == '__main__':
+    main()
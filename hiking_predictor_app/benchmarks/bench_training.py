@@ -0,0 +1,55 @@
+"""
+Training time, prediction latency and accuracy of the model kinds as the archive grows.
+
+The bundled tracks go through the training_data pipeline and are repeated
+--scale times as separate hikes a year apart (identical copies, so held-out
+hikes have twins in the training set: test MAPE only shows that the kinds
+fit alike, not how they generalise). Each kind of training.MODEL_KINDS is
+trained with its default parameters by training.train_model: "fit" is the
+training wall time, "us/row" the prediction time per row of a 10k-row batch
+and "1 row" one single-row call. With --search, a --search-iter candidate
+search is also timed with one process and with --jobs processes.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_training --scale 4 16 64 --search
+"""
+
+import argparse
+import time
+
+from hiking_predictor_app.training import MODEL_KINDS, search_params, split_hikes, train_model
+from hiking_predictor_app.training_data import (calculate_hiking_metrics, filter_long_breaks, prepare_features,
+                                                smooth_track_elevations)
+from benchmarks.bench_training_data import load_tracks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[4, 16])
+    parser.add_argument('--kind', choices=list(MODEL_KINDS), nargs='+', default=list(MODEL_KINDS))
+    parser.add_argument('--search', action='store_true', help='Also time a parallel hyperparameter search')
+    parser.add_argument('--search-iter', type=int, default=6)
+    parser.add_argument('--jobs', type=int, default=-1)
+    args = parser.parse_args()
+
+    print(f"{'scale':>5} {'rows':>8} {'kind':<5} {'fit':>8} {'us/row':>7} {'1 row':>8} {'test MAPE':>9} "
+          f"{'search 1':>9} {'search N':>9}")
+    for scale in args.scale:
+        points = smooth_track_elevations(filter_long_breaks(load_tracks(scale)))
+        segments = prepare_features(calculate_hiking_metrics(points))
+        for kind in args.kind:
+            _, report = train_model(segments, kind)
+            searches = ''
+            if args.search:
+                train, _ = split_hikes(segments)
+                for jobs in (1, args.jobs):
+                    start = time.perf_counter()
+                    search_params(train, kind, n_iter=args.search_iter, n_jobs=jobs)
+                    searches += f" {time.perf_counter() - start:>8.1f}s"
+            print(f"{scale:>5} {len(segments):>8} {kind:<5} {report['fit_seconds']:>7.2f}s "
+                  f"{report['us_per_row']:>7.2f} {report['single_row_ms']:>6.2f}ms "
+                  f"{report['test_mape_pct']:>8.2f}%{searches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Check the training_data module against the notebook's track-ingest functions and time both.
+
+Each stage (long-break filter, elevation smoothing, hiking metrics, features)
+gets the same input on both sides. Row selection, text and time columns must
+match exactly; the features bit for bit. Float columns may differ only by the
+distance kernel, geopy's geodesic in the notebook vs the app's vectorized
+Vincenty (nanometres). The run exits nonzero after the table if any stage
+does not match. The notebook versions are O(n^2) or loop over rows with
+.iloc, so --scale above 1 takes a while.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_training_data
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from datetime import timedelta
+
+import gpxpy
+import numpy as np
+import pandas as pd
+
+from hiking_predictor_app.training_data import (FEATURE_COLUMNS, calculate_hiking_metrics,
+                                                filter_long_breaks, prepare_features,
+                                                smooth_track_elevations)
+from benchmarks.reference import (calculate_hiking_metrics_reference, filter_long_breaks_reference,
+                                  prepare_features_reference, smooth_track_elevations_reference)
+from benchmarks.samples import sample_gpx_files
+
+
+def load_tracks(scale: int = 1) -> pd.DataFrame:
+    """The bundled tracks as the notebook's load_all_tracks frame, repeated scale times."""
+    frames = []
+    for path in sample_gpx_files(kinds=('tracks',)):
+        with open(path) as f:
+            gpx = gpxpy.parse(f)
+        points = [{'latitude': p.latitude, 'longitude': p.longitude, 'elevation': p.elevation,
+                   'time': p.time, 'track_name': track.name or path.stem}
+                  for track in gpx.tracks for segment in track.segments for p in segment.points]
+        frame = pd.DataFrame(points)
+        frame['file_name'] = path.name
+        frames.append(frame)
+    tracks = pd.concat(frames, ignore_index=True)
+
+    # Copies are separate hikes a year apart
+    copies = [tracks] + [tracks.assign(track_name=tracks['track_name'] + f" #{k}",
+                                       time=tracks['time'] + timedelta(days=365 * k))
+                         for k in range(1, scale)]
+    return pd.concat(copies, ignore_index=True).sort_values('time').reset_index(drop=True)
+
+
+def timed(func, *args, **kwargs):
+    """Return (result, seconds), discarding what func prints."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def compare(expected: pd.DataFrame, actual: pd.DataFrame, columns) -> tuple:
+    """Return (matches, largest float difference) over columns."""
+    if len(expected) != len(actual) or list(expected.index) != list(actual.index):
+        return False, np.nan
+    largest = 0.0
+    for col in columns:
+        a, b = expected[col], actual[col]
+        if a.dtype.kind == 'f':
+            if not np.allclose(a, b, rtol=1e-9, atol=1e-7, equal_nan=True):
+                return False, np.nan
+            largest = max(largest, float(np.nanmax(np.abs(a - b))) if len(a) else 0.0)
+        elif not a.equals(b):
+            return False, np.nan
+    return True, largest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1])
+    parser.add_argument('--window', type=float, default=100.0)
+    args = parser.parse_args()
+
+    print(f"{'stage':<18} {'points':>8} {'rows':>7} {'notebook':>9} {'module':>9} {'speedup':>8} "
+          f"{'matches':>7} {'max diff':>9}")
+    mismatches = []
+    for scale in args.scale:
+        points = load_tracks(scale)
+
+        filtered_ref, ref_s = timed(filter_long_breaks_reference, points)
+        filtered, new_s = timed(filter_long_breaks, points)
+        stages = [('filter_long_breaks', ref_s, new_s, *compare(filtered_ref, filtered, points.columns),
+                   len(filtered))]
+
+        smoothed_ref, ref_s = timed(smooth_track_elevations_reference, filtered, args.window)
+        smoothed, new_s = timed(smooth_track_elevations, filtered, args.window)
+        stages.append(('smooth elevation', ref_s, new_s,
+                       *compare(smoothed_ref, smoothed, ['elevation_smoothed']), len(smoothed)))
+
+        metrics_ref, ref_s = timed(calculate_hiking_metrics_reference, smoothed, args.window)
+        metrics, new_s = timed(calculate_hiking_metrics, smoothed, args.window)
+        stages.append(('hiking metrics', ref_s, new_s,
+                       *compare(metrics_ref, metrics, metrics_ref.columns), len(metrics)))
+
+        features_ref, ref_s = timed(prepare_features_reference, metrics)
+        features, new_s = timed(prepare_features, metrics)
+        identical = features_ref[FEATURE_COLUMNS].equals(features[FEATURE_COLUMNS])
+        stages.append(('features', ref_s, new_s, identical, 0.0 if identical else np.nan, len(features)))
+
+        for name, ref_s, new_s, matches, diff, rows in stages:
+            print(f"{name:<18} {len(points):>8} {rows:>7} {ref_s:>8.3f}s {new_s:>8.4f}s "
+                  f"{ref_s / new_s:>7.0f}x {str(matches):>7} {diff:>9.1e}")
+            if not matches:
+                mismatches.append(f"{name} at scale {scale}")
+
+    if mismatches:
+        raise SystemExit(f"module differs from the notebook: {', '.join(mismatches)}")
+
+
+if __name__ == '__main__':
+    main()
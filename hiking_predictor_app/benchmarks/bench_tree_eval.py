@@ -0,0 +1,68 @@
+"""
+Throughput of the NumPy tree-ensemble evaluator against sklearn's predict.
+
+Feature matrices are built from random slopes and fatigue levels in the
+range seen on real hikes. The evaluator must match model.predict to 1e-9.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.bench_tree_eval --rows 1 16 64 256 4096 65536
+"""
+
+import argparse
+from pathlib import Path
+import time
+import warnings
+
+import numpy as np
+
+from hiking_predictor_app.model_utils import (
+    build_feature_matrix, evaluate_tree_ensemble, load_model, native_ensemble,
+)
+from benchmarks.samples import MODEL_PATH
+
+TOLERANCE = 1e-9
+
+
+def rows_per_second(predict, X, min_seconds: float = 0.2) -> float:
+    """Repeat predict(X) for at least min_seconds and return rows/sec."""
+    predict(X)
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        predict(X)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return calls * len(X) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', type=Path, default=MODEL_PATH)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1, 16, 64, 256, 4096, 65536])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    model, feature_cols = load_model(str(args.model))
+    ensemble = native_ensemble(model)
+    if ensemble is None:
+        raise SystemExit(f"{type(model).__name__} is not supported by the NumPy evaluator")
+    print(f"{ensemble.n_trees} trees, max depth {ensemble.max_depth}, {len(ensemble.threshold)} nodes")
+
+    rng = np.random.default_rng(args.seed)
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+    print(f"{'rows':>7} {'sklearn rows/s':>15} {'numpy rows/s':>13} {'speedup':>8} {'max diff':>9}")
+    for n in args.rows:
+        X = build_feature_matrix(rng.uniform(-40, 40, n), rng.uniform(0, 10, n), feature_cols)
+        diff = np.abs(evaluate_tree_ensemble(ensemble, X) - model.predict(X)).max()
+        assert diff <= TOLERANCE, f"evaluator differs from sklearn by {diff:g} on {n} rows"
+
+        sklearn_rate = rows_per_second(model.predict, X)
+        numpy_rate = rows_per_second(lambda X: evaluate_tree_ensemble(ensemble, X), X)
+        print(f"{n:>7} {sklearn_rate:>15,.0f} {numpy_rate:>13,.0f} {numpy_rate / sklearn_rate:>7.2f}x "
+              f"{diff:>9.1e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Accuracy and speed of the vectorized distance kernels against geopy.
+
+For every sample GPX file, compares per-segment distances from each method in
+hiking_predictor_app.geodesy with geopy.distance.geodesic.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.geodesy_accuracy
+"""
+
+import argparse
+from pathlib import Path
+import time
+
+import gpxpy
+import numpy as np
+from geopy.distance import geodesic
+
+from hiking_predictor_app.geodesy import DISTANCE_METHODS, segment_distances
+from benchmarks.samples import sample_gpx_files
+
+
+def load_points(path):
+    """Latitude/longitude arrays of all track points (route points if no track)."""
+    with open(path) as f:
+        gpx = gpxpy.parse(f)
+    points = [p for t in gpx.tracks for s in t.segments for p in s.points]
+    if not points:
+        points = [p for r in gpx.routes for p in r.points]
+    return np.array([p.latitude for p in points]), np.array([p.longitude for p in points])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('files', nargs='*', type=Path, help='GPX files (defaults to the bundled gaiagps_tracks)')
+    args = parser.parse_args()
+
+    files = args.files or sample_gpx_files(kinds=('tracks',))
+    print(f"{'file':<28} {'method':<16} {'time':>9} {'speedup':>8} {'max |err| (m)':>14} "
+          f"{'max rel err':>12} {'total err (m)':>14}")
+    for path in files:
+        lat, lon = load_points(path)
+
+        start = time.perf_counter()
+        expected = np.array([geodesic((lat[i], lon[i]), (lat[i + 1], lon[i + 1])).meters
+                             for i in range(len(lat) - 1)])
+        geopy_s = time.perf_counter() - start
+        print(f"{path.name:<28} {'geopy':<16} {geopy_s:>8.4f}s {'1x':>8}")
+
+        for method in DISTANCE_METHODS:
+            start = time.perf_counter()
+            got = segment_distances(lat, lon, method=method)
+            elapsed = time.perf_counter() - start
+
+            err = np.abs(got - expected)
+            moving = expected > 0
+            rel = np.max(err[moving] / expected[moving]) if moving.any() else 0.0
+            print(f"{path.name:<28} {method:<16} {elapsed:>8.4f}s {geopy_s / elapsed:>7.0f}x "
+                  f"{err.max():>14.2e} {rel:>12.2e} {got.sum() - expected.sum():>14.3e}")
+
+
+if __name__ == '__main__':
+    main()
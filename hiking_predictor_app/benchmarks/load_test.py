@@ -0,0 +1,154 @@
+"""
+Fire concurrent GPX uploads and report latency percentiles.
+
+By default the uploads are posted to a running app's upload endpoint, each
+from its own client session, exactly as the "Analyze Route" button does.
+With --in-process the uploads go straight through a PredictionExecutor
+instead, which needs no running app.
+
+Run from the hiking_predictor_app directory:
+    reflex run --backend-only &
+    python -m benchmarks.load_test --url http://localhost:8000 --requests 64 --concurrency 16
+    python -m benchmarks.load_test --in-process --executor thread
+"""
+
+import argparse
+from pathlib import Path
+import asyncio
+import concurrent.futures
+import json
+import time
+import urllib.error
+import urllib.request
+import uuid
+from typing import List, Tuple
+
+import numpy as np
+
+from hiking_predictor_app.workers import (
+    EXECUTOR_KINDS, ExecutorBusyError, JobTimeoutError, PredictionExecutor,
+)
+from benchmarks.samples import MODEL_PATH, sample_gpx_files
+
+# Event handler name the frontend sends for State.handle_upload
+UPLOAD_HANDLER = "reflex___state____state.hiking_predictor_app___hiking_predictor_app____state.handle_upload"
+
+PIPELINE_PARAMS = {
+    'inference': 'exact',
+    'distance_method': 'vincenty',
+    'smoothing_window_m': 100.0,
+    'slope_window_m': 100.0,
+}
+
+
+def _multipart(filename: str, data: bytes) -> Tuple[bytes, str]:
+    """Encode one file as the 'files' field of a multipart/form-data body."""
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="files"; filename="{filename}"\r\n'
+        f"Content-Type: application/gpx+xml\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def _post_upload(url: str, handler: str, filename: str, data: bytes, timeout_s: float) -> Tuple[float, str]:
+    """Upload one file from a fresh session; return (latency, outcome)."""
+    body, content_type = _multipart(filename, data)
+    request = urllib.request.Request(f"{url.rstrip('/')}/_upload", data=body, method='POST', headers={
+        'Content-Type': content_type,
+        'reflex-client-token': str(uuid.uuid4()),
+        'reflex-event-handler': handler,
+    })
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout_s) as response:
+            updates = [json.loads(line) for line in response.read().splitlines() if line.strip()]
+    except (urllib.error.URLError, TimeoutError) as e:
+        return time.perf_counter() - start, f"http error: {e}"
+    latency = time.perf_counter() - start
+
+    # The response streams state deltas; the last result or error set wins
+    outcome = 'no prediction in response'
+    for update in updates:
+        for substate in update.get('delta', {}).values():
+            error = substate.get('error_message_rx_state_')
+            if error:
+                outcome = error
+            elif substate.get('prediction_results_rx_state_'):
+                outcome = 'ok'
+    return latency, outcome
+
+
+def run_http(url: str, handler: str, uploads: List[Tuple[str, bytes]], concurrency: int,
+             timeout_s: float) -> List[Tuple[float, str]]:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(_post_upload, url, handler, name, data, timeout_s) for name, data in uploads]
+        return [f.result() for f in futures]
+
+
+async def run_in_process(executor: PredictionExecutor, uploads: List[Tuple[str, bytes]],
+                         concurrency: int) -> List[Tuple[float, str]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(data: bytes) -> Tuple[float, str]:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await executor.run(data, PIPELINE_PARAMS)
+                outcome = 'ok' if result.get('success') else result.get('error', 'failed')
+            except ExecutorBusyError:
+                outcome = 'rejected'
+            except JobTimeoutError:
+                outcome = 'timeout'
+            return time.perf_counter() - start, outcome
+
+    return await asyncio.gather(*(one(data) for _, data in uploads))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8000', help='App backend URL')
+    parser.add_argument('--handler', default=UPLOAD_HANDLER, help='Upload event handler name')
+    parser.add_argument('--requests', type=int, default=32, help='Total uploads to send')
+    parser.add_argument('--concurrency', type=int, default=8, help='Uploads in flight at once')
+    parser.add_argument('--timeout', type=float, default=300.0, help='Per-request timeout in seconds')
+    parser.add_argument('--in-process', action='store_true', help='Drive a PredictionExecutor directly')
+    parser.add_argument('--executor', choices=EXECUTOR_KINDS, default='process')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-pending', type=int, default=16)
+    parser.add_argument('files', nargs='*', type=Path, help='GPX files (defaults to the bundled samples)')
+    args = parser.parse_args()
+
+    files = args.files or sample_gpx_files()
+    uploads = [(files[i % len(files)].name, files[i % len(files)].read_bytes()) for i in range(args.requests)]
+
+    start = time.perf_counter()
+    if args.in_process:
+        executor = PredictionExecutor(str(MODEL_PATH), kind=args.executor, max_workers=args.workers,
+                                      max_pending=args.max_pending, timeout_s=args.timeout)
+        results = asyncio.run(run_in_process(executor, uploads, args.concurrency))
+        executor.shutdown(wait=True)
+        target = f"in-process {args.executor} executor"
+    else:
+        results = run_http(args.url, args.handler, uploads, args.concurrency, args.timeout)
+        target = args.url
+    wall = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, outcome in results if outcome == 'ok'])
+    failures = {}
+    for _, outcome in results:
+        if outcome != 'ok':
+            failures[outcome] = failures.get(outcome, 0) + 1
+
+    print(f"{len(uploads)} uploads against {target}, concurrency {args.concurrency}, {wall:.2f}s wall")
+    if len(latencies):
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"ok: {len(latencies)}  p50 {p50:.3f}s  p99 {p99:.3f}s  max {latencies.max():.3f}s  "
+              f"throughput {len(latencies) / wall:.2f} uploads/s")
+    for outcome, count in sorted(failures.items()):
+        print(f"{outcome}: {count}")
+
+
+if __name__ == '__main__':
+    main()
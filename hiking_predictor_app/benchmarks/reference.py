@@ -0,0 +1,554 @@
+"""
+Reference implementations of the original pipeline functions.
+Kept verbatim so benchmarks can check faster versions against them.
+The DataFrame functions at the end are the training notebook's track-ingest
+steps and, last, its track validation and error analysis with the plotting
+left out (hiking_speed_analysis.ipynb).
+"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from geopy.distance import geodesic
+
+
+def smooth_elevation_reference(elevations: np.ndarray, distances: np.ndarray,
+                               window_m: float = 100.0, rows=None) -> np.ndarray:
+    """
+    Original O(n^2) distance-based Gaussian smoothing.
+
+    Args:
+        elevations: Array of elevation values
+        distances: Array of cumulative distances
+        window_m: Distance window for smoothing in meters
+        rows: Optional subset of indices to smooth (all points if None)
+
+    Returns:
+        Smoothed elevations for the requested rows
+    """
+    rows = range(len(elevations)) if rows is None else rows
+    smoothed = []
+
+    for i in rows:
+        current_dist = distances[i]
+
+        # Find points within window
+        weights = []
+        values = []
+
+        for j in range(len(elevations)):
+            dist_diff = abs(distances[j] - current_dist)
+            if dist_diff <= window_m:
+                weight = np.exp(-(dist_diff**2) / (2 * (window_m/3)**2))
+                weights.append(weight)
+                values.append(elevations[j])
+
+        if weights:
+            smoothed.append(np.average(values, weights=weights))
+        else:
+            smoothed.append(elevations[i])
+
+    return np.array(smoothed)
+
+
+def filter_long_breaks_reference(df, break_threshold_minutes=60):
+    """
+    Remove LONG breaks only (lunch, camping) while preserving short pauses.
+
+    Short pauses (water, breath, photos < 60 minutes) are PART OF HIKING and should
+    be included in the model. Only remove gaps that indicate lunch or end-of-day.
+
+    Args:
+        df: DataFrame with GPS points (must have time column)
+        break_threshold_minutes: Time gap to consider a "long break" (default: 60 min)
+
+    Returns:
+        DataFrame with long breaks removed but short pauses preserved
+    """
+    if df is None or len(df) < 2:
+        return df
+
+    df = df.copy().sort_values('time').reset_index(drop=True)
+    break_threshold = timedelta(minutes=break_threshold_minutes)
+
+    # Mark points to keep
+    keep_mask = np.ones(len(df), dtype=bool)
+
+    # Process each track separately
+    for track_name in df['track_name'].unique():
+        track_mask = df['track_name'] == track_name
+        track_indices = np.where(track_mask)[0]
+
+        for i in range(len(track_indices) - 1):
+            idx1 = track_indices[i]
+            idx2 = track_indices[i + 1]
+
+            time_gap = df.iloc[idx2]['time'] - df.iloc[idx1]['time']
+
+            # If gap is longer than threshold, mark the first point of the gap for removal
+            # This will cause calculate_hiking_metrics to restart cumulative time
+            if time_gap > break_threshold:
+                keep_mask[idx1] = False
+
+    filtered_df = df[keep_mask].reset_index(drop=True)
+
+    removed_count = len(df) - len(filtered_df)
+
+    # Detailed break analysis
+    breaks_found = []
+    for track_name in df["track_name"].unique():
+        track_mask = df["track_name"] == track_name
+        track_indices = np.where(track_mask)[0]
+
+        for k in range(len(track_indices) - 1):
+            idx1 = track_indices[k]
+            idx2 = track_indices[k + 1]
+
+            time_gap = df.iloc[idx2]["time"] - df.iloc[idx1]["time"]
+
+            if time_gap > break_threshold:
+                breaks_found.append({
+                    "track": track_name,
+                    "gap_minutes": time_gap.total_seconds() / 60,
+                    "time_before": df.iloc[idx1]["time"],
+                    "time_after": df.iloc[idx2]["time"]
+                })
+
+    removed_pct = (removed_count / len(df)) * 100
+    print(f"Long break filter: Removed {removed_count} points ({removed_pct:.1f}%) marking breaks >{break_threshold_minutes}min")
+    print(f"  Found {len(breaks_found)} breaks longer than {break_threshold_minutes} minutes:")
+    for brk in breaks_found:
+        print(f"    - {brk['track']}: {brk['gap_minutes']:.1f} min gap at {brk['time_before'].strftime('%Y-%m-%d %H:%M:%S')}")
+
+
+    return filtered_df
+
+
+def smooth_track_elevations_reference(df, window_distance_m=100):
+    """
+    Smooth elevation data using a distance-based moving average to reduce GPS noise.
+
+    GPS altitude can have ±5-10m errors, creating false slope variations.
+    This smooths elevation over a specified distance window.
+
+    Args:
+        df: DataFrame with GPS points (must have latitude, longitude, elevation)
+        window_distance_m: Distance window for smoothing (default: 100m)
+
+    Returns:
+        DataFrame with smoothed elevation in 'elevation_smoothed' column
+    """
+    if df is None or len(df) < 2:
+        return df
+
+    df = df.copy()
+
+    # Process each track separately
+    for track_name in df['track_name'].unique():
+        track_mask = df['track_name'] == track_name
+        track_indices = df[track_mask].index
+
+        # Calculate cumulative distance for this track
+        distances = [0]
+        for i in range(len(track_indices) - 1):
+            idx1 = track_indices[i]
+            idx2 = track_indices[i + 1]
+            coord1 = (df.loc[idx1, 'latitude'], df.loc[idx1, 'longitude'])
+            coord2 = (df.loc[idx2, 'latitude'], df.loc[idx2, 'longitude'])
+            dist = geodesic(coord1, coord2).meters
+            distances.append(distances[-1] + dist)
+
+        # Smooth elevation using distance-weighted moving average
+        smoothed_elevations = []
+        for i, idx in enumerate(track_indices):
+            current_dist = distances[i]
+
+            # Find points within the distance window
+            weights = []
+            elevations = []
+
+            for j, idx2 in enumerate(track_indices):
+                dist_diff = abs(distances[j] - current_dist)
+                if dist_diff <= window_distance_m:
+                    # Gaussian-like weighting: closer points have more weight
+                    weight = np.exp(-(dist_diff**2) / (2 * (window_distance_m/3)**2))
+                    weights.append(weight)
+                    elevations.append(df.loc[idx2, 'elevation'])
+
+            # Calculate weighted average
+            if weights:
+                smoothed_elev = np.average(elevations, weights=weights)
+            else:
+                smoothed_elev = df.loc[idx, 'elevation']
+
+            smoothed_elevations.append(smoothed_elev)
+
+        # Update the dataframe
+        df.loc[track_indices, 'elevation_smoothed'] = smoothed_elevations
+
+    # Calculate improvement
+    if 'elevation' in df.columns and 'elevation_smoothed' in df.columns:
+        elev_changes = df.groupby('track_name').apply(
+            lambda x: abs(x['elevation'].diff()).sum()
+        )
+        smooth_changes = df.groupby('track_name').apply(
+            lambda x: abs(x['elevation_smoothed'].diff()).sum()
+        )
+        reduction_pct = ((elev_changes - smooth_changes) / elev_changes * 100).mean()
+        print(f"Elevation smoothing ({window_distance_m}m window): Reduced noise by {reduction_pct:.1f}%")
+
+    return df
+
+
+def calculate_hiking_metrics_reference(df, slope_window_distance_m=100):
+    """
+    Calculate hiking metrics INCLUDING short pauses as part of normal hiking rhythm.
+
+    PHILOSOPHY CHANGE:
+    - OLD: Model pure walking speed, filter out all pauses
+    - NEW: Model realistic hiking speed including short breaks (water, breath)
+
+    This produces more accurate predictions for total hiking time because short pauses
+    are a natural part of the hiking activity, especially as fatigue increases.
+
+    Args:
+        df: DataFrame with GPS points
+        slope_window_distance_m: Distance over which to calculate slope (default: 100m)
+    """
+    if df is None or len(df) < 2:
+        return None
+
+    metrics = []
+
+    # Group by track to process each hike separately
+    for track_name in df['track_name'].unique():
+        track_df = df[df['track_name'] == track_name].copy()
+        track_df = track_df.sort_values('time').reset_index(drop=True)
+
+        # Calculate cumulative distance for slope calculation
+        track_df['cumulative_distance_m'] = 0.0
+        for i in range(1, len(track_df)):
+            coord1 = (track_df.iloc[i-1]['latitude'], track_df.iloc[i-1]['longitude'])
+            coord2 = (track_df.iloc[i]['latitude'], track_df.iloc[i]['longitude'])
+            dist = geodesic(coord1, coord2).meters
+            track_df.loc[i, 'cumulative_distance_m'] = track_df.loc[i-1, 'cumulative_distance_m'] + dist
+
+        current_day_start = None
+        cumulative_time_hours = 0
+
+        for i in range(len(track_df) - 1):
+            p1 = track_df.iloc[i]
+            p2 = track_df.iloc[i + 1]
+
+            # Calculate distance
+            coord1 = (p1['latitude'], p1['longitude'])
+            coord2 = (p2['latitude'], p2['longitude'])
+            distance_m = geodesic(coord1, coord2).meters
+
+            # Calculate time elapsed
+            time_delta = (p2['time'] - p1['time']).total_seconds()
+
+            # CHANGED: More lenient filtering - keep short pauses
+
+            # Filter 1: Reset day on very long breaks (>60 min = lunch/camp)
+            if time_delta > 3600:  # 60 minutes
+                current_day_start = p2['time']
+                cumulative_time_hours = 0
+                continue
+
+            # Filter 2: Remove only obvious GPS errors (stationary for >5 min with no movement)
+            if time_delta > 300 and distance_m < 5:  # 5 minutes, <5m
+                continue
+
+            # Filter 3: Skip if points are too close (GPS noise)
+            if distance_m < 1:
+                continue
+
+            # Calculate speed
+            if time_delta > 0:
+                speed_ms = distance_m / time_delta
+                speed_kmh = speed_ms * 3.6
+            else:
+                continue
+
+            # Filter 4: Skip unrealistic speeds (> 15 km/h for hiking)
+            if speed_kmh > 15:
+                continue
+
+            # Calculate slope over a longer distance window
+            current_dist = p1['cumulative_distance_m']
+            half_window = slope_window_distance_m / 2
+
+            # Find point behind
+            back_idx = i
+            for j in range(i - 1, -1, -1):
+                if current_dist - track_df.iloc[j]['cumulative_distance_m'] >= half_window:
+                    back_idx = j
+                    break
+
+            # Find point ahead
+            forward_idx = i
+            for j in range(i + 1, len(track_df)):
+                if track_df.iloc[j]['cumulative_distance_m'] - current_dist >= half_window:
+                    forward_idx = j
+                    break
+
+            # Calculate slope over this longer segment
+            if forward_idx != back_idx:
+                dist_span = track_df.iloc[forward_idx]['cumulative_distance_m'] - track_df.iloc[back_idx]['cumulative_distance_m']
+                elev_span = track_df.iloc[forward_idx]['elevation_smoothed'] - track_df.iloc[back_idx]['elevation_smoothed']
+                slope_percent = (elev_span / dist_span * 100) if dist_span > 0 else 0
+            else:
+                elev_change_m = p2['elevation_smoothed'] - p1['elevation_smoothed'] if (p1['elevation_smoothed'] and p2['elevation_smoothed']) else 0
+                slope_percent = (elev_change_m / distance_m * 100) if distance_m > 0 else 0
+
+            # Use point-to-point elevation change
+            elev_change_m = p2['elevation_smoothed'] - p1['elevation_smoothed'] if (p1['elevation_smoothed'] and p2['elevation_smoothed']) else 0
+
+            # Detect day boundaries
+            if current_day_start is None:
+                current_day_start = p1['time']
+                cumulative_time_hours = 0
+
+            # Update cumulative time INCLUDING pauses (they're part of hiking!)
+            cumulative_time_hours += time_delta / 3600
+
+            metrics.append({
+                'track_name': track_name,
+                'file_name': p1['file_name'],
+                'time': p1['time'],
+                'date': p1['time'].date(),
+                'distance_m': distance_m,
+                'elevation_change_m': elev_change_m,
+                'slope_percent': slope_percent,
+                'time_delta_s': time_delta,
+                'speed_kmh': speed_kmh,
+                'speed_ms': speed_ms,
+                'cumulative_hours': cumulative_time_hours,
+                'latitude': p1['latitude'],
+                'longitude': p1['longitude'],
+                'elevation': p1['elevation_smoothed']
+            })
+
+    return pd.DataFrame(metrics)
+
+
+def prepare_features_reference(df):
+    """
+    Prepare features for the prediction model.
+    """
+    features_df = df.copy()
+
+    # Basic features
+    features_df['slope'] = features_df['slope_percent']
+    features_df['fatigue'] = features_df['cumulative_hours']
+
+    # Separate uphill and downhill slopes
+    features_df['uphill'] = features_df['slope'].apply(lambda x: max(0, x))
+    features_df['downhill'] = features_df['slope'].apply(lambda x: abs(min(0, x)))
+
+    # Fatigue interaction terms (knee problems worsen with fatigue on descents)
+    features_df['downhill_fatigue'] = features_df['downhill'] * features_df['fatigue']
+    features_df['uphill_fatigue'] = features_df['uphill'] * features_df['fatigue']
+
+    # Quadratic terms to capture non-linear effects
+    features_df['slope_squared'] = features_df['slope'] ** 2
+    features_df['fatigue_squared'] = features_df['fatigue'] ** 2
+
+    return features_df
+
+
+def interpolate_route_path_reference(route_df, points_per_segment=20):
+    """
+    Interpolate additional points along the route to get accurate distance.
+
+    Route files only have waypoints, but the actual trail follows the terrain between them.
+    This creates a denser point set for more accurate distance calculation.
+
+    Args:
+        route_df: DataFrame with route waypoints
+        points_per_segment: Number of points to interpolate between each waypoint pair
+
+    Returns:
+        DataFrame with interpolated route points
+    """
+    if route_df is None or len(route_df) < 2:
+        return route_df
+
+    interpolated_points = []
+
+    for i in range(len(route_df) - 1):
+        p1 = route_df.iloc[i]
+        p2 = route_df.iloc[i + 1]
+
+        # Add the first point
+        interpolated_points.append(p1.to_dict())
+
+        # Interpolate points between p1 and p2
+        for j in range(1, points_per_segment):
+            alpha = j / points_per_segment
+
+            # Linear interpolation for lat/lon
+            interp_lat = p1['latitude'] + alpha * (p2['latitude'] - p1['latitude'])
+            interp_lon = p1['longitude'] + alpha * (p2['longitude'] - p1['longitude'])
+            interp_elev = p1['elevation'] + alpha * (p2['elevation'] - p1['elevation'])
+
+            interpolated_points.append({
+                'latitude': interp_lat,
+                'longitude': interp_lon,
+                'elevation': interp_elev,
+                'time': None,
+                'route_name': p1.get('route_name', p1.get('track_name', 'unknown'))
+            })
+
+    # Add the last point
+    interpolated_points.append(route_df.iloc[-1].to_dict())
+
+    interp_df = pd.DataFrame(interpolated_points)
+
+    # Calculate distances to verify
+    original_dist = 0
+    for i in range(len(route_df) - 1):
+        p1 = route_df.iloc[i]
+        p2 = route_df.iloc[i + 1]
+        coord1 = (p1['latitude'], p1['longitude'])
+        coord2 = (p2['latitude'], p2['longitude'])
+        original_dist += geodesic(coord1, coord2).meters
+
+    interp_dist = 0
+    for i in range(len(interp_df) - 1):
+        p1 = interp_df.iloc[i]
+        p2 = interp_df.iloc[i + 1]
+        coord1 = (p1['latitude'], p1['longitude'])
+        coord2 = (p2['latitude'], p2['longitude'])
+        interp_dist += geodesic(coord1, coord2).meters
+
+    print(f"Route interpolation: {len(route_df)} waypoints → {len(interp_df)} points")
+    print(f"  Original waypoint distance: {original_dist/1000:.2f} km")
+    print(f"  Interpolated path distance: {interp_dist/1000:.2f} km")
+    print(f"  Distance increase: {(interp_dist - original_dist)/1000:.2f} km ({(interp_dist/original_dist - 1)*100:.1f}%)")
+
+    return interp_df
+
+
+def validate_on_tracks_reference(df, model, feature_cols):
+    """
+    Validate the model by predicting total time for each track and comparing to actual time.
+    This is the OLD validation method (uses track data only).
+    """
+    results = []
+
+    for track_name in df['track_name'].unique():
+        track_data = df[df['track_name'] == track_name].copy()
+
+        # Group by date to handle multi-day hikes
+        for date in track_data['date'].unique():
+            day_data = track_data[track_data['date'] == date].copy()
+
+            # Actual metrics
+            actual_time_hours = day_data['time_delta_s'].sum() / 3600
+            actual_distance_km = day_data['distance_m'].sum() / 1000
+
+            if actual_time_hours < 0.5:  # Skip very short segments
+                continue
+
+            # Predict speed for each segment
+            X_pred = day_data[feature_cols]
+            predicted_speeds_kmh = model.predict(X_pred)
+
+            # Calculate predicted time for each segment
+            day_data['predicted_time_hours'] = (day_data['distance_m'] / 1000) / predicted_speeds_kmh
+            predicted_time_hours = day_data['predicted_time_hours'].sum()
+
+            # Calculate error
+            time_error_pct = abs(predicted_time_hours - actual_time_hours) / actual_time_hours * 100
+
+            results.append({
+                'track_name': track_name,
+                'date': date,
+                'actual_time_hours': actual_time_hours,
+                'predicted_time_hours': predicted_time_hours,
+                'distance_km': actual_distance_km,
+                'time_error_pct': time_error_pct,
+                'elevation_gain_m': day_data[day_data['elevation_change_m'] > 0]['elevation_change_m'].sum(),
+                'elevation_loss_m': abs(day_data[day_data['elevation_change_m'] < 0]['elevation_change_m'].sum())
+            })
+
+    return pd.DataFrame(results)
+
+
+def track_curves_reference(df, model, feature_cols):
+    """
+    The per-track/date loop of the notebook's plot_track_analysis, without the plots.
+    Returns the cumulative curves it plots, one frame per track/date.
+    """
+    track_dates = df.groupby(['track_name', 'date']).size().reset_index()[['track_name', 'date']]
+    curves = {}
+
+    for idx, (_, row) in enumerate(track_dates.iterrows()):
+        track_name = row['track_name']
+        date = row['date']
+
+        # Get data for this track/date
+        track_data = df[(df['track_name'] == track_name) & (df['date'] == date)].copy()
+
+        if len(track_data) == 0:
+            continue
+
+        # Calculate cumulative distance (actual)
+        track_data['cumulative_distance_km'] = track_data['distance_m'].cumsum() / 1000
+
+        # Calculate predicted time for each segment
+        X_pred = track_data[feature_cols]
+        predicted_speeds = model.predict(X_pred)
+        track_data['predicted_time_s'] = (track_data['distance_m'] / 1000) / predicted_speeds * 3600
+
+        # Calculate cumulative times
+        track_data['cumulative_actual_time_h'] = track_data['time_delta_s'].cumsum() / 3600
+        track_data['cumulative_predicted_time_h'] = track_data['predicted_time_s'].cumsum() / 3600
+
+        curves[(track_name, date)] = track_data
+
+    return curves
+
+
+def error_analysis_reference(df, model, feature_cols):
+    """
+    The error analysis of the notebook's plot_track_analysis and the pivots of its
+    terrain × fatigue heatmap cell. Returns (analyzed df, tables).
+    """
+    # Analyze prediction errors by slope category
+    df['predicted_speed'] = model.predict(df[feature_cols])
+    df['speed_error_pct'] = (df['predicted_speed'] - df['speed_kmh']) / df['speed_kmh'] * 100
+
+    # Categorize by slope
+    df['terrain_type'] = pd.cut(df['slope_percent'],
+                                 bins=[-np.inf, -20, -5, 5, 20, np.inf],
+                                 labels=['Steep Descent', 'Descent', 'Flat', 'Ascent', 'Steep Ascent'])
+
+    # Categorize by fatigue
+    df['fatigue_level'] = pd.cut(df['cumulative_hours'],
+                                  bins=[0, 1, 2, 3, np.inf],
+                                  labels=['Fresh (0-1h)', 'Moderate (1-2h)', 'Tired (2-3h)', 'Very Tired (>3h)'])
+
+    terrain_analysis = df.groupby('terrain_type').agg({
+        'speed_error_pct': ['mean', 'std', 'count'],
+        'speed_kmh': 'mean',
+        'predicted_speed': 'mean'
+    }).round(2)
+
+    fatigue_analysis = df.groupby('fatigue_level').agg({
+        'speed_error_pct': ['mean', 'std', 'count'],
+        'speed_kmh': 'mean',
+        'predicted_speed': 'mean'
+    }).round(2)
+
+    analyzed_df = df
+    pivot_error = analyzed_df.groupby(['terrain_type', 'fatigue_level'])['speed_error_pct'].mean().unstack()
+    pivot_count = analyzed_df.groupby(['terrain_type', 'fatigue_level']).size().unstack()
+    pivot_actual = analyzed_df.groupby(['terrain_type', 'fatigue_level'])['speed_kmh'].mean().unstack()
+    pivot_predicted = analyzed_df.groupby(['terrain_type', 'fatigue_level'])['predicted_speed'].mean().unstack()
+
+    return df, {'terrain': terrain_analysis, 'fatigue': fatigue_analysis, 'error': pivot_error,
+                'count': pivot_count, 'actual': pivot_actual, 'predicted': pivot_predicted}
@@ -0,0 +1,91 @@
+"""
+Shared inputs for the benchmarks: the bundled GaiaGPS samples, synthetic GPX
+files of any size and the app model.
+"""
+
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from scipy.signal import lfilter
+
+APP_DIR = Path(__file__).resolve().parent.parent
+MODEL_PATH = APP_DIR / "data" / "hiking_speed_model.pkl"
+SAMPLES_DIR = APP_DIR.parent / "jupyter" / "notebooks" / "Loisirs"
+
+# Terrain of the synthetic hikes: (wavelength m, amplitude m) of the summed hills
+_TERRAIN = ((6000.0, 120.0), (2300.0, 45.0), (900.0, 15.0), (250.0, 4.0))
+
+
+def sample_gpx_files(kinds=('tracks', 'routes')) -> List[Path]:
+    """Return the bundled gaiagps_tracks / gaiagps_routes GPX files."""
+    files = []
+    for kind in kinds:
+        files.extend(sorted((SAMPLES_DIR / f"gaiagps_{kind}").glob("*.gpx")))
+    return files
+
+
+def synthetic_gpx(n_points: int, seed: int = 0, kind: str = 'track') -> bytes:
+    """
+    A reproducible GPX hike of n_points points.
+
+    The path wanders with a slowly turning heading over rolling terrain
+    (summed hills of 250 m to 6 km). Tracks are recorded every 3 to 6 m at a
+    walking pace that drops on steep ground, with GPS noise on the position
+    (about 1.5 m) and a correlated barometric-style error on the elevation
+    (about 3 m); routes are noiseless waypoints 50 to 200 m apart, like a
+    route drawn on a map.
+
+    Args:
+        n_points: Number of trkpt / rtept elements
+        seed: Random seed; the same seed gives the same bytes
+        kind: 'track' or 'route'
+
+    Returns:
+        GPX file contents
+    """
+    rng = np.random.default_rng(seed)
+    if kind == 'track':
+        steps = rng.uniform(3.0, 6.0, n_points)
+    elif kind == 'route':
+        steps = rng.uniform(50.0, 200.0, n_points)
+    else:
+        raise ValueError(f"Unknown kind {kind!r}, expected 'track' or 'route'")
+    steps[0] = 0.0
+    distance = np.cumsum(steps)
+    heading = np.cumsum(rng.normal(0.0, 0.08, n_points)) + rng.uniform(0, 2 * np.pi)
+    phases = rng.uniform(0, 2 * np.pi, len(_TERRAIN))
+    elevation = 400.0 + sum(amplitude * np.sin(2 * np.pi * distance / wavelength + phase)
+                            for (wavelength, amplitude), phase in zip(_TERRAIN, phases))
+
+    north = np.cumsum(steps * np.cos(heading))
+    east = np.cumsum(steps * np.sin(heading))
+    latitude = 46.2 + north / 111_320.0
+    longitude = -74.0 + east / (111_320.0 * np.cos(np.radians(46.2)))
+
+    if kind == 'track':
+        # Tobler's hiking function for the pace, on the true (noiseless) grade
+        grade = np.gradient(elevation, distance)
+        speed_ms = 6.0 * np.exp(-3.5 * np.abs(grade + 0.05)) / 3.6
+        seconds = np.cumsum(steps / speed_ms)
+        latitude = latitude + rng.normal(0.0, 1.5, n_points) / 111_320.0
+        longitude = longitude + rng.normal(0.0, 1.5, n_points) / (111_320.0 * np.cos(np.radians(46.2)))
+        # AR(1) elevation error: drifts over a few dozen points like a barometer
+        noise = lfilter([1.0], [1.0, -0.95], rng.normal(0.0, 3.0 * np.sqrt(1 - 0.95 ** 2), n_points))
+        elevation = elevation + noise
+        times = (np.datetime64('2025-08-23T13:00:00') + seconds.astype('timedelta64[s]'))
+        time_tags = [f"<time>{t}Z</time>" for t in np.datetime_as_string(times, unit='s')]
+    else:
+        time_tags = [''] * n_points
+
+    tag = 'trkpt' if kind == 'track' else 'rtept'
+    points = ''.join(f'<{tag} lat="{lat:.7f}" lon="{lon:.7f}"><ele>{ele:.1f}</ele>{time_tag}</{tag}>'
+                     for lat, lon, ele, time_tag in zip(latitude.tolist(), longitude.tolist(),
+                                                        elevation.tolist(), time_tags))
+    if kind == 'track':
+        body = f"<trk><name>Synthetic {n_points}</name><trkseg>{points}</trkseg></trk>"
+    else:
+        body = f"<rte><name>Synthetic {n_points}</name>{points}</rte>"
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<gpx xmlns="http://www.topografix.com/GPX/1/1" creator="benchmarks" version="1.1">'
+            f"{body}</gpx>\n").encode()
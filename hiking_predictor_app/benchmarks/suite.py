@@ -0,0 +1,202 @@
+"""
+Reproducible benchmark suite for the prediction pipeline, saved as JSON.
+
+Inputs are synthetic tracks of --sizes points (benchmarks.samples.synthetic_gpx,
+fixed seed) and the bundled GaiaGPS samples. For each input the suite times
+every stage of predict_hike_time (GPX parse, then the RoutePipeline stages
+from its diagnostics) and the processing of one upload as handle_upload does
+it in a worker: cache key, parse, predict, cache store and chart series.
+Times are the minimum and median of --repeat runs; peak memory is the
+tracemalloc peak of one more, traced upload.
+
+Results go to --output (by default benchmarks/results/<commit>.json) with the
+commit, library versions and machine, so runs can be compared across commits.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.suite --sizes 1000 10000 100000 1000000
+    python -m benchmarks.suite --compare benchmarks/results/<older commit>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import sklearn
+
+from hiking_predictor_app.chart_decimation import chart_series
+from hiking_predictor_app.gpx_reader import read_gpx
+from hiking_predictor_app.model_utils import RoutePipeline
+from hiking_predictor_app.prediction_cache import PredictionCache, model_fingerprint
+from hiking_predictor_app.workers import get_worker_model, pipeline_params, run_pipeline
+from benchmarks.samples import APP_DIR, MODEL_PATH, sample_gpx_files, synthetic_gpx
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Bumped whenever the layout of the JSON output changes
+SUITE_FORMAT_VERSION = 1
+
+# The app's default pipeline parameters (hiking_predictor_app.PIPELINE_PARAMS)
+PIPELINE_PARAMS = {
+    'inference': 'exact',
+    'distance_method': 'vincenty',
+    'smoothing_window_m': 100.0,
+    'slope_window_m': 100.0,
+    'start_fatigue_hours': 0.0,
+    'route_spacing_m': 10.0,
+    'track_spacing_m': 0.0,
+    'time_bands': True,
+}
+
+CHART_POINTS = 2000
+
+
+def git_commit() -> Tuple[str, bool]:
+    """HEAD commit of the repository and whether the working tree has changes."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=APP_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=APP_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, dirty
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {'min': min(samples), 'median': statistics.median(samples)}
+
+
+def process_upload(data: bytes, fingerprint: str, params: Dict, cache: PredictionCache) -> Dict:
+    """One upload as handle_upload and its worker process it, on a cache miss."""
+    key = cache.make_key(data, fingerprint, params)
+    results = run_pipeline(str(MODEL_PATH), data, params)
+    if results.get('success'):
+        cache.put(key, results)
+        chart_series(results['segments'], CHART_POINTS, time_bands=results.get('time_bands'))
+    return results
+
+
+def bench_input(name: str, data: bytes, params: Dict, repeat: int) -> Dict:
+    """Stage timings, end-to-end upload timings and peak memory of one GPX file."""
+    model, feature_cols = get_worker_model(str(MODEL_PATH))
+    fingerprint = model_fingerprint(MODEL_PATH)
+
+    stages: Dict[str, List[float]] = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        points = read_gpx(data)
+        stages.setdefault('parse', []).append(time.perf_counter() - start)
+        results = RoutePipeline(points).predict(model, feature_cols, diagnostics=True,
+                                                **pipeline_params(str(MODEL_PATH), params))
+        for stage, seconds in results['diagnostics']['stage_seconds'].items():
+            stages.setdefault(stage, []).append(seconds)
+        stages.setdefault('total', []).append(
+            stages['parse'][-1] + results['diagnostics']['total_seconds'])
+
+    end_to_end = []
+    for _ in range(repeat):
+        # A fresh cache each time, so every run is a miss like a first upload
+        cache = PredictionCache()
+        start = time.perf_counter()
+        process_upload(data, fingerprint, params, cache)
+        end_to_end.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    process_upload(data, fingerprint, params, PredictionCache())
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    diagnostics = results['diagnostics']
+    return {
+        'input': name,
+        'bytes': len(data),
+        'points_in': diagnostics['points_in'],
+        'points': diagnostics['points'],
+        'segments': diagnostics['segments'],
+        'model_calls': diagnostics['model_calls'],
+        'total_time_hours': float(results['total_time_hours']),
+        'stage_seconds': {stage: summarize(samples) for stage, samples in stages.items()},
+        'end_to_end_seconds': summarize(end_to_end),
+        'peak_memory_bytes': peak_bytes,
+    }
+
+
+def compare(baseline: Dict, current: Dict):
+    """Print current / baseline ratios of the median times and peak memory per input."""
+    print(f"\nvs {baseline['commit'][:12]} ({baseline['created']}), ratio current / baseline:")
+    old = {result['input']: result for result in baseline['results']}
+    for result in current['results']:
+        before = old.get(result['input'])
+        if before is None:
+            continue
+        ratios = {stage: summary['median'] / before['stage_seconds'][stage]['median']
+                  for stage, summary in result['stage_seconds'].items() if stage in before['stage_seconds']}
+        ratios['end_to_end'] = (result['end_to_end_seconds']['median']
+                                / before['end_to_end_seconds']['median'])
+        ratios['peak_memory'] = result['peak_memory_bytes'] / before['peak_memory_bytes']
+        print(f"{result['input']:<42} " + ' '.join(f"{stage} {ratio:.2f}x" for stage, ratio in ratios.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000],
+                        help='Points of the synthetic tracks')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-samples', action='store_true', help='Skip the bundled GaiaGPS samples')
+    parser.add_argument('--inference', default=PIPELINE_PARAMS['inference'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', type=Path, default=None)
+    parser.add_argument('--compare', type=Path, default=None, help='Earlier results to compare with')
+    args = parser.parse_args()
+
+    params = {**PIPELINE_PARAMS, 'inference': args.inference}
+    inputs = [(f"synthetic-{n}", lambda n=n: synthetic_gpx(n, seed=args.seed)) for n in args.sizes]
+    if not args.no_samples:
+        inputs += [(f"{path.parent.name}/{path.name}", path.read_bytes) for path in sample_gpx_files()]
+
+    commit, dirty = git_commit()
+    run = {
+        'format_version': SUITE_FORMAT_VERSION,
+        'commit': commit,
+        'dirty': dirty,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'machine': {'platform': platform.platform(), 'processor': platform.processor(),
+                    'cpu_count': os.cpu_count()},
+        'versions': {'python': sys.version.split()[0], 'numpy': np.__version__, 'sklearn': sklearn.__version__},
+        'params': params,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': [],
+    }
+
+    print(f"{'input':<42} {'points':>8} {'segments':>8} {'parse':>8} {'pipeline':>9} {'upload':>9} "
+          f"{'peak MB':>8}")
+    for name, load in inputs:
+        result = bench_input(name, load(), params, args.repeat)
+        run['results'].append(result)
+        stages = result['stage_seconds']
+        print(f"{name[-42:]:<42} {result['points_in']:>8} {result['segments']:>8} "
+              f"{stages['parse']['median']:>7.3f}s {stages['total']['median'] - stages['parse']['median']:>8.3f}s "
+              f"{result['end_to_end_seconds']['median']:>8.3f}s {result['peak_memory_bytes'] / 2**20:>8.1f}")
+
+    output = args.output or RESULTS_DIR / f"{commit[:12]}{'-dirty' if dirty else ''}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(run, indent=1))
+    print(f"\nWrote {output}")
+
+    if args.compare is not None:
+        compare(json.loads(args.compare.read_text()), run)
+
+
+if __name__ == '__main__':
+    main()
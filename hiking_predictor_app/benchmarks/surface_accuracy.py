@@ -0,0 +1,88 @@
+"""
+Accuracy and speed of the slope x fatigue surface against the real model.
+
+For every sample route the slopes and fatigue values of the exact pipeline
+are fed to both the model and the surface; the table reports the maximum
+and mean interpolation error in km/h within the surface's fatigue range,
+the number of segments past it (which the 'surface' mode resolves on the
+model instead), the total time difference of the 'surface' inference mode
+and the time each mode takes.
+
+Run from the hiking_predictor_app directory:
+    python -m benchmarks.surface_accuracy --slope-step 0.25 --fatigue-step 0.05 --points 20000
+"""
+
+import argparse
+from pathlib import Path
+import time
+from typing import Union
+
+import numpy as np
+
+from hiking_predictor_app.gpx_reader import read_gpx
+from hiking_predictor_app.model_utils import (
+    RoutePipeline, _resolve_fatigue_surface, build_feature_matrix, load_model, predict_raw, predict_segment_speeds,
+)
+from hiking_predictor_app.speed_surface import FATIGUE_RANGE, FATIGUE_STEP, SLOPE_STEP, SpeedSurface
+from benchmarks.samples import MODEL_PATH, sample_gpx_files, synthetic_gpx
+
+
+def route_segments(source: Union[Path, bytes]):
+    """Slopes and segment lengths (m) exactly as predict_hike_time builds them, planned routes densified."""
+    pipeline = RoutePipeline(read_gpx(source))
+    distances = pipeline.profile()[0]
+    segment_indices, slopes = pipeline.slopes()
+    return slopes, np.diff(distances)[segment_indices]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', type=Path, default=MODEL_PATH)
+    parser.add_argument('--slope-step', type=float, default=SLOPE_STEP)
+    parser.add_argument('--fatigue-step', type=float, default=FATIGUE_STEP)
+    parser.add_argument('--points', type=int, nargs='*', default=[],
+                        help='Synthetic track sizes, after the files')
+    parser.add_argument('files', nargs='*', type=Path, help='GPX files (defaults to the bundled samples)')
+    args = parser.parse_args()
+
+    model, feature_cols = load_model(str(args.model))
+    start = time.perf_counter()
+    surface = SpeedSurface.from_model(model, feature_cols, slope_step=args.slope_step,
+                                      fatigue_step=args.fatigue_step)
+    print(f"surface {surface.shape[0]}x{surface.shape[1]} built in {time.perf_counter() - start:.2f}s, "
+          f"fatigue {FATIGUE_RANGE[0]:g}-{FATIGUE_RANGE[1]:g} h (later segments are resolved on the model)")
+
+    inputs = [(str(path), path) for path in args.files or sample_gpx_files()]
+    inputs += [(f"synthetic {n}", synthetic_gpx(n)) for n in args.points]
+
+    print(f"{'file':<40} {'segments':>8} {'past grid':>9} {'max err':>8} {'mean err':>9} {'total diff':>11} "
+          f"{'exact':>8} {'surface':>8}")
+    worst = 0.0
+    for name, source in inputs:
+        slopes, segment_m = route_segments(source)
+
+        start = time.perf_counter()
+        _, exact_hours = predict_segment_speeds(slopes, segment_m, model, feature_cols, inference='exact')
+        exact_time = time.perf_counter() - start
+        start = time.perf_counter()
+        _, surface_hours = _resolve_fatigue_surface(slopes, segment_m / 1000, surface, model, feature_cols)
+        surface_time = time.perf_counter() - start
+        past_grid = len(slopes) - len(surface.resolve(slopes, segment_m / 1000)[0])
+
+        # Pointwise error at the (slope, fatigue) pairs the exact pipeline visits on the grid
+        fatigue = np.concatenate(([0.0], exact_hours[:-1]))
+        on_grid = fatigue <= FATIGUE_RANGE[1]
+        model_speeds = predict_raw(model, build_feature_matrix(slopes[on_grid], fatigue[on_grid], feature_cols))
+        errors = np.abs(surface.speed(slopes[on_grid], fatigue[on_grid]) - model_speeds)
+        worst = max(worst, errors.max())
+
+        diff_s = (surface_hours[-1] - exact_hours[-1]) * 3600
+        print(f"{name[-40:]:<40} {len(slopes):>8} {past_grid:>9} {errors.max():>6.3f}km/h "
+              f"{errors.mean():>7.4f}km/h {diff_s:>10.1f}s {exact_time * 1000:>6.1f}ms "
+              f"{surface_time * 1000:>6.1f}ms")
+
+    print(f"max interpolation error over all routes: {worst:.3f} km/h")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+"""
+HTTP batch prediction API served by the Reflex backend next to the UI.
+
+POST /api/predict takes one or many GPX files and returns their summaries
+and, optionally, decimated segment arrays as JSON:
+
+    curl -F file=@a.gpx -F file=@b.gpx 'http://localhost:8000/api/predict?segments=1'
+    curl -H 'Content-Type: application/json' \\
+         -d '{"routes": [{"name": "a", "gpx": "<gpx ...>"}], "params": {"start_fatigue_hours": 2}}' \\
+         http://localhost:8000/api/predict
+    curl -H 'Content-Type: application/gpx+xml' --data-binary @a.gpx 'http://localhost:8000/api/predict?name=a'
+
+Routes go through the same prediction cache and worker pool as uploads in
+the UI, so a repeated request is answered from the cache. Responses are
+gzip-compressed when the client accepts it and carry an ETag derived from
+the cache keys of the files, the model and the options, so clients can tell
+whether a result changed without comparing bodies. The endpoint is POST
+only, so If-None-Match is not evaluated: a 304 is only allowed for GET and
+HEAD. Parameter overrides must lie in PARAMETER_LIMITS.
+
+Each client may only run a few jobs at a time and all API clients together
+only part of the pool, so bulk callers cannot starve interactive users.
+Clients are told apart by their remote address: a header they choose, such
+as X-Client-Id, would let a caller take a new identity on every request. A
+request body may not exceed max_body_bytes, however it is sent.
+"""
+
+import asyncio
+import contextlib
+import gzip
+import hashlib
+import json
+import math
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from starlette.datastructures import UploadFile
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from .chart_decimation import decimate
+from .metrics import Metrics
+from .prediction_cache import PredictionCache, model_fingerprint
+from .speed_surface import FATIGUE_RANGE
+from .workers import ExecutorBusyError, JobTimeoutError, PredictionExecutor
+
+# Summary fields of a successful prediction, in response order
+SUMMARY_FIELDS = ('total_distance_km', 'total_time_hours', 'elevation_gain_m', 'elevation_loss_m',
+                  'average_speed_kmh')
+
+# Segment columns returned with ?segments=1 (distance_km duplicates cumulative_distance_km)
+API_SEGMENT_COLUMNS = ('cumulative_distance_km', 'cumulative_time_hours', 'elevation_m', 'slope_percent',
+                       'predicted_speed_kmh')
+
+# Responses smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+
+GPX_CONTENT_TYPES = ('application/gpx+xml', 'application/xml', 'text/xml')
+
+# Accepted range of each adjustable parameter: the windows as on the UI sliders, the
+# start fatigue within the fatigue range of the speed surface
+PARAMETER_LIMITS = {
+    'start_fatigue_hours': FATIGUE_RANGE,
+    'smoothing_window_m': (20.0, 500.0),
+    'slope_window_m': (20.0, 500.0),
+}
+
+
+class APIError(Exception):
+    """A request the API refuses, with its HTTP status code."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ClientLimiter:
+    """
+    Bounds the jobs each client and all clients together run at once.
+
+    A client's job first waits for one of its own slots, then for a shared
+    one, so a client with a long queue never holds shared slots it cannot
+    use yet.
+    """
+
+    def __init__(self, per_client: int, total: int):
+        self.per_client = per_client
+        self.total = total
+        self._total: Optional[asyncio.Semaphore] = None
+        # Client -> [semaphore, jobs holding or waiting for it]
+        self._clients: Dict[str, list] = {}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, client: str):
+        if self._total is None:
+            self._total = asyncio.Semaphore(self.total)
+        entry = self._clients.setdefault(client, [asyncio.Semaphore(self.per_client), 0])
+        entry[1] += 1
+        try:
+            async with entry[0], self._total:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._clients[client]
+
+    def stats(self) -> Dict[str, int]:
+        """Clients with jobs running or waiting."""
+        return {'clients': len(self._clients)}
+
+
+def decimated_segments(segments, max_points: int, method: str = 'lttb',
+                       time_bands: Optional[Dict] = None) -> Dict[str, List[float]]:
+    """
+    Segment columns at the rows that keep the shape of the elevation, speed and progress curves.
+
+    Args:
+        segments: SegmentTable from predict_hike_time
+        max_points: Target points per curve; 0 returns every segment
+        method: Decimation method, see chart_decimation.decimate
+        time_bands: The prediction's 'time_bands', if any
+
+    Returns:
+        Dictionary of API_SEGMENT_COLUMNS lists over the same rows; with
+        time_bands also band_cumulative_time_hours, one list per quantile
+    """
+    if max_points and len(segments) > max_points:
+        distance_km = segments.cumulative_distance_km
+        rows = np.union1d(
+            np.union1d(decimate(distance_km, segments.elevation_m, max_points, method),
+                       decimate(distance_km, segments.predicted_speed_kmh, max_points, method)),
+            decimate(segments.cumulative_time_hours, distance_km, max_points, method))
+    else:
+        rows = slice(None)
+    columns = {name: segments.column(name)[rows].tolist() for name in API_SEGMENT_COLUMNS}
+    if time_bands is not None:
+        columns['band_cumulative_time_hours'] = time_bands['cumulative_time_hours'][:, rows].tolist()
+    return columns
+
+
+class PredictionAPI:
+    """
+    The /api/predict endpoint over a shared executor, cache and metrics.
+
+    Args:
+        executor: Worker pool the UI uses too
+        cache: Prediction cache the UI uses too
+        metrics: Where requests and routes are recorded
+        model_path: Model file the workers load, fingerprinted for cache keys
+        pipeline_params: Default keyword arguments for predict_hike_time
+        adjustable_params: Parameters a request may override
+        diagnostics: Ask the workers for pipeline diagnostics (for metrics)
+        per_client_jobs: Jobs one client may run at once
+        max_jobs: Jobs all API clients together may run at once
+        max_files: Files accepted in one request
+        max_body_bytes: Largest request body accepted, in bytes
+        max_points: Default target points of the decimated segment arrays
+        decimation: Decimation method, see chart_decimation.decimate
+    """
+
+    def __init__(self, executor: PredictionExecutor, cache: PredictionCache, metrics: Metrics,
+                 model_path: Path, pipeline_params: Dict, adjustable_params: Tuple[str, ...],
+                 diagnostics: bool = False, per_client_jobs: int = 2, max_jobs: int = 8,
+                 max_files: int = 64, max_body_bytes: int = 64 * 1024 * 1024, max_points: int = 2000,
+                 decimation: str = 'lttb'):
+        self.executor = executor
+        self.cache = cache
+        self.metrics = metrics
+        self.model_path = Path(model_path)
+        self.pipeline_params = dict(pipeline_params)
+        self.adjustable_params = tuple(adjustable_params)
+        self.diagnostics = diagnostics
+        self.max_files = max_files
+        self.max_body_bytes = max_body_bytes
+        self.max_points = max_points
+        self.decimation = decimation
+        self.limiter = ClientLimiter(per_client_jobs, max_jobs)
+
+    def routes(self) -> List[Route]:
+        return [Route('/api/predict', self.predict, methods=['POST'])]
+
+    def _limit_body(self, request: Request) -> Request:
+        """
+        The request with its body capped at max_body_bytes.
+
+        A larger declared Content-Length is refused at once; a chunked body
+        is counted as it arrives and refused once it passes the limit, before
+        the rest is read.
+
+        Raises:
+            APIError: 413 if the body is too large
+        """
+        too_large = APIError(413, f"Request body over {self.max_body_bytes / (1024 * 1024):g} MB")
+        declared = request.headers.get('content-length', '')
+        if declared.isdigit() and int(declared) > self.max_body_bytes:
+            raise too_large
+        received = 0
+
+        async def receive():
+            nonlocal received
+            message = await request.receive()
+            received += len(message.get('body', b''))
+            if received > self.max_body_bytes:
+                raise too_large
+            return message
+
+        return Request(request.scope, receive)
+
+    async def _read_files(self, request: Request) -> Tuple[List[Tuple[str, bytes]], Dict]:
+        """(name, GPX bytes) pairs and the options of a request, from any accepted body type."""
+        request = self._limit_body(request)
+        content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+        options = dict(request.query_params)
+        files = []
+        if content_type == 'multipart/form-data':
+            async with request.form(max_files=self.max_files + 1) as form:
+                for key, value in form.multi_items():
+                    if isinstance(value, UploadFile):
+                        files.append((value.filename or key, await value.read()))
+                    else:
+                        options[key] = value
+        elif content_type == 'application/json':
+            try:
+                body = json.loads(await request.body())
+                routes = body.pop('routes')
+                files = [(str(route.get('name', i)), route['gpx'].encode()) for i, route in enumerate(routes)]
+            except (ValueError, KeyError, TypeError, AttributeError):
+                raise APIError(400, 'Expected {"routes": [{"name": ..., "gpx": "<gpx ...>"}, ...]}')
+            params = body.pop('params', {})
+            if not isinstance(params, dict):
+                raise APIError(400, 'Expected "params" to be an object of parameter values')
+            options.update(params)
+            options.update(body)
+        elif content_type in GPX_CONTENT_TYPES:
+            files = [(options.pop('name', 'route'), await request.body())]
+        else:
+            raise APIError(415, f"Send multipart/form-data, application/json or one of {GPX_CONTENT_TYPES}")
+
+        if not files:
+            raise APIError(400, 'No GPX file in the request')
+        if len(files) > self.max_files:
+            raise APIError(413, f"At most {self.max_files} files per request")
+        return files, options
+
+    @staticmethod
+    def _parameter_value(name: str, value) -> float:
+        """A parameter override as a float within PARAMETER_LIMITS."""
+        value = float(value)
+        low, high = PARAMETER_LIMITS.get(name, (-math.inf, math.inf))
+        if not (math.isfinite(value) and low <= value <= high):
+            raise APIError(400, f"{name} must be a number between {low:g} and {high:g}, got {value!r}")
+        return value
+
+    def _parse_options(self, options: Dict) -> Tuple[Dict, bool, int]:
+        """Pipeline parameters, whether to return segments and their target points."""
+        params = dict(self.pipeline_params)
+        segments = str(options.pop('segments', '')).lower() in ('1', 'true', 'yes')
+        try:
+            max_points = int(options.pop('points', self.max_points))
+            for name, value in options.items():
+                if name not in self.adjustable_params:
+                    raise APIError(400, f"Unknown option {name!r}, expected segments, points or one of "
+                                        f"{self.adjustable_params}")
+                params[name] = self._parameter_value(name, value)
+        except (ValueError, TypeError) as e:
+            raise APIError(400, f"Invalid option value: {e}")
+        return params, segments, max(max_points, 0)
+
+    async def _predict_route(self, client: str, data: bytes, key: str, params: Dict) -> Dict:
+        """Prediction results of one file, from the cache or a worker."""
+        started = time.perf_counter()
+        results = self.cache.get(key)
+        source = 'api_cache'
+        if results is None:
+            source = 'api'
+            async with self.limiter.slot(client):
+                job_id = None
+                try:
+                    job_id = self.executor.submit(data, {**params, 'diagnostics': self.diagnostics})
+                    results = await self.executor.result(job_id)
+                except (ExecutorBusyError, JobTimeoutError) as e:
+                    results = {'success': False, 'error': str(e)}
+                except asyncio.CancelledError:
+                    if job_id is not None:
+                        self.executor.cancel(job_id)
+                    raise
+                except Exception as e:
+                    results = {'success': False, 'error': f"Error processing GPX file: {str(e)}"}
+        results = self.metrics.record_route(results, source, time.perf_counter() - started)
+        if source == 'api' and results.get('success'):
+            self.cache.put(key, results)
+        return results
+
+    def _route_body(self, name: str, results: Dict, segments: bool, max_points: int) -> Dict:
+        if not results.get('success'):
+            return {'name': name, 'success': False, 'error': results.get('error', 'Prediction failed')}
+        body = {'name': name, 'success': True, **{field: float(results[field]) for field in SUMMARY_FIELDS}}
+        time_bands = results.get('time_bands')
+        if time_bands is not None:
+            body['time_bands'] = {'quantiles': list(time_bands['quantiles']),
+                                  'total_time_hours': time_bands['cumulative_time_hours'][:, -1].tolist()}
+        if segments:
+            body['segments'] = decimated_segments(results['segments'], max_points, self.decimation, time_bands)
+        return body
+
+    def _response(self, request: Request, body: Dict, status_code: int = 200,
+                  headers: Optional[Dict[str, str]] = None) -> Response:
+        """JSON response, gzip-compressed if the client accepts it."""
+        headers = dict(headers or {})
+        content = json.dumps(body, separators=(',', ':')).encode()
+        headers['Vary'] = 'Accept-Encoding'
+        if len(content) >= GZIP_MIN_BYTES and 'gzip' in request.headers.get('accept-encoding', ''):
+            content = gzip.compress(content, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+        return Response(content, status_code=status_code, media_type='application/json', headers=headers)
+
+    async def predict(self, request: Request) -> Response:
+        """POST /api/predict"""
+        self.metrics.inc('hiking_requests_total', kind='api')
+        try:
+            if not self.model_path.exists():
+                raise APIError(503, 'Prediction model not loaded')
+            files, options = await self._read_files(request)
+            params, segments, max_points = self._parse_options(options)
+        except APIError as e:
+            return self._response(request, {'error': str(e)}, e.status_code)
+
+        fingerprint = model_fingerprint(self.model_path)
+        keys = [self.cache.make_key(data, fingerprint, params) for _, data in files]
+        # Same files, model, parameters and output options: same response
+        etag_source = json.dumps([keys, [name for name, _ in files], segments, max_points, self.decimation])
+        etag = f'"{hashlib.sha256(etag_source.encode()).hexdigest()[:32]}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, max-age=3600'}
+
+        client = request.client.host if request.client else 'unknown'
+        outcomes = await asyncio.gather(*(self._predict_route(client, data, key, params)
+                                          for (_, data), key in zip(files, keys)))
+        routes = [self._route_body(name, results, segments, max_points)
+                  for (name, _), results in zip(files, outcomes)]
+        if not all(route['success'] for route in routes):
+            # Failures may be transient (busy pool, timeout): do not let them be cached
+            headers = {'Cache-Control': 'no-store'}
+        return self._response(request, {'routes': routes}, headers=headers)
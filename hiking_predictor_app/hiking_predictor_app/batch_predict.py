@@ -0,0 +1,434 @@
+"""
+Predict hiking times for many GPX files from the command line.
+
+Files are scored in parallel by a process pool (one model load per worker)
+and results are streamed to CSV or Parquet as they complete: one summary row
+per route and, optionally, a per-segment table. A Parquet output is a
+directory of part files, one per flushed batch, so an interrupted run keeps
+the rows it has written.
+
+Every summary row records the fingerprint of the model and the parameters it
+was scored with. Re-running with the same output skips the routes that
+already have a row for the same model and parameters, and scores the others
+again, replacing their rows; --retry-failed also scores the failed ones
+again. Every file keeps one row.
+
+    python -m hiking_predictor_app.batch_predict routes/ "archive/**/*.gpx" -o summary.csv
+    python -m hiking_predictor_app.batch_predict routes/ -o summary.parquet --segments segments.parquet
+
+Parquet output requires pyarrow.
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from .geodesy import DISTANCE_METHODS
+from .gpx_reader import read_gpx
+from .model_utils import INFERENCE_MODES, ROUTE_SPACING_M, predict_hike_time
+from .prediction_cache import model_fingerprint
+from .workers import get_worker_model, init_worker
+
+DEFAULT_MODEL_PATH = Path(__file__).parent.parent / "data" / "hiking_speed_model.pkl"
+
+# Output columns and their Parquet types (pyarrow type factory names)
+SUMMARY_COLUMNS = {
+    'file': 'string', 'name': 'string', 'kind': 'string', 'points': 'int64', 'segments': 'int64',
+    'total_distance_km': 'float64', 'total_time_hours': 'float64', 'elevation_gain_m': 'float64',
+    'elevation_loss_m': 'float64', 'average_speed_kmh': 'float64', 'success': 'bool_',
+    'error': 'string', 'elapsed_s': 'float64', 'model_fingerprint': 'string', 'params': 'string',
+}
+
+SEGMENT_COLUMNS = {
+    'file': 'string', 'segment': 'int64', 'distance_km': 'float64', 'elevation_m': 'float64',
+    'slope_percent': 'float64', 'predicted_speed_kmh': 'float64', 'cumulative_time_hours': 'float64',
+    'cumulative_distance_km': 'float64',
+}
+
+
+def find_gpx_files(inputs: Iterable[str]) -> List[Path]:
+    """
+    Expand directories (searched recursively), glob patterns and file paths.
+
+    Args:
+        inputs: Directories, glob patterns or GPX file paths
+
+    Returns:
+        Sorted, de-duplicated list of resolved GPX file paths
+    """
+    files = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.update(p for p in path.rglob('*') if p.suffix.lower() == '.gpx' and p.is_file())
+        elif path.is_file():
+            files.add(path)
+        else:
+            files.update(Path(p) for p in glob.glob(item, recursive=True) if Path(p).is_file())
+    return sorted(p.resolve() for p in files)
+
+
+def score_file(model_path: str, path: str, params: Dict, with_segments: bool) -> Dict:
+    """
+    Predict one route inside a worker process.
+
+    Returns:
+        Dictionary with the summary row and, if requested, segment columns
+    """
+    start = time.perf_counter()
+    row = {col: None for col in SUMMARY_COLUMNS}
+    row['file'] = path
+    segments = None
+    try:
+        model, feature_cols = get_worker_model(model_path)
+        if model is None:
+            raise RuntimeError("Prediction model not loaded")
+        points = read_gpx(path)
+        row.update(name=points.name, kind=points.kind, points=len(points))
+        results = predict_hike_time(points, model, feature_cols, **params)
+        row['success'] = bool(results.get('success'))
+        if row['success']:
+            row['segments'] = len(results['segments'])
+            for key in ('total_distance_km', 'total_time_hours', 'elevation_gain_m',
+                        'elevation_loss_m', 'average_speed_kmh'):
+                row[key] = float(results[key])
+            if with_segments:
+                table = results['segments']
+                segments = {col: table.column(col).tolist() for col in list(SEGMENT_COLUMNS)[2:]}
+                segments['segment'] = list(range(len(table)))
+                segments['file'] = [path] * len(table)
+        else:
+            row['error'] = results.get('error', 'Prediction failed')
+    except Exception as e:
+        row['success'] = False
+        row['error'] = f"{type(e).__name__}: {e}"
+    row['elapsed_s'] = time.perf_counter() - start
+    return {'row': row, 'segments': segments}
+
+
+def is_parquet(path: Path) -> bool:
+    """Whether an output path is written as Parquet rather than CSV."""
+    return path.suffix.lower() in ('.parquet', '.pq')
+
+
+def parquet_parts(path: Path) -> List[Path]:
+    """Part files of a Parquet output directory, in write order."""
+    return sorted(path.glob('part-*.parquet')) if path.is_dir() else []
+
+
+def remove_output(path: Path):
+    """Delete a CSV file or Parquet output directory, if it exists."""
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+class TableWriter:
+    """
+    Append rows to a CSV file or a Parquet output directory as they arrive.
+
+    CSV rows are appended in place. Parquet files cannot be appended to, so
+    a Parquet output is a directory that pyarrow reads as one table: pending
+    rows are written as a new part file every batch_rows rows or flush_s
+    seconds, and an interrupted run loses at most the rows since then.
+    """
+
+    def __init__(self, path: Path, columns: Dict[str, str], batch_rows: int = 1000, flush_s: float = 30.0):
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.batch_rows = batch_rows
+        self.flush_s = flush_s
+        self.parquet = is_parquet(self.path)
+        self._pending: Dict[str, list] = {col: [] for col in columns}
+        self._pending_rows = 0
+        self._flushed_at = time.monotonic()
+
+        if self.parquet:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise SystemExit("Parquet output requires pyarrow (pip install pyarrow)")
+            if self.path.is_file():
+                raise SystemExit(f"{self.path} is a single Parquet file; Parquet outputs are now directories "
+                                 f"of part files (rerun with --no-resume)")
+            self._pa = pa
+            self._pq = pq
+            self._schema = pa.schema([(col, getattr(pa, kind)()) for col, kind in columns.items()])
+            self.path.mkdir(parents=True, exist_ok=True)
+            parts = parquet_parts(self.path)
+            self._next_part = int(parts[-1].stem.split('-')[1]) + 1 if parts else 0
+        else:
+            is_new = not self.path.exists() or self.path.stat().st_size == 0
+            self._file = open(self.path, 'a', newline='')
+            self._csv = csv.DictWriter(self._file, fieldnames=self.columns)
+            if is_new:
+                self._csv.writeheader()
+
+    def write_rows(self, rows: List[Dict]):
+        """Append row dictionaries."""
+        self.write_columns({col: [row.get(col) for row in rows] for col in self.columns})
+
+    def write_columns(self, columns: Dict[str, list]):
+        """Append rows given as equal-length column lists."""
+        if not self.parquet:
+            self._csv.writerows(dict(zip(self.columns, values))
+                                for values in zip(*(columns[col] for col in self.columns)))
+            self._file.flush()
+            return
+        for col in self.columns:
+            self._pending[col].extend(columns[col])
+        self._pending_rows += len(columns[self.columns[0]])
+        if self._pending_rows >= self.batch_rows or time.monotonic() - self._flushed_at >= self.flush_s:
+            self.flush()
+
+    def flush(self):
+        """Write the pending Parquet rows as a new part file."""
+        if self.parquet and self._pending_rows:
+            part = self.path / f"part-{self._next_part:05d}.parquet"
+            # Names starting with a dot are ignored by pyarrow, so a half-written part is never read
+            tmp_path = self.path / f".{part.name}.{os.getpid()}.tmp"
+            self._pq.write_table(self._pa.table(self._pending, schema=self._schema), tmp_path)
+            os.replace(tmp_path, part)
+            self._next_part += 1
+            self._pending = {col: [] for col in self.columns}
+            self._pending_rows = 0
+        self._flushed_at = time.monotonic()
+
+    def close(self):
+        if self.parquet:
+            self.flush()
+        else:
+            self._file.close()
+
+
+def params_key(params: Dict) -> str:
+    """The parameters of a run as stored in its summary rows."""
+    return json.dumps(params, sort_keys=True)
+
+
+def already_scored(path: Path, fingerprint: str, params: str) -> Dict[str, Optional[bool]]:
+    """
+    Files with a summary row in an existing output.
+
+    Args:
+        path: Summary table of an earlier run
+        fingerprint: Model fingerprint of this run
+        params: params_key of this run
+
+    Returns:
+        For each file, whether any of its rows for the same model and
+        parameters succeeded, or None if its rows are all for another model
+        or other parameters
+
+    Raises:
+        SystemExit: If the output does not record the model and parameters
+    """
+    if is_parquet(path):
+        if not parquet_parts(path):
+            return {}
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        columns = table.column_names
+        rows = zip(*(table.column(col).to_pylist() for col in ('file', 'success', 'model_fingerprint', 'params'))) \
+            if 'params' in columns else []
+    else:
+        if not path.exists() or path.stat().st_size == 0:
+            return {}
+        with open(path, newline='') as f:
+            reader = csv.DictReader(f)
+            columns = reader.fieldnames or []
+            rows = [(row['file'], row['success'] == 'True', row['model_fingerprint'], row['params'])
+                    for row in reader] if 'params' in columns else []
+    if 'model_fingerprint' not in columns or 'params' not in columns:
+        raise SystemExit(f"{path} does not record the model and parameters of its rows (rerun with --no-resume)")
+
+    scored: Dict[str, Optional[bool]] = {}
+    for file, ok, row_fingerprint, row_params in rows:
+        if row_fingerprint == fingerprint and row_params == params:
+            scored[file] = bool(scored.get(file)) or bool(ok)
+        else:
+            scored.setdefault(file, None)
+    return scored
+
+
+def drop_rows(path: Path, files: Set[str]):
+    """Remove the rows of files from an existing output, replacing it atomically."""
+    if is_parquet(path):
+        if not parquet_parts(path):
+            return
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        keep = pc.invert(pc.is_in(table['file'], value_set=pa.array(sorted(files), type=pa.string())))
+        # Write the kept rows as a new directory and swap it in
+        tmp_dir = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        old_dir = path.with_name(f".{path.name}.{os.getpid()}.old")
+        tmp_dir.mkdir()
+        pq.write_table(table.filter(keep), tmp_dir / "part-00000.parquet")
+        os.replace(path, old_dir)
+        os.replace(tmp_dir, path)
+        shutil.rmtree(old_dir)
+        return
+    if not path.exists():
+        return
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(path, newline='') as src, open(tmp_path, 'w', newline='') as dst:
+        reader = csv.DictReader(src)
+        writer = csv.DictWriter(dst, fieldnames=reader.fieldnames)
+        writer.writeheader()
+        writer.writerows(row for row in reader if row['file'] not in files)
+    os.replace(tmp_path, path)
+
+
+def run_batch(files: List[Path], output: Path, model_path: Path, params: Dict,
+              segments_output: Optional[Path] = None, max_workers: Optional[int] = None,
+              resume: bool = True, retry_failed: bool = False, progress_every: int = 25) -> Dict:
+    """
+    Score GPX files in a process pool and stream the results.
+
+    Args:
+        files: GPX files to score
+        output: Summary table path (.csv or .parquet)
+        model_path: Pickled model (the .npz artifact next to it is preferred)
+        params: Keyword arguments for predict_hike_time
+        segments_output: Optional per-segment table path (.csv or .parquet)
+        max_workers: Worker processes (default: CPU count)
+        resume: Skip files that already have a summary row in output for the
+                same model and parameters, and replace the rows of the others;
+                otherwise existing outputs are overwritten
+        retry_failed: When resuming, score files whose rows all failed again
+                      and replace those rows
+        progress_every: Print progress every this many files
+
+    Returns:
+        Dictionary with run statistics
+    """
+    if not resume:
+        for path in (output, segments_output):
+            if path is not None:
+                remove_output(path)
+    # Rows of a missing model fail anyway, and are scored again once it exists
+    fingerprint = model_fingerprint(model_path) if Path(model_path).is_file() else ''
+    run_params = params_key(params)
+    scored = already_scored(output, fingerprint, run_params) if resume else {}
+    stale = {file for file, ok in scored.items() if ok is None or (retry_failed and ok is False)}
+    replace = {str(f) for f in files} & stale
+    if replace:
+        drop_rows(output, replace)
+        if segments_output is not None:
+            drop_rows(segments_output, replace)
+    todo = [f for f in files if str(f) not in scored or str(f) in replace]
+
+    summary = TableWriter(output, SUMMARY_COLUMNS)
+    segments = TableWriter(segments_output, SEGMENT_COLUMNS) if segments_output else None
+    stats = {'files': 0, 'failed': 0, 'skipped': len(files) - len(todo), 'points': 0}
+    start = time.perf_counter()
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker, initargs=(str(model_path), params.get('inference', 'exact'))) as pool:
+            # Keep a bounded number of files in flight
+            in_flight_limit = 4 * (max_workers or os.cpu_count() or 1)
+            queue = iter(todo)
+            in_flight = set()
+            while True:
+                for path in queue:
+                    in_flight.add(pool.submit(score_file, str(model_path), str(path), params,
+                                              segments is not None))
+                    if len(in_flight) >= in_flight_limit:
+                        break
+                if not in_flight:
+                    break
+                done, in_flight = concurrent.futures.wait(
+                    in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    row = result['row']
+                    row.update(model_fingerprint=fingerprint, params=run_params)
+                    summary.write_rows([row])
+                    if segments is not None and result['segments']:
+                        segments.write_columns(result['segments'])
+                    stats['files'] += 1
+                    stats['points'] += row['points'] or 0
+                    if not row['success']:
+                        stats['failed'] += 1
+                        print(f"failed: {row['file']}: {row['error']}", file=sys.stderr)
+                    if progress_every and stats['files'] % progress_every == 0:
+                        elapsed = time.perf_counter() - start
+                        print(f"{stats['files']}/{len(todo)} files, {stats['files'] / elapsed:.1f} files/s",
+                              file=sys.stderr)
+    finally:
+        summary.close()
+        if segments is not None:
+            segments.close()
+
+    elapsed = time.perf_counter() - start
+    stats['elapsed_s'] = elapsed
+    stats['files_per_s'] = stats['files'] / elapsed if elapsed > 0 else 0.0
+    stats['points_per_s'] = stats['points'] / elapsed if elapsed > 0 else 0.0
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Predict hiking times for many GPX files",
+        epilog="Parquet output (.parquet) requires pyarrow.")
+    parser.add_argument('inputs', nargs='+', help='GPX files, directories or glob patterns')
+    parser.add_argument('-o', '--output', type=Path, required=True,
+                        help='Summary table, one row per route (.csv or .parquet)')
+    parser.add_argument('--segments', type=Path, default=None,
+                        help='Also write a per-segment table (.csv or .parquet)')
+    parser.add_argument('--model', type=Path, default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--no-resume', action='store_true',
+                        help='Overwrite the outputs instead of skipping files already scored')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='When resuming, score failed files again and replace their rows')
+    parser.add_argument('--inference', choices=INFERENCE_MODES, default='exact')
+    parser.add_argument('--distance-method', choices=DISTANCE_METHODS, default='vincenty')
+    parser.add_argument('--smoothing-window', type=float, default=100.0, help='Elevation smoothing window (m)')
+    parser.add_argument('--slope-window', type=float, default=100.0, help='Slope window (m)')
+    parser.add_argument('--start-fatigue', type=float, default=0.0,
+                        help='Hours already walked before each route starts')
+    parser.add_argument('--route-spacing', type=float, default=ROUTE_SPACING_M,
+                        help='Densify planned routes to a point every N m (0: keep the waypoints)')
+    parser.add_argument('--track-spacing', type=float, default=0.0,
+                        help='Resample recorded tracks to a point every N m before prediction (0: every point)')
+    args = parser.parse_args(argv)
+
+    files = find_gpx_files(args.inputs)
+    if not files:
+        raise SystemExit("No GPX files found")
+
+    params = {
+        'inference': args.inference,
+        'distance_method': args.distance_method,
+        'smoothing_window_m': args.smoothing_window,
+        'slope_window_m': args.slope_window,
+        'start_fatigue_hours': args.start_fatigue,
+        'route_spacing_m': args.route_spacing,
+        'track_spacing_m': args.track_spacing,
+    }
+    stats = run_batch(files, args.output, args.model, params, segments_output=args.segments,
+                      max_workers=args.workers, resume=not args.no_resume, retry_failed=args.retry_failed)
+
+    print(f"{stats['files']} files scored ({stats['failed']} failed, {stats['skipped']} already scored) "
+          f"in {stats['elapsed_s']:.1f}s: {stats['files_per_s']:.2f} files/s, "
+          f"{stats['points_per_s']:,.0f} points/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Shape-preserving downsampling of chart series.
+Large routes have tens of thousands of segments; plotting every one of them
+sends megabytes per figure to the browser without changing what is drawn.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+DECIMATION_METHODS = ('lttb', 'minmax')
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: keep the points that span the largest
+    triangles, which preserves peaks, dips and the overall shape.
+
+    Args:
+        x: Sample positions (increasing)
+        y: Sample values
+        n_out: Number of points to keep; smaller values keep 3
+
+    Returns:
+        Sorted indices of the kept points, including the first and last
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    # The ends and at least one interior point
+    n_out = max(n_out, 3)
+    if n_out >= n:
+        return np.arange(n)
+
+    # Interior points split into n_out - 2 buckets; the ends are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    # Average of each bucket, the third vertex for the bucket before it
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, x[-1]).tolist()
+    avg_y = np.append(sums_y / counts, y[-1]).tolist()
+
+    # Buckets hold a few points each, so plain floats beat per-bucket array calls
+    xs, ys, bounds = x.tolist(), y.tolist(), edges.tolist()
+    out = [0]
+    a = 0
+    for b in range(n_out - 2):
+        ax, ay = xs[a], ys[a]
+        dx, dy = ax - avg_x[b + 1], avg_y[b + 1] - ay
+        best = -1.0
+        for j in range(bounds[b], bounds[b + 1]):
+            # Twice the triangle area (a, candidate, next bucket average)
+            area = abs(dx * (ys[j] - ay) - (ax - xs[j]) * dy)
+            if area > best:
+                best, a = area, j
+        out.append(a)
+    out.append(n - 1)
+    return np.array(out, dtype=np.intp)
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Min/max bucketing: keep the lowest and highest point of each bucket,
+    which preserves the envelope of noisy series such as speed.
+
+    Args:
+        y: Sample values
+        n_out: Approximate number of points to keep
+
+    Returns:
+        Sorted, unique indices of the kept points, including the first and last
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n_out >= n:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, size)
+    starts = np.arange(n_buckets) * size
+    valid = starts < n
+    lows = starts[valid] + np.nanargmin(buckets[valid], axis=1)
+    highs = starts[valid] + np.nanargmax(buckets[valid], axis=1)
+    return np.unique(np.concatenate(([0, n - 1], lows, highs)))
+
+
+def decimate(x: np.ndarray, y: np.ndarray, n_out: int, method: str = 'lttb') -> np.ndarray:
+    """
+    Indices of a downsampled series.
+
+    Args:
+        x: Sample positions (increasing)
+        y: Sample values
+        n_out: Target number of points
+        method: 'lttb' or 'minmax'
+
+    Returns:
+        Sorted indices of the kept points
+    """
+    if method == 'lttb':
+        return lttb_indices(x, y, n_out)
+    if method == 'minmax':
+        return minmax_indices(y, n_out)
+    raise ValueError(f"Unknown decimation method {method!r}, expected one of {DECIMATION_METHODS}")
+
+
+def chart_series(segments, max_points: int = 2000, method: str = 'lttb',
+                 time_bands: Optional[Dict] = None) -> Dict[str, List[float]]:
+    """
+    Downsample the plotted segment columns of a prediction.
+
+    Each trace is decimated on its own so that it keeps its own extremes.
+
+    Args:
+        segments: SegmentTable from predict_hike_time
+        max_points: Target number of points per trace
+        method: 'lttb' or 'minmax'
+        time_bands: The prediction's 'time_bands', if any
+
+    Returns:
+        Dictionary of plain lists ready for Plotly: time_hours/distance_km
+        (distance over time), speed_distance_km/speed_kmh and
+        elevation_distance_km/elevation_m; with time_bands also band_quantiles
+        and band_time_hours, one time list per quantile at the rows of
+        distance_km
+    """
+    time_h = segments.cumulative_time_hours
+    distance_km = segments.cumulative_distance_km
+    speed = segments.predicted_speed_kmh
+    elevation = segments.elevation_m
+
+    progress = decimate(time_h, distance_km, max_points, method)
+    speed_idx = decimate(distance_km, speed, max_points, method)
+    elevation_idx = decimate(distance_km, elevation, max_points, method)
+    series = {
+        'time_hours': time_h[progress].tolist(),
+        'distance_km': distance_km[progress].tolist(),
+        'speed_distance_km': distance_km[speed_idx].tolist(),
+        'speed_kmh': speed[speed_idx].tolist(),
+        'elevation_distance_km': distance_km[elevation_idx].tolist(),
+        'elevation_m': elevation[elevation_idx].tolist(),
+    }
+    if time_bands is not None:
+        series['band_quantiles'] = list(time_bands['quantiles'])
+        series['band_time_hours'] = time_bands['cumulative_time_hours'][:, progress].tolist()
+    return series
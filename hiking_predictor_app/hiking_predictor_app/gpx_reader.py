@@ -0,0 +1,130 @@
+"""
+Streaming GPX reader.
+Parses trkpt/rtept elements incrementally into columnar float64 arrays
+without building a gpxpy object graph.
+"""
+
+import io
+import os
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import BinaryIO, Optional, Union
+
+import numpy as np
+
+
+@dataclass
+class GPXPoints:
+    """Columnar point data read from a GPX file."""
+
+    latitude: np.ndarray
+    longitude: np.ndarray
+    elevation: np.ndarray   # meters, NaN where missing
+    time: np.ndarray        # seconds since the Unix epoch (UTC), NaN where missing
+    kind: str               # 'track' or 'route'
+    name: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+
+class _PointColumns:
+    """Preallocated lat/lon/ele/time arrays that double in size when full."""
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.data = np.empty((4, capacity), dtype=np.float64)
+
+    def append(self, lat: float, lon: float, ele: float, time: float):
+        if self.size == self.data.shape[1]:
+            grown = np.empty((4, 2 * self.size), dtype=np.float64)
+            grown[:, :self.size] = self.data
+            self.data = grown
+        self.data[:, self.size] = (lat, lon, ele, time)
+        self.size += 1
+
+    def to_points(self, kind: str, name: Optional[str]) -> GPXPoints:
+        lat, lon, ele, time = self.data[:, :self.size].copy()
+        return GPXPoints(lat, lon, ele, time, kind=kind, name=name)
+
+
+def _parse_time(text: Optional[str]) -> float:
+    """ISO 8601 timestamp to epoch seconds; naive times are taken as UTC."""
+    if not text:
+        return np.nan
+    text = text.strip()
+    if text.endswith('Z'):
+        text = text[:-1] + '+00:00'
+    try:
+        value = datetime.fromisoformat(text)
+    except ValueError:
+        return np.nan
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _parse_float(text: Optional[str]) -> float:
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def read_gpx(source: Union[bytes, str, os.PathLike, BinaryIO]) -> GPXPoints:
+    """
+    Read GPX points incrementally into columnar arrays.
+
+    Track points are returned when the file has any; otherwise route points
+    are used, matching the fallback of predict_hike_time. Parsed elements are
+    discarded as soon as their values are copied, so memory stays close to the
+    size of the output arrays.
+
+    Args:
+        source: Raw GPX bytes, a file path or a binary file object
+
+    Returns:
+        GPXPoints with the track (or route) points
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+
+    columns = {'trkpt': _PointColumns(), 'rtept': _PointColumns()}
+    names = {'trk': None, 'rte': None}
+    namespace = ''
+    stack = []
+
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if not stack and '}' in elem.tag:
+                namespace = elem.tag[:elem.tag.index('}') + 1]
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        tag = elem.tag[len(namespace):] if elem.tag.startswith(namespace) else elem.tag
+
+        if tag in columns:
+            columns[tag].append(
+                _parse_float(elem.get('lat')),
+                _parse_float(elem.get('lon')),
+                _parse_float(elem.findtext(namespace + 'ele')),
+                _parse_time(elem.findtext(namespace + 'time')),
+            )
+        elif tag == 'name' and stack:
+            parent = stack[-1].tag[len(namespace):]
+            if parent in names and names[parent] is None:
+                names[parent] = (elem.text or '').strip() or None
+            continue
+        elif len(stack) != 1:
+            # Keep children of points and of trk/rte until their parent ends
+            continue
+
+        # Drop the finished element from its parent so the tree never grows
+        if stack:
+            del stack[-1][-1]
+
+    if columns['trkpt'].size > 0:
+        return columns['trkpt'].to_points('track', names['trk'])
+    return columns['rtept'].to_points('route', names['rte'])
@@ -0,0 +1,189 @@
+"""
+On-disk store of parsed GPX point arrays for model training.
+Files are parsed in a process pool by the streaming reader and each one is
+saved as an uncompressed .npz named after a hash of its contents. A manifest
+records every file's mtime, size and hash, so later runs memory-map the saved
+arrays and only re-parse the files that were added or changed.
+
+    store = GPXStore('.gpx_store')
+    tracks = store.ingest(sorted(Path('gaiagps_tracks').glob('*.gpx')))
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+
+from .gpx_reader import GPXPoints, read_gpx
+from .model_artifact import _map_npz
+
+# Bumped whenever read_gpx output changes, so arrays parsed by an older reader are not reused
+STORE_FORMAT_VERSION = 1
+
+MANIFEST_NAME = 'manifest.json'
+
+_POINT_ARRAYS = ('latitude', 'longitude', 'elevation', 'time')
+
+
+def _content_key(data: bytes) -> str:
+    """Hex digest naming the stored arrays of a GPX file."""
+    digest = hashlib.sha256()
+    digest.update(f"v{STORE_FORMAT_VERSION}".encode())
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def _arrays_path(store_dir: Union[str, os.PathLike], key: str) -> Path:
+    return Path(store_dir) / key[:2] / f"{key}.npz"
+
+
+def _parse_into_store(path: str, store_dir: str) -> Dict:
+    """
+    Pool job: hash one GPX file and, unless its arrays are already stored, parse and save them.
+
+    Returns:
+        The file's manifest entry
+    """
+    stat = os.stat(path)
+    data = Path(path).read_bytes()
+    key = _content_key(data)
+    target = _arrays_path(store_dir, key)
+    parsed = False
+    if not target.exists():
+        points = read_gpx(data)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f"{key}.{os.getpid()}.tmp.npz")
+        # Uncompressed members can be memory-mapped when loaded
+        np.savez(tmp_path, kind=np.array(points.kind), name=np.array(points.name or ''),
+                 **{name: getattr(points, name) for name in _POINT_ARRAYS})
+        os.replace(tmp_path, target)
+        parsed = True
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'key': key, 'parsed': parsed}
+
+
+def _load_points(path: Path) -> GPXPoints:
+    """Stored arrays of one file; non-empty arrays are memory-mapped, not read."""
+    arrays = _map_npz(path)
+    name = str(arrays['name'])
+    return GPXPoints(*(arrays[col] for col in _POINT_ARRAYS),
+                     kind=str(arrays['kind']), name=name or None)
+
+
+class GPXStore:
+    """
+    Incremental, parallel GPX ingestion backed by a directory of .npz arrays.
+
+    A file is re-parsed only when its mtime or size changed and its contents
+    hash to arrays that are not stored yet; renamed or touched files are
+    matched by hash and reused.
+    """
+
+    def __init__(self, store_dir: Union[str, os.PathLike], max_workers: Optional[int] = None):
+        self.store_dir = Path(store_dir)
+        self.max_workers = max_workers
+        self.parsed = 0
+        self.reused = 0
+        self.errors: Dict[Path, str] = {}
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.store_dir / MANIFEST_NAME
+
+    def _read_manifest(self) -> Dict[str, Dict]:
+        try:
+            manifest = json.loads(self.manifest_path.read_text())
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('format_version') != STORE_FORMAT_VERSION:
+            return {}
+        return manifest.get('files', {})
+
+    def _write_manifest(self, files: Dict[str, Dict]):
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({'format_version': STORE_FORMAT_VERSION, 'files': files},
+                                       indent=1, sort_keys=True))
+        os.replace(tmp_path, self.manifest_path)
+
+    def ingest(self, paths: Iterable[Union[str, os.PathLike]]) -> Dict[Path, GPXPoints]:
+        """
+        Load the points of many GPX files, parsing only new or changed ones.
+
+        Files that cannot be read or parsed are left out of the result and
+        listed in self.errors with their error message.
+
+        Args:
+            paths: GPX file paths
+
+        Returns:
+            Dictionary mapping each resolved path to its GPXPoints, in input order
+        """
+        paths = list(dict.fromkeys(Path(p).resolve() for p in paths))
+        files = self._read_manifest()
+        self.errors = {}
+
+        stale = []
+        for path in paths:
+            entry = files.get(str(path))
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                self.errors[path] = str(e)
+                continue
+            if (entry is None or entry['mtime_ns'] != stat.st_mtime_ns or entry['size'] != stat.st_size
+                    or not _arrays_path(self.store_dir, entry['key']).exists()):
+                stale.append(path)
+
+        parsed = set()
+        for path, outcome in self._parse(stale):
+            if isinstance(outcome, Exception):
+                self.errors[path] = str(outcome)
+                files.pop(str(path), None)
+                continue
+            if outcome.pop('parsed'):
+                parsed.add(path)
+            files[str(path)] = outcome
+        if stale:
+            self._write_manifest(files)
+
+        points = {}
+        for path in paths:
+            if path in self.errors:
+                continue
+            try:
+                points[path] = _load_points(_arrays_path(self.store_dir, files[str(path)]['key']))
+            except Exception as e:
+                self.errors[path] = str(e)
+        self.parsed += len(parsed)
+        self.reused += len(points.keys() - parsed)
+        return points
+
+    def _parse(self, paths):
+        """Yield (path, manifest entry or exception) for each path, in a process pool if worthwhile."""
+        store_dir = str(self.store_dir)
+        if len(paths) < 2 or self.max_workers == 1:
+            # Starting a pool costs more than parsing a single file
+            for path in paths:
+                try:
+                    yield path, _parse_into_store(str(path), store_dir)
+                except Exception as e:
+                    yield path, e
+            return
+
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {pool.submit(_parse_into_store, str(path), store_dir): path for path in paths}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    yield futures[future], e
+
+    def stats(self) -> Dict[str, int]:
+        """Files parsed and reused from the store since creation, and failures of the last ingest."""
+        return {'parsed': self.parsed, 'reused': self.reused, 'errors': len(self.errors)}
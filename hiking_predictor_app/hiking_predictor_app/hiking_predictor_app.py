@@ -3,14 +3,141 @@ Hiking Time Predictor - Reflex Web Application
 Upload GPX files to predict hiking times using a trained ML model.
 """
 
+import asyncio
+import contextlib
+import os
+import time
 import reflex as rx
 from typing import List, Dict, Optional
 import plotly.graph_objects as go
 from pathlib import Path
-import gpxpy
-import gpxpy.gpx
-
-from .model_utils import load_model, predict_hike_time
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from .api import PARAMETER_LIMITS, PredictionAPI
+from .chart_decimation import chart_series
+from .gpx_reader import read_gpx
+from .metrics import Metrics, cache_samples, executor_samples
+from .model_utils import ROUTE_SPACING_M, RoutePipeline
+from .prediction_cache import PredictionCache, model_fingerprint
+from .workers import (ExecutorBusyError, JobCancelledError, JobTimeoutError, executor_from_env, get_worker_model,
+                      init_worker, pipeline_params)
+
+MODEL_PATH = Path(__file__).parent.parent / "data" / "hiking_speed_model.pkl"
+
+# Pipeline parameters passed to predict_hike_time (part of the cache key)
+PIPELINE_PARAMS = {
+    'inference': os.environ.get('HIKING_INFERENCE', 'exact'),
+    'distance_method': 'vincenty',
+    'smoothing_window_m': 100.0,
+    'slope_window_m': 100.0,
+    'start_fatigue_hours': 0.0,
+    'route_spacing_m': float(os.environ.get('HIKING_ROUTE_SPACING_M', ROUTE_SPACING_M)),
+    'track_spacing_m': float(os.environ.get('HIKING_TRACK_SPACING_M', 0)),
+    # Time uncertainty bands, for models trained with quantile models (see time_bands)
+    'time_bands': os.environ.get('HIKING_TIME_BANDS', '1') != '0',
+}
+
+# Parameters users can change after the upload
+ADJUSTABLE_PARAMS = ('start_fatigue_hours', 'smoothing_window_m', 'slope_window_m')
+
+# Points per chart trace; longer routes are downsampled once when their prediction arrives
+CHART_POINTS = int(os.environ.get('HIKING_CHART_POINTS', 2000))
+CHART_DECIMATION = os.environ.get('HIKING_CHART_DECIMATION', 'lttb')
+
+# Predictions keyed on upload bytes + model fingerprint + pipeline parameters
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get('HIKING_CACHE_MAX_ENTRIES', 256)),
+    max_bytes=int(os.environ.get('HIKING_CACHE_MAX_MB', 64)) * 1024 * 1024,
+    disk_dir=os.environ.get('HIKING_CACHE_DIR') or None,
+)
+
+# Parsing and prediction run in worker processes so uploads never block the event loop
+prediction_executor = executor_from_env(str(MODEL_PATH), PIPELINE_PARAMS['inference'])
+
+# Request counts, latencies and pipeline diagnostics, served at /metrics (HIKING_METRICS=0: off)
+METRICS_ENABLED = os.environ.get('HIKING_METRICS', '1') != '0'
+metrics = Metrics()
+metrics.add_collector(lambda: cache_samples(prediction_cache.stats()))
+metrics.add_collector(lambda: executor_samples(prediction_executor.stats()))
+
+# JSON / multipart batch predictions for other services at /api/predict (HIKING_API=0: off).
+# API clients share the worker pool with the UI but may only use part of it.
+API_ENABLED = os.environ.get('HIKING_API', '1') != '0'
+prediction_api = PredictionAPI(
+    prediction_executor, prediction_cache, metrics, MODEL_PATH, PIPELINE_PARAMS, ADJUSTABLE_PARAMS,
+    diagnostics=METRICS_ENABLED,
+    per_client_jobs=int(os.environ.get('HIKING_API_CLIENT_JOBS', 2)),
+    max_jobs=int(os.environ.get('HIKING_API_MAX_JOBS', max(1, prediction_executor.max_pending // 2))),
+    max_files=int(os.environ.get('HIKING_API_MAX_FILES', 64)),
+    max_body_bytes=int(os.environ.get('HIKING_API_MAX_MB', 64)) * 1024 * 1024,
+    max_points=CHART_POINTS, decimation=CHART_DECIMATION,
+)
+metrics.add_collector(lambda: [('hiking_api_clients', 'gauge', 'API clients with routes running or waiting', {},
+                                prediction_api.limiter.stats()['clients'])])
+
+# Running jobs per client token, so a new upload or "Upload New Route" can cancel them
+_upload_jobs: Dict[str, List[str]] = {}
+
+
+def repredict_route(source, params: Dict):
+    """
+    Re-run a route's pipeline with new parameters (runs in a thread).
+
+    Args:
+        source: The route's RoutePipeline, or its GPX bytes on the first change
+        params: Keyword arguments for RoutePipeline.predict
+
+    Returns:
+        Tuple of (pipeline, prediction results), the results recorded in metrics
+    """
+    start = time.perf_counter()
+    pipeline = source if isinstance(source, RoutePipeline) else RoutePipeline(read_gpx(source))
+    model, feature_cols = get_worker_model(str(MODEL_PATH))
+    if model is None or feature_cols is None:
+        results = {'success': False, 'error': 'Prediction model not loaded'}
+    else:
+        results = pipeline.predict(model, feature_cols, diagnostics=METRICS_ENABLED,
+                                   **pipeline_params(str(MODEL_PATH), params))
+    return pipeline, metrics.record_route(results, 'repredict', time.perf_counter() - start)
+
+
+def format_duration(total_hours: float) -> str:
+    """Format a duration in hours as 'Xh Ym'."""
+    hours = int(total_hours)
+    minutes = int((total_hours % 1) * 60)
+    return f"{hours}h {minutes}m"
+
+
+def route_summary(route_id: str, name: str, results: Optional[Dict] = None) -> Dict[str, str]:
+    """
+    Build the display row of one uploaded route.
+
+    Args:
+        route_id: Position of the file in the upload
+        name: Uploaded file name
+        results: Prediction results, or None while the route is still running
+
+    Returns:
+        Dictionary of display strings; 'hours' keeps the raw predicted time for ranking
+    """
+    row = {'id': route_id, 'name': name, 'status': 'pending', 'error': '', 'time': '',
+           'distance': '', 'speed': '', 'gain': '', 'hours': ''}
+    if results is None:
+        return row
+    if not results.get('success'):
+        row.update(status='failed', error=results.get('error', 'Prediction failed'))
+        return row
+    row.update(
+        status='done',
+        time=format_duration(results['total_time_hours']),
+        distance=f"{results['total_distance_km']:.2f} km",
+        speed=f"{results['average_speed_kmh']:.2f} km/h",
+        gain=f"{results['elevation_gain_m']:.0f} m",
+        hours=repr(float(results['total_time_hours'])),
+    )
+    return row
 
 
 class State(rx.State):
@@ -20,38 +147,53 @@ class State(rx.State):
     uploaded_files: List[str] = []
     current_gpx_name: str = ""
 
-    # Prediction results
+    # One summary row per uploaded route, in upload order
+    routes: List[Dict[str, str]] = []
+    longest_first: bool = False
+
+    # Full results per route id, with columnar segments; backend only, never sent to the browser
+    _route_results: Dict[str, Dict] = {}
+    # Downsampled chart series per route id, and those of the route being shown
+    _route_charts: Dict[str, Dict] = {}
+    _chart_series: Dict[str, List[float]] = {}
+    # Memoized pipeline stages per route id, built from the upload on the first parameter change
+    _route_uploads: Dict[str, bytes] = {}
+    _route_pipelines: Dict[str, RoutePipeline] = {}
+
+    # Adjustable pipeline parameters
+    start_fatigue_hours: float = PIPELINE_PARAMS['start_fatigue_hours']
+    smoothing_window_m: float = PIPELINE_PARAMS['smoothing_window_m']
+    slope_window_m: float = PIPELINE_PARAMS['slope_window_m']
+
+    # Summary of the route being shown (prediction results without segments)
+    selected_route: str = ""
     prediction_results: Optional[Dict] = None
     is_loading: bool = False
     error_message: str = ""
 
-    def get_model_data(self) -> tuple:
-        """Load the trained hiking speed model."""
-        if not hasattr(State, '_model_data_instance'):
-            # Look for model in data directory
-            model_path = Path(__file__).parent.parent / "data" / "hiking_speed_model.pkl"
-
-            if model_path.exists():
-                model, feature_cols = load_model(str(model_path))
-                if model is None:
-                    self.error_message = "Failed to load prediction model"
-                    State._model_data_instance = (None, None)
-                else:
-                    State._model_data_instance = (model, feature_cols)
-            else:
-                self.error_message = f"Model not found at {model_path}"
-                State._model_data_instance = (None, None)
-        return State._model_data_instance
+    @rx.var
+    def ranked_routes(self) -> List[Dict[str, str]]:
+        """Finished routes ranked by predicted time, then running and failed routes."""
+        done = sorted((r for r in self.routes if r['status'] == 'done'),
+                      key=lambda r: float(r['hours']), reverse=self.longest_first)
+        ranked = [{**r, 'rank': str(i + 1)} for i, r in enumerate(done)]
+        return ranked + [{**r, 'rank': '-'} for r in self.routes if r['status'] != 'done']
 
     @rx.var
     def formatted_time(self) -> str:
         """Format predicted time as 'Xh Ym'."""
         if self.prediction_results is None:
             return "N/A"
-        total_hours = self.prediction_results.get('total_time_hours', 0)
-        hours = int(total_hours)
-        minutes = int((total_hours % 1) * 60)
-        return f"{hours}h {minutes}m"
+        return format_duration(self.prediction_results.get('total_time_hours', 0))
+
+    @rx.var
+    def formatted_time_range(self) -> str:
+        """Format the time band of the prediction, empty for models without quantile models."""
+        if self.prediction_results is None or 'time_band_hours' not in self.prediction_results:
+            return ""
+        fast, slow = self.prediction_results['time_band_hours']
+        low, high = self.prediction_results['time_band_quantiles']
+        return f"{format_duration(fast)} – {format_duration(slow)} ({low:.0%}–{high:.0%})"
 
     @rx.var
     def formatted_distance(self) -> str:
@@ -79,14 +221,31 @@ class State(rx.State):
         """Generate distance over time chart."""
         fig = go.Figure()
 
-        if self.prediction_results and 'segments' in self.prediction_results:
-            segments = self.prediction_results['segments']
-            times = [seg['cumulative_time_hours'] for seg in segments]
-            distances = [seg['cumulative_distance_km'] for seg in segments]
+        if self._chart_series.get('band_time_hours'):
+            # Fastest and slowest quantile curves, the range between them shaded
+            quantiles = self._chart_series['band_quantiles']
+            fast, slow = self._chart_series['band_time_hours'][0], self._chart_series['band_time_hours'][-1]
+            fig.add_trace(go.Scatter(
+                x=fast,
+                y=self._chart_series['distance_km'],
+                mode='lines',
+                name=f"{quantiles[0]:.0%} time",
+                line=dict(color='#93c5fd', width=1, dash='dash'),
+            ))
+            fig.add_trace(go.Scatter(
+                x=slow,
+                y=self._chart_series['distance_km'],
+                mode='lines',
+                name=f"{quantiles[-1]:.0%} time",
+                line=dict(color='#93c5fd', width=1, dash='dash'),
+                fill='tonexty',
+                fillcolor='rgba(59, 130, 246, 0.12)',
+            ))
 
+        if self._chart_series:
             fig.add_trace(go.Scatter(
-                x=times,
-                y=distances,
+                x=self._chart_series['time_hours'],
+                y=self._chart_series['distance_km'],
                 mode='lines',
                 name='Distance',
                 line=dict(color='#3b82f6', width=3),
@@ -107,16 +266,11 @@ class State(rx.State):
         """Generate speed and elevation profile chart."""
         fig = go.Figure()
 
-        if self.prediction_results and 'segments' in self.prediction_results:
-            segments = self.prediction_results['segments']
-            distances = [seg['cumulative_distance_km'] for seg in segments]
-            speeds = [seg['predicted_speed_kmh'] for seg in segments]
-            elevations = [seg['elevation_m'] for seg in segments]
-
+        if self._chart_series:
             # Speed trace
             fig.add_trace(go.Scatter(
-                x=distances,
-                y=speeds,
+                x=self._chart_series['speed_distance_km'],
+                y=self._chart_series['speed_kmh'],
                 mode='lines',
                 name='Speed (km/h)',
                 line=dict(color='#10b981', width=2),
@@ -125,8 +279,8 @@ class State(rx.State):
 
             # Elevation trace
             fig.add_trace(go.Scatter(
-                x=distances,
-                y=elevations,
+                x=self._chart_series['elevation_distance_km'],
+                y=self._chart_series['elevation_m'],
                 mode='lines',
                 name='Elevation (m)',
                 line=dict(color='#6366f1', width=2),
@@ -161,55 +315,188 @@ class State(rx.State):
 
         return fig
 
+    def _pipeline_params(self) -> Dict:
+        """Pipeline parameters with this session's adjustments."""
+        return {**PIPELINE_PARAMS, **{name: getattr(self, name) for name in ADJUSTABLE_PARAMS}}
+
+    def _store_route(self, route_id: str, results: Dict):
+        """Record a finished route and show it if no route is shown yet."""
+        self.routes = [route_summary(route_id, r['name'], results) if r['id'] == route_id else r
+                       for r in self.routes]
+        if results.get('success'):
+            self._route_results[route_id] = results
+            self._route_charts[route_id] = chart_series(results['segments'], CHART_POINTS, CHART_DECIMATION,
+                                                        results.get('time_bands'))
+            if self.prediction_results is None or self.selected_route == route_id:
+                self.select_route(route_id)
+        else:
+            self._route_results.pop(route_id, None)
+            self._route_charts.pop(route_id, None)
+            if self.selected_route == route_id:
+                self.prediction_results = None
+                self._chart_series = {}
+
     async def handle_upload(self, files: List[rx.UploadFile]):
-        """Handle GPX file upload."""
+        """Predict every uploaded GPX file concurrently, showing each route as it finishes."""
+        metrics.inc('hiking_requests_total', kind='upload')
         self.is_loading = True
         self.error_message = ""
         self.prediction_results = None
+        self.current_gpx_name = ""
+        self.routes = []
+        self._route_results = {}
+        self._route_charts = {}
+        self._chart_series = {}
+        self._route_uploads = {}
+        self._route_pipelines = {}
+        self.selected_route = ""
 
         if not files:
             self.error_message = "No file uploaded"
             self.is_loading = False
             return
 
-        # Process the first file
-        upload_file = files[0]
-        self.uploaded_files = [upload_file.filename]
-        self.current_gpx_name = upload_file.filename
-
-        # Read the file content
-        try:
-            upload_data = await upload_file.read()
-            gpx_content = upload_data.decode('utf-8')
-
-            # Parse GPX
-            gpx = gpxpy.parse(gpx_content)
-
-            # Make prediction
-            model, feature_cols = self.get_model_data()
-            if model is None or feature_cols is None:
-                self.error_message = "Prediction model not loaded"
-                self.is_loading = False
-                return
-
-            results = predict_hike_time(gpx, model, feature_cols)
+        if not MODEL_PATH.exists():
+            self.error_message = f"Model not found at {MODEL_PATH}"
+            self.is_loading = False
+            return
 
+        self.uploaded_files = [f.filename for f in files]
+        self.routes = [route_summary(str(i), f.filename) for i, f in enumerate(files)]
+
+        token = self.router.session.client_token
+        for job_id in _upload_jobs.pop(token, []):
+            prediction_executor.cancel(job_id)
+
+        # Reuse cached predictions and submit the other routes all at once
+        fingerprint = model_fingerprint(MODEL_PATH)
+        params = self._pipeline_params()
+        pending = {}
+        for i, upload_file in enumerate(files):
+            route_id = str(i)
+            started = time.perf_counter()
+            try:
+                upload_data = await upload_file.read()
+                self._route_uploads[route_id] = upload_data
+                cache_key = prediction_cache.make_key(upload_data, fingerprint, params)
+                results = prediction_cache.get(cache_key)
+                if results is None:
+                    job_id = prediction_executor.submit(upload_data, {**params, 'diagnostics': METRICS_ENABLED})
+                    pending[route_id] = (job_id, cache_key, started)
+                else:
+                    self._store_route(route_id, metrics.record_route(results, 'cache',
+                                                                     time.perf_counter() - started))
+            except ExecutorBusyError as e:
+                self._store_route(route_id, {'success': False, 'error': str(e)})
+            except Exception as e:
+                self._store_route(route_id, {'success': False, 'error': f"Error processing GPX file: {str(e)}"})
+
+        job_ids = [job_id for job_id, _, _ in pending.values()]
+        _upload_jobs[token] = job_ids
+        yield
+
+        async def wait_for_route(route_id: str, job_id: str, cache_key: str, started: float):
+            try:
+                results = await prediction_executor.result(job_id)
+            except JobCancelledError:
+                return route_id, None
+            except JobTimeoutError as e:
+                results = {'success': False, 'error': str(e)}
+            except Exception as e:
+                results = {'success': False, 'error': f"Error processing GPX file: {str(e)}"}
+            # Diagnostics go to the metrics, not into the cache or the page state
+            results = metrics.record_route(results, 'worker', time.perf_counter() - started)
             if results.get('success'):
-                self.prediction_results = results
-            else:
-                self.error_message = results.get('error', 'Prediction failed')
+                prediction_cache.put(cache_key, results)
+            return route_id, results
 
-        except Exception as e:
-            self.error_message = f"Error processing GPX file: {str(e)}"
+        # Show each route as soon as it finishes
+        try:
+            for finished in asyncio.as_completed(
+                    [wait_for_route(route_id, job_id, cache_key, started)
+                     for route_id, (job_id, cache_key, started) in pending.items()]):
+                route_id, results = await finished
+                if results is not None:
+                    self._store_route(route_id, results)
+                    yield
+        finally:
+            if _upload_jobs.get(token) is job_ids:
+                del _upload_jobs[token]
+
+        # Nothing to show: stay on the upload page with the error
+        if self.routes and not self._route_results:
+            errors = [r['error'] for r in self.routes if r['error']]
+            if errors:
+                self.error_message = errors[0] if len(self.routes) == 1 else \
+                    f"No route could be analyzed: {errors[0]}"
+                self.routes = []
 
         self.is_loading = False
 
-    def clear_and_upload_new(self):
-        """Clear results and upload a new file."""
-        self.uploaded_files = []
-        self.current_gpx_name = ""
-        self.prediction_results = None
-        self.error_message = ""
+    def select_route(self, route_id: str):
+        """Show the charts and summary of one finished route."""
+        results = self._route_results.get(route_id)
+        if results is None:
+            return
+        self.selected_route = route_id
+        self.prediction_results = {k: v for k, v in results.items() if k not in ('segments', 'time_bands')}
+        if 'time_bands' in results:
+            bands = results['time_bands']
+            self.prediction_results['time_band_quantiles'] = [bands['quantiles'][0], bands['quantiles'][-1]]
+            self.prediction_results['time_band_hours'] = [float(bands['cumulative_time_hours'][0, -1]),
+                                                          float(bands['cumulative_time_hours'][-1, -1])]
+        self._chart_series = self._route_charts[route_id]
+        self.current_gpx_name = next(r['name'] for r in self.routes if r['id'] == route_id)
+
+    async def update_parameter(self, name: str, value: List[float]):
+        """
+        Re-predict the finished routes after a parameter change.
+
+        Only the pipeline stages after the changed parameter are recomputed,
+        so a new start fatigue re-runs the speed stage only.
+        """
+        if name not in ADJUSTABLE_PARAMS:
+            return
+        metrics.inc('hiking_requests_total', kind='parameter_change')
+        setattr(self, name, float(value[0]))
+        params = self._pipeline_params()
+        route_ids = [r['id'] for r in self.routes
+                     if r['id'] in self._route_results or r['id'] in self._route_pipelines]
+        sources = [self._route_pipelines.get(route_id) or self._route_uploads.get(route_id)
+                   for route_id in route_ids]
+        outcomes = await asyncio.gather(*(asyncio.to_thread(repredict_route, source, params)
+                                          for source in sources))
+        for route_id, (pipeline, results) in zip(route_ids, outcomes):
+            self._route_pipelines[route_id] = pipeline
+            # The upload is only needed until the route has a pipeline; if a re-prediction
+            # raised, the bytes are kept so the next change can rebuild it
+            self._route_uploads.pop(route_id, None)
+            self._store_route(route_id, results)
+
+    def toggle_ranking(self):
+        """Switch between shortest-first and longest-first ranking."""
+        self.longest_first = not self.longest_first
+
+    @rx.event(background=True)
+    async def clear_and_upload_new(self):
+        """Cancel any running analysis, clear results and upload new files."""
+        # Runs as a background task so it is not queued behind a running upload
+        for job_id in _upload_jobs.pop(self.router.session.client_token, []):
+            prediction_executor.cancel(job_id)
+
+        async with self:
+            self.uploaded_files = []
+            self.current_gpx_name = ""
+            self.routes = []
+            self._route_results = {}
+            self._route_charts = {}
+            self._chart_series = {}
+            self._route_uploads = {}
+            self._route_pipelines = {}
+            self.selected_route = ""
+            self.prediction_results = None
+            self.error_message = ""
+            self.is_loading = False
 
 
 def upload_page() -> rx.Component:
@@ -218,7 +505,7 @@ def upload_page() -> rx.Component:
         rx.card(
             rx.vstack(
                 rx.heading("Hiking Time Predictor", size="8"),
-                rx.text("Upload a GPX file to predict hiking time", color="gray"),
+                rx.text("Upload one or more GPX files to predict hiking times", color="gray"),
                 rx.callout(
                     rx.vstack(
                         rx.text("Supported file format:", weight="bold"),
@@ -235,7 +522,7 @@ def upload_page() -> rx.Component:
                 rx.upload(
                     rx.vstack(
                         rx.button(
-                            "Select GPX File",
+                            "Select GPX Files",
                             color_scheme="blue",
                             size="3",
                         ),
@@ -247,6 +534,7 @@ def upload_page() -> rx.Component:
                         spacing="2",
                     ),
                     id="upload1",
+                    multiple=True,
                     border="1px dashed #CBD5E0",
                     padding="2em",
                     width="100%",
@@ -261,13 +549,27 @@ def upload_page() -> rx.Component:
                         role="alert",
                     ),
                 ),
+                rx.cond(
+                    rx.selected_files("upload1").length() > 0,
+                    rx.text(rx.selected_files("upload1").length(), " file(s) selected", size="2", color="gray"),
+                ),
                 rx.button(
-                    "Analyze Route",
+                    "Analyze Routes",
                     on_click=State.handle_upload(rx.upload_files(upload_id="upload1")),
                     loading=State.is_loading,
                     width="100%",
                     size="3",
                 ),
+                rx.cond(
+                    State.is_loading,
+                    rx.button(
+                        "Cancel",
+                        on_click=State.clear_and_upload_new,
+                        variant="soft",
+                        color_scheme="gray",
+                        width="100%",
+                    ),
+                ),
                 spacing="4",
                 width="600px",
             ),
@@ -276,12 +578,206 @@ def upload_page() -> rx.Component:
     )
 
 
+def route_card(route: rx.Var) -> rx.Component:
+    """Summary card of one uploaded route; finished routes can be selected."""
+    return rx.card(
+        rx.vstack(
+            rx.text(route["name"], weight="bold", size="2"),
+            rx.match(
+                route["status"],
+                ("pending", rx.hstack(rx.spinner(size="1"), rx.text("Analyzing...", size="2", color="gray"))),
+                ("failed", rx.text(route["error"], size="2", color="red")),
+                rx.vstack(
+                    rx.heading(route["time"], size="6"),
+                    rx.text(route["distance"], " · ", route["gain"], " gain", size="2", color="gray"),
+                    spacing="1",
+                    align="start",
+                ),
+            ),
+            spacing="2",
+            align="start",
+        ),
+        on_click=State.select_route(route["id"]),
+        cursor=rx.cond(route["status"] == "done", "pointer", "default"),
+        width="240px",
+    )
+
+
+def comparison_table() -> rx.Component:
+    """Routes ranked by predicted time."""
+    return rx.card(
+        rx.vstack(
+            rx.hstack(
+                rx.heading("Route Comparison", size="6"),
+                rx.spacer(),
+                rx.button(
+                    rx.cond(State.longest_first, "Longest first", "Shortest first"),
+                    on_click=State.toggle_ranking,
+                    variant="soft",
+                    size="1",
+                ),
+                width="100%",
+            ),
+            rx.table.root(
+                rx.table.header(
+                    rx.table.row(
+                        rx.table.column_header_cell("Rank"),
+                        rx.table.column_header_cell("Route"),
+                        rx.table.column_header_cell("Predicted Time"),
+                        rx.table.column_header_cell("Distance"),
+                        rx.table.column_header_cell("Elevation Gain"),
+                        rx.table.column_header_cell("Avg Speed"),
+                    ),
+                ),
+                rx.table.body(
+                    rx.foreach(
+                        State.ranked_routes,
+                        lambda route: rx.table.row(
+                            rx.table.cell(route["rank"]),
+                            rx.table.cell(route["name"]),
+                            rx.table.cell(rx.match(
+                                route["status"],
+                                ("pending", rx.spinner(size="1")),
+                                ("failed", rx.text("Failed", color="red")),
+                                rx.text(route["time"]),
+                            )),
+                            rx.table.cell(route["distance"]),
+                            rx.table.cell(route["gain"]),
+                            rx.table.cell(route["speed"]),
+                            on_click=State.select_route(route["id"]),
+                            cursor="pointer",
+                        ),
+                    ),
+                ),
+                width="100%",
+            ),
+            width="100%",
+        ),
+        width="100%",
+    )
+
+
+def parameter_slider(label: str, name: str, value: rx.Var, unit: str,
+                     min_value: float, max_value: float, step: float) -> rx.Component:
+    """Slider for one adjustable pipeline parameter; routes are re-predicted on release."""
+    return rx.vstack(
+        rx.hstack(
+            rx.text(label, size="2"),
+            rx.spacer(),
+            rx.text(value, " ", unit, size="2", color="gray"),
+            width="100%",
+        ),
+        rx.slider(
+            default_value=value,
+            min=min_value,
+            max=max_value,
+            step=step,
+            disabled=State.is_loading,
+            on_value_commit=lambda v: State.update_parameter(name, v),
+            width="100%",
+        ),
+        width="100%",
+    )
+
+
+def parameters_card() -> rx.Component:
+    """What-if parameters applied to every uploaded route."""
+    return rx.card(
+        rx.hstack(
+            parameter_slider("Already walked before the start", "start_fatigue_hours",
+                             State.start_fatigue_hours, "h", 0, 8, 0.25),
+            parameter_slider("Elevation smoothing window", "smoothing_window_m",
+                             State.smoothing_window_m, "m", *PARAMETER_LIMITS['smoothing_window_m'], 10),
+            parameter_slider("Slope window", "slope_window_m",
+                             State.slope_window_m, "m", *PARAMETER_LIMITS['slope_window_m'], 10),
+            spacing="6",
+            width="100%",
+        ),
+        width="100%",
+    )
+
+
+def route_details() -> rx.Component:
+    """Summary and charts of the selected route."""
+    return rx.vstack(
+        rx.heading(State.current_gpx_name, size="8"),
+        # Summary cards
+        rx.hstack(
+            rx.card(
+                rx.vstack(
+                    rx.text("Predicted Time", size="2", color="gray"),
+                    rx.heading(
+                        State.formatted_time,
+                        size="7",
+                    ),
+                    rx.cond(
+                        State.formatted_time_range != "",
+                        rx.text(State.formatted_time_range, size="1", color="gray"),
+                    ),
+                    align="start",
+                ),
+            ),
+            rx.card(
+                rx.vstack(
+                    rx.text("Distance", size="2", color="gray"),
+                    rx.heading(
+                        State.formatted_distance,
+                        size="7",
+                    ),
+                    align="start",
+                ),
+            ),
+            rx.card(
+                rx.vstack(
+                    rx.text("Avg Speed", size="2", color="gray"),
+                    rx.heading(
+                        State.formatted_speed,
+                        size="7",
+                    ),
+                    align="start",
+                ),
+            ),
+            rx.card(
+                rx.vstack(
+                    rx.text("Elevation Gain", size="2", color="gray"),
+                    rx.heading(
+                        State.formatted_elevation_gain,
+                        size="7",
+                    ),
+                    align="start",
+                ),
+            ),
+            spacing="4",
+            width="100%",
+        ),
+        # Visualizations
+        rx.card(
+            rx.vstack(
+                rx.heading("Distance over Time", size="6"),
+                distance_time_chart(),
+                width="100%",
+            ),
+            width="100%",
+        ),
+        rx.card(
+            rx.vstack(
+                rx.heading("Speed and Elevation Profile", size="6"),
+                speed_elevation_chart(),
+                width="100%",
+            ),
+            width="100%",
+        ),
+        spacing="4",
+        width="100%",
+    )
+
+
 def prediction_view() -> rx.Component:
     """Prediction results view."""
     return rx.vstack(
         rx.hstack(
             rx.button(
-                "← Upload New Route",
+                "← Upload New Routes",
                 on_click=State.clear_and_upload_new,
                 variant="soft",
             ),
@@ -289,78 +785,24 @@ def prediction_view() -> rx.Component:
             width="100%",
             padding="4",
         ),
-        rx.heading(State.current_gpx_name, size="8"),
+        # Cards appear in upload order and fill in as each route finishes
+        rx.flex(
+            rx.foreach(State.routes, route_card),
+            wrap="wrap",
+            spacing="4",
+            width="100%",
+        ),
+        parameters_card(),
+        rx.cond(
+            State.routes.length() > 1,
+            comparison_table(),
+        ),
         rx.cond(
-            State.is_loading,
-            rx.spinner(size="3"),
+            State.prediction_results != None,
+            route_details(),
             rx.cond(
-                State.prediction_results != None,
-                rx.vstack(
-                    # Summary cards
-                    rx.hstack(
-                        rx.card(
-                            rx.vstack(
-                                rx.text("Predicted Time", size="2", color="gray"),
-                                rx.heading(
-                                    State.formatted_time,
-                                    size="7",
-                                ),
-                                align="start",
-                            ),
-                        ),
-                        rx.card(
-                            rx.vstack(
-                                rx.text("Distance", size="2", color="gray"),
-                                rx.heading(
-                                    State.formatted_distance,
-                                    size="7",
-                                ),
-                                align="start",
-                            ),
-                        ),
-                        rx.card(
-                            rx.vstack(
-                                rx.text("Avg Speed", size="2", color="gray"),
-                                rx.heading(
-                                    State.formatted_speed,
-                                    size="7",
-                                ),
-                                align="start",
-                            ),
-                        ),
-                        rx.card(
-                            rx.vstack(
-                                rx.text("Elevation Gain", size="2", color="gray"),
-                                rx.heading(
-                                    State.formatted_elevation_gain,
-                                    size="7",
-                                ),
-                                align="start",
-                            ),
-                        ),
-                        spacing="4",
-                        width="100%",
-                    ),
-                    # Visualizations
-                    rx.card(
-                        rx.vstack(
-                            rx.heading("Distance over Time", size="6"),
-                            distance_time_chart(),
-                            width="100%",
-                        ),
-                        width="100%",
-                    ),
-                    rx.card(
-                        rx.vstack(
-                            rx.heading("Speed and Elevation Profile", size="6"),
-                            speed_elevation_chart(),
-                            width="100%",
-                        ),
-                        width="100%",
-                    ),
-                    spacing="4",
-                    width="100%",
-                ),
+                State.is_loading,
+                rx.spinner(size="3"),
             ),
         ),
         spacing="4",
@@ -385,13 +827,31 @@ def index() -> rx.Component:
     """Main app component."""
     return rx.fragment(
         rx.cond(
-            State.prediction_results != None,
+            State.routes.length() > 0,
             prediction_view(),
             upload_page(),
         ),
     )
 
 
-# Create app
-app = rx.App()
+@contextlib.asynccontextmanager
+async def prediction_workers():
+    """Load the model in every worker at startup and stop the pool on shutdown."""
+    prediction_executor.warm_up()
+    # Parameter changes re-predict in the app process itself
+    asyncio.get_running_loop().run_in_executor(None, init_worker, str(MODEL_PATH), PIPELINE_PARAMS['inference'])
+    yield
+    prediction_executor.shutdown()
+
+
+async def metrics_endpoint(request):
+    """Prometheus scrape target."""
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
+
+# Create app; /metrics and /api/predict are served by the backend next to Reflex's own routes
+backend_routes = (([Route('/metrics', metrics_endpoint)] if METRICS_ENABLED else [])
+                  + (prediction_api.routes() if API_ENABLED else []))
+app = rx.App(api_transformer=Starlette(routes=backend_routes) if backend_routes else None)
 app.add_page(index, title="Hiking Time Predictor")
+app.register_lifespan_task(prediction_workers)
@@ -0,0 +1,180 @@
+"""
+Backend metrics in the Prometheus text exposition format.
+The app records request counts, prediction latencies and the pipeline
+diagnostics of every finished route; values owned by other objects (the
+prediction cache and executor counters) are read by collectors when the
+metrics are scraped, so they cost nothing between scrapes.
+
+    metrics = Metrics()
+    metrics.inc('hiking_requests_total', kind='upload')
+    metrics.observe('hiking_prediction_seconds', 0.42, source='worker')
+    text = metrics.render()
+"""
+
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds; stages take milliseconds, whole routes up to a minute
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Name, type and help text of the metrics the app records
+METRIC_HELP = {
+    'hiking_requests_total': ('counter', 'Upload and parameter-change requests handled'),
+    'hiking_routes_total': ('counter', 'Routes predicted, by source and outcome'),
+    'hiking_prediction_seconds': ('histogram', 'Time from request to prediction of one route'),
+    'hiking_stage_seconds': ('histogram', 'Time spent in each computed pipeline stage'),
+    'hiking_points_total': ('counter', 'Route points predicted, before densification'),
+    'hiking_segments_total': ('counter', 'Segments kept and predicted'),
+    'hiking_model_calls_total': ('counter', 'Calls to the speed model'),
+    'hiking_model_rows_total': ('counter', 'Feature rows predicted by the speed model'),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# A collector returns (name, type, help, labels, value) samples for render()
+Collector = Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metrics:
+    """Thread-safe counters and histograms rendered as Prometheus text."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+                 help_texts: Optional[Dict[str, Tuple[str, str]]] = None):
+        self.buckets = tuple(sorted(buckets))
+        self.help_texts = dict(METRIC_HELP if help_texts is None else help_texts)
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        # Per label set: [non-cumulative bucket counts..., +Inf count, sum]
+        self._histograms: Dict[str, Dict[Labels, List[float]]] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add value to a counter."""
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation in a histogram."""
+        key = _labels(labels)
+        # Index of the first bucket the value fits in (len(buckets) is +Inf)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            counts = series.get(key)
+            if counts is None:
+                counts = series[key] = [0.0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def add_collector(self, collector: Collector):
+        """Call collector on every render() for samples owned by other objects."""
+        self._collectors.append(collector)
+
+    def record_route(self, results: Dict, source: str, seconds: float) -> Dict:
+        """
+        Record one predicted route and strip its diagnostics.
+
+        Args:
+            results: Prediction results, with the optional 'diagnostics' block
+            source: Where the prediction came from ('cache', 'worker', 'repredict')
+            seconds: Latency of the prediction as seen by the app
+
+        Returns:
+            The results without the 'diagnostics' block
+        """
+        outcome = 'success' if results.get('success') else 'error'
+        self.inc('hiking_routes_total', source=source, outcome=outcome)
+        self.observe('hiking_prediction_seconds', seconds, source=source)
+        diagnostics = results.get('diagnostics')
+        if diagnostics is None:
+            return results
+        for stage, stage_s in diagnostics['stage_seconds'].items():
+            self.observe('hiking_stage_seconds', stage_s, stage=stage)
+        self.inc('hiking_points_total', diagnostics['points_in'])
+        self.inc('hiking_segments_total', diagnostics['segments'])
+        self.inc('hiking_model_calls_total', diagnostics['model_calls'])
+        self.inc('hiking_model_rows_total', diagnostics['model_rows'])
+        return {k: v for k, v in results.items() if k != 'diagnostics'}
+
+    def _header(self, lines: List[str], seen: set, name: str, kind: str, help_text: str):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {key: list(counts) for key, counts in series.items()}
+                          for name, series in self._histograms.items()}
+
+        lines: List[str] = []
+        seen: set = set()
+        for name, series in sorted(counters.items()):
+            kind, help_text = self.help_texts.get(name, ('counter', name))
+            self._header(lines, seen, name, kind, help_text)
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for name, series in sorted(histograms.items()):
+            kind, help_text = self.help_texts.get(name, ('histogram', name))
+            self._header(lines, seen, name, kind, help_text)
+            for key, counts in sorted(series.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = _format_labels(key + (('le', _format_value(bound)),))
+                    lines.append(f"{name}_bucket{le} {_format_value(cumulative)}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(counts[-1])}")
+                lines.append(f"{name}_count{_format_labels(key)} {_format_value(cumulative)}")
+
+        for collector in self._collectors:
+            for name, kind, help_text, labels, value in collector():
+                self._header(lines, seen, name, kind, help_text)
+                lines.append(f"{name}{_format_labels(_labels(labels))} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def cache_samples(stats: Dict[str, int]):
+    """Collector samples for PredictionCache.stats()."""
+    hits = stats['hits'] + stats['disk_hits']
+    lookups = hits + stats['misses']
+    return [
+        ('hiking_cache_hits_total', 'counter', 'Prediction cache hits served from memory', {}, stats['hits']),
+        ('hiking_cache_disk_hits_total', 'counter', 'Prediction cache hits served from disk', {},
+         stats['disk_hits']),
+        ('hiking_cache_misses_total', 'counter', 'Prediction cache misses', {}, stats['misses']),
+        ('hiking_cache_evictions_total', 'counter', 'Prediction cache evictions', {}, stats['evictions']),
+        ('hiking_cache_hit_ratio', 'gauge', 'Share of cache lookups that were hits', {},
+         hits / lookups if lookups else 0.0),
+        ('hiking_cache_entries', 'gauge', 'Predictions held in memory', {}, stats['entries']),
+        ('hiking_cache_bytes', 'gauge', 'Estimated memory held by cached predictions', {}, stats['bytes']),
+    ]
+
+
+def executor_samples(stats: Dict[str, int]):
+    """Collector samples for PredictionExecutor.stats()."""
+    samples = [('hiking_jobs_active', 'gauge', 'Prediction jobs queued or running', {}, stats['active'])]
+    samples += [('hiking_jobs_total', 'counter', 'Prediction jobs by outcome', {'outcome': outcome},
+                 stats[outcome]) for outcome in ('completed', 'failed', 'cancelled', 'timeouts', 'rejected')]
+    return samples
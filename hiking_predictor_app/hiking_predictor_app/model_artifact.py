@@ -0,0 +1,428 @@
+"""
+Compact, array-backed export of the gradient-boosting speed model.
+
+The trained GradientBoostingRegressor is flattened into a handful of node
+arrays stored uncompressed in an .npz file. Loading maps those arrays
+straight from the file, so it is fast, executes no pickled code and lets
+every worker process share the same read-only pages. Quantile models of the
+speed (see time_bands) are stored alongside as one stacked ensemble under
+band_* names.
+
+Export the bundled model with:
+    python -m hiking_predictor_app.model_artifact data/hiking_speed_model.pkl
+"""
+
+import os
+import threading
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .prediction_cache import model_fingerprint
+
+ARTIFACT_FORMAT_VERSION = 1
+
+_NODE_ARRAYS = ('children', 'feature', 'threshold', 'value')
+
+# Losses whose raw prediction is the model output (no link function)
+IDENTITY_LOSSES = ('squared_error', 'absolute_error', 'quantile')
+
+# Source fingerprints of artifacts, memoized per path with the artifact's (mtime, size)
+_sources: Dict[str, Tuple[Tuple[int, int], Optional[str]]] = {}
+_sources_lock = threading.Lock()
+
+
+class TreeEnsemble:
+    """
+    Gradient-boosted regression trees stored as flat node arrays.
+
+    Node indices are global across trees and tree t's root is roots[t].
+    children[node] holds the (left, right) child; leaves point to themselves
+    with threshold +inf, so walking max_depth levels from the roots lands
+    every row on a leaf. As in sklearn, splits compare float32 feature values
+    with float64 thresholds and a row goes left when its value is <= the
+    threshold.
+    """
+
+    def __init__(self, children: np.ndarray, feature: np.ndarray, threshold: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, max_depth: int, learning_rate: float,
+                 init_value: float, feature_cols: List[str]):
+        self.children = children
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.learning_rate = float(learning_rate)
+        self.init_value = float(init_value)
+        self.feature_cols = list(feature_cols)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict like GradientBoostingRegressor.predict.
+
+        Args:
+            X: Feature matrix (array or DataFrame) with columns in feature_cols order
+
+        Returns:
+            Array of predictions, one per row
+        """
+        from .model_utils import evaluate_tree_ensemble
+
+        return evaluate_tree_ensemble(self, X)
+
+
+class StackedTreeEnsemble(TreeEnsemble):
+    """
+    Several tree ensembles over the same features, evaluated in one pass.
+
+    The trees of output k are roots[output_starts[k]:output_starts[k + 1]],
+    with their own learning rate and initial value; predict() returns one
+    row of predictions per output.
+    """
+
+    def __init__(self, children: np.ndarray, feature: np.ndarray, threshold: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, max_depth: int, learning_rates: np.ndarray,
+                 init_values: np.ndarray, output_starts: np.ndarray, feature_cols: List[str]):
+        super().__init__(children, feature, threshold, value, roots, max_depth, learning_rate=1.0,
+                         init_value=0.0, feature_cols=feature_cols)
+        self.learning_rates = np.asarray(learning_rates, dtype=np.float64)
+        self.init_values = np.asarray(init_values, dtype=np.float64)
+        self.output_starts = np.asarray(output_starts, dtype=np.intp)
+
+    @property
+    def n_outputs(self) -> int:
+        return len(self.output_starts)
+
+
+def stack_ensembles(ensembles: List[TreeEnsemble]) -> StackedTreeEnsemble:
+    """
+    Stack tree ensembles over the same features into one.
+
+    Args:
+        ensembles: Ensembles with the same feature_cols
+
+    Returns:
+        StackedTreeEnsemble with one output per ensemble, in order
+    """
+    feature_cols = ensembles[0].feature_cols
+    if any(ensemble.feature_cols != feature_cols for ensemble in ensembles):
+        raise ValueError("Stacked ensembles must share their feature columns")
+    node_offsets = np.cumsum([0] + [len(ensemble.value) for ensemble in ensembles])
+    return StackedTreeEnsemble(
+        children=np.concatenate([e.children + offset for e, offset in zip(ensembles, node_offsets)]),
+        feature=np.concatenate([e.feature for e in ensembles]),
+        threshold=np.concatenate([e.threshold for e in ensembles]),
+        value=np.concatenate([e.value for e in ensembles]),
+        roots=np.concatenate([e.roots + offset for e, offset in zip(ensembles, node_offsets)]).astype(np.int32),
+        max_depth=max(e.max_depth for e in ensembles),
+        learning_rates=[e.learning_rate for e in ensembles],
+        init_values=[e.init_value for e in ensembles],
+        output_starts=np.cumsum([0] + [e.n_trees for e in ensembles[:-1]]),
+        feature_cols=feature_cols,
+    )
+
+
+def ensemble_from_sklearn(model, feature_cols: List[str]) -> TreeEnsemble:
+    """
+    Flatten a fitted single-output GradientBoostingRegressor.
+
+    Args:
+        model: Fitted sklearn GradientBoostingRegressor (squared error,
+               absolute error or quantile loss)
+        feature_cols: Feature names in model input order
+
+    Returns:
+        Equivalent TreeEnsemble
+
+    Raises:
+        TypeError: If the model is not a supported gradient-boosting regressor
+    """
+    from sklearn.dummy import DummyRegressor
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    if not isinstance(model, GradientBoostingRegressor):
+        raise TypeError(f"Cannot export {type(model).__name__}, expected GradientBoostingRegressor")
+    if model.loss not in IDENTITY_LOSSES or not isinstance(model.init_, DummyRegressor):
+        raise TypeError(f"Only {'/'.join(IDENTITY_LOSSES)} models with a constant initial prediction "
+                        "can be exported")
+
+    children, feature, threshold, value, roots = [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_[:, 0]:
+        tree = estimator.tree_
+        is_leaf = tree.children_left < 0
+        own = np.arange(tree.node_count) + offset
+        children.append(np.stack([np.where(is_leaf, own, tree.children_left + offset),
+                                  np.where(is_leaf, own, tree.children_right + offset)], axis=1))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        value.append(tree.value[:, 0, 0])
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += tree.node_count
+
+    return TreeEnsemble(
+        children=np.concatenate(children).astype(np.int32),
+        feature=np.concatenate(feature).astype(np.int32),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        value=np.concatenate(value).astype(np.float64),
+        roots=np.array(roots, dtype=np.int32),
+        max_depth=max_depth,
+        learning_rate=model.learning_rate,
+        init_value=float(np.ravel(model.init_.constant_)[0]),
+        feature_cols=feature_cols,
+    )
+
+
+def artifact_path_for(model_path: Union[str, os.PathLike]) -> Path:
+    """The .npz artifact path that sits next to a pickled model."""
+    return Path(model_path).with_suffix('.npz')
+
+
+def artifact_source(path: Union[str, os.PathLike]) -> Optional[str]:
+    """
+    Fingerprint of the pickle an artifact was exported from.
+
+    Only the small source_fingerprint member is read, once per version of the
+    artifact file.
+
+    Args:
+        path: Path to the .npz artifact
+
+    Returns:
+        prediction_cache.model_fingerprint of the source pickle, or None if
+        the artifact is missing, unreadable or was exported without one
+    """
+    path = str(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _sources_lock:
+        cached = _sources.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+    try:
+        with zipfile.ZipFile(path) as archive, archive.open('source_fingerprint.npy') as member:
+            source = str(np.lib.format.read_array(member))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        source = None
+
+    with _sources_lock:
+        _sources[path] = (version, source)
+    return source
+
+
+def preferred_model_path(model_path: Union[str, os.PathLike]) -> Path:
+    """
+    The artifact next to a pickled model if it was exported from that pickle, else the pickle.
+
+    The artifact records the fingerprint (content hash) of its source pickle,
+    so a pickle replaced with any timestamp is never shadowed by an artifact
+    of the previous model.
+
+    Args:
+        model_path: Path to the pickled model
+
+    Returns:
+        Path to load the model from
+    """
+    model_path = Path(model_path)
+    source = artifact_source(artifact_path_for(model_path))
+    try:
+        if source is not None and source == model_fingerprint(model_path):
+            return artifact_path_for(model_path)
+    except OSError:
+        pass
+    return model_path
+
+
+def export_model(model, feature_cols: List[str], path: Union[str, os.PathLike],
+                 quantile_models: Optional[Dict[float, object]] = None,
+                 source_fingerprint: Optional[str] = None) -> Path:
+    """
+    Write a model as an uncompressed .npz artifact.
+
+    Args:
+        model: Fitted GradientBoostingRegressor or TreeEnsemble
+        feature_cols: Feature names in model input order
+        path: Output .npz path
+        quantile_models: Speed quantile models to store with it, keyed by
+                         quantile (GradientBoostingRegressor or TreeEnsemble)
+        source_fingerprint: model_fingerprint of the pickle the model comes
+                            from; preferred_model_path only picks artifacts
+                            whose source matches the pickle next to them
+
+    Returns:
+        Path of the written artifact
+    """
+    ensemble = model if isinstance(model, TreeEnsemble) else ensemble_from_sklearn(model, feature_cols)
+    bands = {}
+    if quantile_models:
+        quantiles = sorted(quantile_models)
+        stacked = stack_ensembles([
+            m if isinstance(m, TreeEnsemble) else ensemble_from_sklearn(m, feature_cols)
+            for m in (quantile_models[q] for q in quantiles)])
+        bands = {
+            'band_quantiles': np.array(quantiles, dtype=np.float64),
+            'band_roots': stacked.roots,
+            'band_max_depth': np.int64(stacked.max_depth),
+            'band_learning_rates': stacked.learning_rates,
+            'band_init_values': stacked.init_values,
+            'band_output_starts': stacked.output_starts.astype(np.int64),
+            **{f"band_{name}": getattr(stacked, name) for name in _NODE_ARRAYS},
+        }
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+    # Uncompressed members can be memory-mapped directly by load_artifact
+    np.savez(
+        tmp_path,
+        format_version=np.int64(ARTIFACT_FORMAT_VERSION),
+        feature_cols=np.array(ensemble.feature_cols, dtype=str),
+        roots=ensemble.roots,
+        max_depth=np.int64(ensemble.max_depth),
+        learning_rate=np.float64(ensemble.learning_rate),
+        init_value=np.float64(ensemble.init_value),
+        **{name: getattr(ensemble, name) for name in _NODE_ARRAYS},
+        **bands,
+        **({'source_fingerprint': np.array(source_fingerprint)} if source_fingerprint else {}),
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+def _map_npz(path: Union[str, os.PathLike]) -> Dict[str, np.ndarray]:
+    """
+    Read an .npz file, memory-mapping every uncompressed array member.
+
+    np.load ignores mmap_mode for .npz archives, so the offset of each stored
+    .npy member is located through its zip local header instead.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+                continue
+
+            # Local file header: 30 fixed bytes, then the name and extra field
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(f.read(4), dtype='<u2')
+            f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+            if np.lib.format.read_magic(f) == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject or not shape:
+                f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+                arrays[name] = np.lib.format.read_array(f)
+            else:
+                mapped = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                   order='F' if fortran_order else 'C')
+                # Plain ndarray view of the mapping: no copy, no memmap overhead
+                arrays[name] = mapped.view(np.ndarray)
+    return arrays
+
+
+def load_artifact(path: Union[str, os.PathLike]) -> Tuple[Optional[TreeEnsemble], Optional[List[str]]]:
+    """
+    Load an .npz model artifact.
+
+    Args:
+        path: Path to the .npz artifact
+
+    Returns:
+        Tuple of (TreeEnsemble, feature_cols), or (None, None) on error
+    """
+    try:
+        arrays = _map_npz(path)
+        version = int(arrays['format_version'])
+        if version != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"unsupported artifact format version {version}")
+        feature_cols = [str(col) for col in arrays['feature_cols']]
+        ensemble = TreeEnsemble(
+            roots=arrays['roots'],
+            max_depth=int(arrays['max_depth']),
+            learning_rate=float(arrays['learning_rate']),
+            init_value=float(arrays['init_value']),
+            feature_cols=feature_cols,
+            **{name: arrays[name] for name in _NODE_ARRAYS},
+        )
+        return ensemble, feature_cols
+    except Exception as e:
+        print(f"Error loading model artifact: {e}")
+        return None, None
+
+
+def load_artifact_bands(path: Union[str, os.PathLike]) -> Tuple[Optional[np.ndarray],
+                                                                 Optional[StackedTreeEnsemble]]:
+    """
+    Load the speed quantile models stored in an .npz model artifact.
+
+    Args:
+        path: Path to the .npz artifact
+
+    Returns:
+        Tuple of (quantiles, StackedTreeEnsemble with one output per
+        quantile), or (None, None) if the artifact has none or on error
+    """
+    try:
+        arrays = _map_npz(path)
+        if 'band_quantiles' not in arrays:
+            return None, None
+        stacked = StackedTreeEnsemble(
+            roots=arrays['band_roots'],
+            max_depth=int(arrays['band_max_depth']),
+            learning_rates=arrays['band_learning_rates'],
+            init_values=arrays['band_init_values'],
+            output_starts=arrays['band_output_starts'],
+            feature_cols=[str(col) for col in arrays['feature_cols']],
+            **{name: arrays[f"band_{name}"] for name in _NODE_ARRAYS},
+        )
+        return np.asarray(arrays['band_quantiles'], dtype=np.float64), stacked
+    except Exception as e:
+        print(f"Error loading model artifact bands: {e}")
+        return None, None
+
+
+def main():
+    import argparse
+
+    from .model_utils import load_model
+    from .time_bands import load_quantile_models
+
+    parser = argparse.ArgumentParser(description="Export a pickled speed model as an .npz artifact")
+    parser.add_argument('model', type=Path, help='Pickled model file')
+    parser.add_argument('-o', '--output', type=Path, default=None,
+                        help='Output path (default: next to the model, with an .npz suffix)')
+    args = parser.parse_args()
+
+    model, feature_cols = load_model(str(args.model))
+    if model is None:
+        raise SystemExit(1)
+    try:
+        path = export_model(model, feature_cols, args.output or artifact_path_for(args.model),
+                            quantile_models=load_quantile_models(args.model),
+                            source_fingerprint=model_fingerprint(args.model))
+    except TypeError as e:
+        # e.g. a HistGradientBoostingRegressor from training --kind hgb: not an error, the
+        # workers load the pickle
+        print(f"Not exporting {args.model}: {e}. The app serves the pickle.")
+        return
+    print(f"Wrote {path} ({path.stat().st_size / 1024:.1f} KB)")
+
+
+if __name__ == '__main__':
+    main()
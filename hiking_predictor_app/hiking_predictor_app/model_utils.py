@@ -4,24 +4,34 @@ Loads and uses the trained model to predict hiking times.
 """
 
 import pickle
+import threading
+import time
+import warnings
+import weakref
 import numpy as np
 import pandas as pd
 from pathlib import Path
-from geopy.distance import geodesic
-from typing import Tuple, Dict, Optional
+from typing import Tuple, Dict, List, Optional, Union
 import gpxpy.gpx
 
+from .geodesy import cumulative_distances, densify, resample_profile
+from .gpx_reader import GPXPoints
+from .model_artifact import StackedTreeEnsemble, TreeEnsemble, ensemble_from_sklearn, load_artifact
+
 
 def load_model(model_path: str) -> Tuple[object, list]:
     """
     Load the trained hiking speed model.
 
     Args:
-        model_path: Path to the pickled model file
+        model_path: Path to the pickled model file, or to an .npz artifact
+                    written by model_artifact.export_model
 
     Returns:
         Tuple of (model, feature_columns)
     """
+    if str(model_path).endswith('.npz'):
+        return load_artifact(model_path)
     try:
         with open(model_path, 'rb') as f:
             model_data = pickle.load(f)
@@ -31,38 +41,62 @@ def load_model(model_path: str) -> Tuple[object, list]:
         return None, None
 
 
-def smooth_elevation(elevations: np.ndarray, distances: np.ndarray, window_m: float = 100.0) -> np.ndarray:
+def smooth_elevation(elevations: np.ndarray, distances: np.ndarray, window_m: float = 100.0,
+                     block_size: int = 1_000_000) -> np.ndarray:
     """
     Smooth elevation data using distance-based Gaussian weighting.
 
+    Every point is replaced by the Gaussian-weighted average (sigma = window_m / 3)
+    of all points whose cumulative distance lies within window_m of it. Because
+    distances are sorted, each window is bounded with np.searchsorted and the
+    weights are evaluated in vectorized blocks, so the cost is O(n log n) plus the
+    total window size instead of O(n^2).
+
     Args:
         elevations: Array of elevation values
-        distances: Array of cumulative distances
+        distances: Array of cumulative distances (non-decreasing)
         window_m: Distance window for smoothing in meters
+        block_size: Maximum number of (point, neighbour) pairs evaluated at once
 
     Returns:
         Smoothed elevation array
     """
+    elevations = np.asarray(elevations, dtype=float)
+    distances = np.asarray(distances, dtype=float)
+    n = len(elevations)
     smoothed = np.zeros_like(elevations)
-
-    for i in range(len(elevations)):
-        current_dist = distances[i]
-
-        # Find points within window
-        weights = []
-        values = []
-
-        for j in range(len(elevations)):
-            dist_diff = abs(distances[j] - current_dist)
-            if dist_diff <= window_m:
-                weight = np.exp(-(dist_diff**2) / (2 * (window_m/3)**2))
-                weights.append(weight)
-                values.append(elevations[j])
-
-        if weights:
-            smoothed[i] = np.average(values, weights=weights)
-        else:
-            smoothed[i] = elevations[i]
+    if n == 0:
+        return smoothed
+
+    # Candidate windows, widened by one point on each side; the exact
+    # |d_j - d_i| <= window_m test below decides membership.
+    lo = np.maximum(np.searchsorted(distances, distances - window_m, side='left') - 1, 0)
+    hi = np.minimum(np.searchsorted(distances, distances + window_m, side='right') + 1, n)
+    two_sigma_sq = 2 * (window_m / 3) ** 2
+
+    start = 0
+    while start < n:
+        # Grow the block while the padded (rows x widest window) matrix stays bounded
+        width = int(hi[start] - lo[start])
+        stop = start + 1
+        while stop < n:
+            width_next = max(width, int(hi[stop] - lo[stop]))
+            if (stop + 1 - start) * width_next > block_size:
+                break
+            width = width_next
+            stop += 1
+
+        offsets = np.arange(width)
+        idx = lo[start:stop, None] + offsets[None, :]
+        valid = idx < hi[start:stop, None]
+        idx = np.minimum(idx, n - 1)
+
+        dist_diff = np.abs(distances[idx] - distances[start:stop, None])
+        valid &= dist_diff <= window_m
+        weights = np.where(valid, np.exp(-(dist_diff ** 2) / two_sigma_sq), 0.0)
+
+        smoothed[start:stop] = (weights * elevations[idx]).sum(axis=1) / weights.sum(axis=1)
+        start = stop
 
     return smoothed
 
@@ -109,6 +143,78 @@ def calculate_slope_window(elevations_smoothed: np.ndarray, distances: np.ndarra
     return slope_percent
 
 
+def calculate_slopes(elevations_smoothed: np.ndarray, distances: np.ndarray,
+                     window_m: float = 100.0, indices: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Calculate the slope profile for many points at once.
+
+    Array version of calculate_slope_window with identical results: the
+    window endpoints are the nearest points at least window_m / 2 behind and
+    ahead, located with np.searchsorted instead of per-index scans.
+
+    Args:
+        elevations_smoothed: Smoothed elevation array
+        distances: Cumulative distance array (non-decreasing)
+        window_m: Distance window for slope calculation
+        indices: Point indices to evaluate (all points if None)
+
+    Returns:
+        Slope percentage per requested index
+    """
+    elevations_smoothed = np.asarray(elevations_smoothed, dtype=float)
+    distances = np.asarray(distances, dtype=float)
+    n = len(distances)
+    idx = np.arange(n) if indices is None else np.asarray(indices, dtype=np.intp)
+    if len(idx) == 0:
+        return np.zeros(0)
+    current = distances[idx]
+    half_window = window_m / 2
+
+    def behind(j):
+        # current - distances[j] >= half_window, evaluated exactly as the scalar version
+        return current - distances[np.clip(j, 0, n - 1)] >= half_window
+
+    def ahead(j):
+        return distances[np.clip(j, 0, n - 1)] - current >= half_window
+
+    # Points behind satisfying the condition form a prefix [0, last]; searchsorted
+    # gives its end up to rounding, which the loops correct.
+    last = np.searchsorted(distances, current - half_window, side='right') - 1
+    while True:
+        step = (last + 1 < n) & behind(last + 1)
+        last = last + step
+        if not step.any():
+            break
+    while True:
+        step = (last >= 0) & ~behind(last)
+        last = last - step
+        if not step.any():
+            break
+
+    # Points ahead satisfying the condition form a suffix [first, n - 1]
+    first = np.searchsorted(distances, current + half_window, side='left')
+    while True:
+        step = (first - 1 >= 0) & ahead(first - 1)
+        first = first - step
+        if not step.any():
+            break
+    while True:
+        step = (first < n) & ~ahead(first)
+        first = first + step
+        if not step.any():
+            break
+
+    back_idx = np.where((last >= 0) & (idx > 0), np.minimum(last, idx - 1), idx)
+    forward_idx = np.where((first < n) & (idx < n - 1), np.maximum(first, idx + 1), idx)
+
+    dist_span = distances[forward_idx] - distances[back_idx]
+    elev_span = elevations_smoothed[forward_idx] - elevations_smoothed[back_idx]
+    valid = (forward_idx != back_idx) & (dist_span > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = np.where(valid, elev_span / dist_span * 100, 0.0)
+    return slopes
+
+
 def prepare_features(slope: float, cumulative_hours: float) -> Dict[str, float]:
     """
     Prepare feature dictionary for model prediction.
@@ -133,113 +239,661 @@ def prepare_features(slope: float, cumulative_hours: float) -> Dict[str, float]:
     return features
 
 
-def predict_hike_time(gpx: gpxpy.gpx.GPX, model, feature_cols: list) -> Dict:
+def build_feature_matrix(slopes: np.ndarray, cumulative_hours: np.ndarray,
+                         feature_cols: list) -> np.ndarray:
     """
-    Predict hiking time for a GPX route.
+    Vectorized prepare_features for many segments at once.
 
     Args:
-        gpx: Parsed GPX object
-        model: Trained prediction model
-        feature_cols: List of feature column names
+        slopes: Slope percentage per segment
+        cumulative_hours: Cumulative hiking time in hours per segment
+        feature_cols: List of feature column names (defines column order)
 
     Returns:
-        Dictionary with prediction results
-    """
-    # Extract points from GPX (support both tracks and routes)
-    points = []
-
-    # Extract from tracks
-    for track in gpx.tracks:
-        for segment in track.segments:
-            for point in segment.points:
-                points.append({
-                    'latitude': point.latitude,
-                    'longitude': point.longitude,
-                    'elevation': point.elevation if point.elevation else 0,
-                })
-
-    # Extract from routes (if no tracks found)
-    if len(points) == 0:
-        for route in gpx.routes:
-            for point in route.points:
-                points.append({
-                    'latitude': point.latitude,
-                    'longitude': point.longitude,
-                    'elevation': point.elevation if point.elevation else 0,
-                })
-
-    if len(points) < 2:
-        return {
-            'success': False,
-            'error': 'Route has too few points'
-        }
+        Feature matrix of shape (n_segments, len(feature_cols))
+    """
+    slopes = np.asarray(slopes, dtype=float)
+    fatigue = np.broadcast_to(np.asarray(cumulative_hours, dtype=float), slopes.shape)
+    uphill = np.maximum(0, slopes)
+    downhill = np.abs(np.minimum(0, slopes))
+    columns = {
+        'slope': slopes,
+        'fatigue': fatigue,
+        'uphill': uphill,
+        'downhill': downhill,
+        'downhill_fatigue': downhill * fatigue,
+        'uphill_fatigue': uphill * fatigue,
+        'slope_squared': slopes ** 2,
+        'fatigue_squared': fatigue ** 2,
+    }
+    return np.column_stack([columns[col] for col in feature_cols])
+
+
+def evaluate_tree_ensemble(ensemble: TreeEnsemble, X, block_rows: int = 128) -> np.ndarray:
+    """
+    Evaluate boosted trees with NumPy, level by level across all rows.
+
+    Every (tree, row) pair keeps a current node; each step advances all of
+    them one level with a handful of array gathers, so the Python overhead is
+    max_depth iterations per block regardless of the number of trees. Rows
+    are processed in blocks so the (trees x rows) node arrays stay in cache.
+
+    Args:
+        ensemble: Flattened trees (see model_artifact.TreeEnsemble); a
+                  StackedTreeEnsemble evaluates all its outputs in the same pass
+        X: Feature matrix with columns in the ensemble's feature order
+        block_rows: Rows evaluated together
+
+    Returns:
+        Array of predictions, one per row; (outputs, rows) for a
+        StackedTreeEnsemble
+    """
+    # sklearn compares float32 features against float64 thresholds
+    X = np.asarray(X, dtype=np.float32)
+    children = ensemble.children.reshape(-1)
+    roots = ensemble.roots.astype(np.intp)
+    stacked = isinstance(ensemble, StackedTreeEnsemble)
+    predictions = np.empty((ensemble.n_outputs, len(X)) if stacked else len(X))
+
+    for start in range(0, len(X), block_rows):
+        block = X[start:start + block_rows]
+        n_rows = len(block)
+        columns = np.ascontiguousarray(block.T).ravel()
+        rows = np.arange(n_rows)
+
+        node = np.repeat(roots, n_rows).reshape(ensemble.n_trees, n_rows)
+        for _ in range(ensemble.max_depth):
+            # Flat index of each row's split feature in the feature-major columns
+            value_index = np.multiply(np.take(ensemble.feature, node), n_rows, dtype=np.intp)
+            value_index += rows
+            go_right = np.take(columns, value_index) > np.take(ensemble.threshold, node)
+            node *= 2
+            node += go_right
+            node = np.take(children, node)
+
+        leaves = np.take(ensemble.value, node)
+        if stacked:
+            predictions[:, start:start + n_rows] = np.add.reduceat(leaves, ensemble.output_starts, axis=0)
+        else:
+            predictions[start:start + n_rows] = leaves.sum(axis=0)
+
+    if stacked:
+        return ensemble.init_values[:, None] + ensemble.learning_rates[:, None] * predictions
+    return ensemble.init_value + ensemble.learning_rate * predictions
+
+
+# Flattened copies of sklearn models, or None for models that cannot be flattened
+_native_ensembles: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+# Up to this many rows the NumPy evaluator beats sklearn's per-call overhead;
+# above it sklearn's compiled tree traversal is faster
+NATIVE_MAX_ROWS = 32
+
+
+def native_ensemble(model) -> Optional[TreeEnsemble]:
+    """
+    The model as a TreeEnsemble, or None if it is not a supported ensemble.
 
-    # Calculate distances
-    distances = [0.0]
-    elevations = [points[0]['elevation']]
+    sklearn GradientBoostingRegressor models are flattened once and cached
+    for the model's lifetime.
+    """
+    if isinstance(model, TreeEnsemble):
+        return model
+    try:
+        return _native_ensembles[model]
+    except (KeyError, TypeError):
+        pass
+    try:
+        ensemble = ensemble_from_sklearn(model, list(getattr(model, 'feature_names_in_', [])))
+    except (TypeError, AttributeError, ValueError, ImportError):
+        ensemble = None
+    try:
+        _native_ensembles[model] = ensemble
+    except TypeError:
+        pass
+    return ensemble
 
-    for i in range(1, len(points)):
-        coord1 = (points[i-1]['latitude'], points[i-1]['longitude'])
-        coord2 = (points[i]['latitude'], points[i]['longitude'])
-        dist = geodesic(coord1, coord2).meters
-        distances.append(distances[-1] + dist)
-        elevations.append(points[i]['elevation'])
 
-    distances = np.array(distances)
-    elevations = np.array(elevations)
+# Model calls and predicted rows of the current thread, read by RoutePipeline diagnostics
+_model_usage = threading.local()
 
-    # Smooth elevations
-    elevations_smoothed = smooth_elevation(elevations, distances, window_m=100.0)
 
-    # Calculate predictions for each segment
-    segments = []
-    cumulative_time_hours = 0
+def count_model_call(rows: int):
+    """
+    Record one model call in the current thread's model_usage.
+
+    Code that evaluates the model without predict_raw calls this itself.
 
-    for i in range(len(points) - 1):
-        segment_distance_m = distances[i+1] - distances[i]
+    Args:
+        rows: Number of rows predicted by the call
+    """
+    _model_usage.calls = getattr(_model_usage, 'calls', 0) + 1
+    _model_usage.rows = getattr(_model_usage, 'rows', 0) + rows
 
-        if segment_distance_m < 1:
-            continue
 
-        # Calculate slope
-        slope_percent = calculate_slope_window(elevations_smoothed, distances, i, window_m=100.0)
+def model_usage() -> Tuple[int, int]:
+    """Model calls and predicted rows of the current thread so far."""
+    return getattr(_model_usage, 'calls', 0), getattr(_model_usage, 'rows', 0)
 
-        # Prepare features
-        features = prepare_features(slope_percent, cumulative_time_hours)
+
+def predict_raw(model, X: np.ndarray) -> np.ndarray:
+    """
+    Predict speeds for a raw feature matrix, without the 0.5 km/h floor.
+
+    Tree ensembles are evaluated by the NumPy tree evaluator when it applies;
+    every call is counted in model_usage.
+
+    Args:
+        model: Trained model (or a native tree ensemble)
+        X: Feature matrix with columns in feature_cols order
+
+    Returns:
+        Predicted speeds in km/h
+    """
+    count_model_call(len(X))
+    ensemble = native_ensemble(model)
+    if ensemble is not None and (ensemble is model or len(X) <= NATIVE_MAX_ROWS):
+        return evaluate_tree_ensemble(ensemble, X)
+    with warnings.catch_warnings():
+        # Models fitted on DataFrames warn about missing feature names on arrays
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        return model.predict(X)
+
+
+def _predict_speeds(model, X: np.ndarray) -> np.ndarray:
+    """Predict speeds from a raw feature matrix, applying the 0.5 km/h floor."""
+    return np.maximum(0.5, predict_raw(model, X))  # Minimum 0.5 km/h
+
+
+def _resolve_fatigue_sequential(slopes: np.ndarray, segment_km: np.ndarray, model,
+                                feature_cols: list, start_hours: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Original recurrence: one DataFrame and one model call per segment."""
+    speeds = np.zeros(len(slopes))
+    cumulative = np.zeros(len(slopes))
+    cumulative_time_hours = start_hours
+
+    for i in range(len(slopes)):
+        features = prepare_features(slopes[i], cumulative_time_hours)
         X = pd.DataFrame([features])[feature_cols]
 
-        # Predict speed
+        count_model_call(1)
         predicted_speed_kmh = model.predict(X)[0]
         predicted_speed_kmh = max(0.5, predicted_speed_kmh)  # Minimum 0.5 km/h
 
-        # Calculate time for this segment
-        segment_time_hours = (segment_distance_m / 1000) / predicted_speed_kmh
-
-        cumulative_time_hours += segment_time_hours
-
-        segments.append({
-            'distance_km': distances[i] / 1000,
-            'elevation_m': elevations_smoothed[i],
-            'slope_percent': slope_percent,
-            'predicted_speed_kmh': predicted_speed_kmh,
-            'cumulative_time_hours': cumulative_time_hours,
-            'cumulative_distance_km': distances[i] / 1000,
-        })
-
-    # Calculate summary statistics
-    total_distance_km = distances[-1] / 1000
-    total_time_hours = cumulative_time_hours
-    elevation_gain_m = sum(max(0, elevations_smoothed[i+1] - elevations_smoothed[i])
-                          for i in range(len(elevations_smoothed) - 1))
-    elevation_loss_m = sum(max(0, elevations_smoothed[i] - elevations_smoothed[i+1])
-                          for i in range(len(elevations_smoothed) - 1))
-
-    return {
-        'success': True,
-        'total_distance_km': total_distance_km,
-        'total_time_hours': total_time_hours,
-        'elevation_gain_m': elevation_gain_m,
-        'elevation_loss_m': elevation_loss_m,
-        'average_speed_kmh': total_distance_km / total_time_hours if total_time_hours > 0 else 0,
-        'segments': segments,
-    }
+        cumulative_time_hours += segment_km[i] / predicted_speed_kmh
+        speeds[i] = predicted_speed_kmh
+        cumulative[i] = cumulative_time_hours
+
+    return speeds, cumulative
+
+
+def _resolve_fatigue_batched(slopes: np.ndarray, segment_km: np.ndarray, model,
+                             feature_cols: list, chunk_size: int = 256, max_iterations: Optional[int] = None,
+                             start_hours: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resolve the fatigue recurrence by chunked fixed-point iteration.
+
+    Within a chunk, every segment is predicted in one model call using the
+    fatigue implied by the previous iteration's speeds. Segment k only depends
+    on segments before it, so each iteration settles at least one more segment
+    and a chunk reaches its fixed point, which is exactly the sequential
+    result, within chunk_size + 1 iterations (usually a dozen or so). A
+    max_iterations budget stops earlier and gives an approximate result.
+    Cumulative times start from start_hours.
+    """
+    n = len(slopes)
+    speeds = np.zeros(n)
+    cumulative = np.zeros(n)
+    offset = float(start_hours)
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        chunk_slopes = slopes[start:stop]
+        chunk_km = segment_km[start:stop]
+        fatigue = np.full(stop - start, offset)
+        budget = stop - start + 1 if max_iterations is None else max_iterations
+
+        for _ in range(budget):
+            chunk_speeds = _predict_speeds(model, build_feature_matrix(chunk_slopes, fatigue, feature_cols))
+            # Sequential accumulation from the chunk offset (cumsum adds in order)
+            chunk_cumulative = np.cumsum(np.concatenate(([offset], chunk_km / chunk_speeds)))
+            converged = np.array_equal(chunk_cumulative[:-1], fatigue)
+            fatigue = chunk_cumulative[:-1]
+            if converged:
+                break
+
+        speeds[start:stop] = chunk_speeds
+        cumulative[start:stop] = chunk_cumulative[1:]
+        offset = chunk_cumulative[-1]
+
+    return speeds, cumulative
+
+
+def _resolve_fatigue_surface(slopes: np.ndarray, segment_km: np.ndarray, surface, model,
+                             feature_cols: list, chunk_size: int = 256,
+                             start_hours: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resolve the fatigue recurrence on a speed surface.
+
+    Segments whose fatigue is past the end of the surface's fatigue range
+    (24 h by default) are resolved exactly on the model instead of being
+    clamped to the last grid row.
+    """
+    speeds, cumulative = surface.resolve(slopes, segment_km, start_hours=start_hours)
+    done = len(speeds)
+    if done == len(slopes):
+        return speeds, cumulative
+    offset = cumulative[-1] if done else float(start_hours)
+    rest_speeds, rest_cumulative = _resolve_fatigue_batched(slopes[done:], segment_km[done:], model, feature_cols,
+                                                            chunk_size=chunk_size, start_hours=offset)
+    return np.concatenate((speeds, rest_speeds)), np.concatenate((cumulative, rest_cumulative))
+
+
+INFERENCE_MODES = ('exact', 'batched', 'sequential', 'surface')
+
+
+def predict_segment_speeds(slopes: np.ndarray, segment_distances_m: np.ndarray, model,
+                           feature_cols: list, inference: str = 'exact',
+                           chunk_size: int = 256, max_iterations: int = 4,
+                           start_fatigue_hours: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Predict the speed of every segment, accounting for accumulated fatigue.
+
+    The fatigue feature of a segment is the predicted time of all segments
+    before it, so the predictions form a recurrence. Modes:
+        'exact': chunked fixed-point iteration on raw NumPy feature matrices,
+                 run until the fatigue values stop changing. The fixed point is
+                 the sequential recurrence, so results match 'sequential'.
+        'batched': same iteration capped at max_iterations model calls per
+                   chunk; bounded cost, approximate (typically within a few
+                   minutes over a full day).
+        'sequential': the original one-DataFrame-per-segment loop (reference).
+        'surface': the recurrence on a bilinear slope x fatigue surface
+                   sampled from the model once (see speed_surface); nearly
+                   free per segment, approximate between grid points.
+                   Segments past the surface's fatigue range (24 h) are
+                   resolved as in 'exact' rather than clamped to it.
+
+    Args:
+        slopes: Slope percentage per segment
+        segment_distances_m: Segment lengths in meters
+        model: Trained prediction model
+        feature_cols: List of feature column names
+        inference: One of INFERENCE_MODES
+        chunk_size: Segments predicted per model call in the iterative modes
+        max_iterations: Model calls per chunk in the 'batched' mode
+        start_fatigue_hours: Hours already walked before the route starts; the
+                             fatigue feature of every segment is offset by it
+
+    Returns:
+        Tuple of (predicted_speeds_kmh, cumulative_time_hours) per segment,
+        where the cumulative time includes the segment itself and counts from
+        the start of the route (the fatigue offset is not included)
+    """
+    slopes = np.asarray(slopes, dtype=float)
+    segment_km = np.asarray(segment_distances_m, dtype=float) / 1000
+
+    if inference == 'sequential':
+        speeds, cumulative = _resolve_fatigue_sequential(slopes, segment_km, model, feature_cols,
+                                                         start_hours=start_fatigue_hours)
+    elif inference == 'exact':
+        speeds, cumulative = _resolve_fatigue_batched(slopes, segment_km, model, feature_cols,
+                                                      chunk_size=chunk_size, start_hours=start_fatigue_hours)
+    elif inference == 'batched':
+        speeds, cumulative = _resolve_fatigue_batched(slopes, segment_km, model, feature_cols,
+                                                      chunk_size=chunk_size, max_iterations=max_iterations,
+                                                      start_hours=start_fatigue_hours)
+    elif inference == 'surface':
+        from .speed_surface import surface_for
+        speeds, cumulative = _resolve_fatigue_surface(slopes, segment_km, surface_for(model, feature_cols), model,
+                                                      feature_cols, chunk_size=chunk_size,
+                                                      start_hours=start_fatigue_hours)
+    else:
+        raise ValueError(f"Unknown inference mode {inference!r}, expected one of {INFERENCE_MODES}")
+
+    if start_fatigue_hours:
+        cumulative = cumulative - start_fatigue_hours
+    return speeds, cumulative
+
+
+def extract_points(gpx: Union[gpxpy.gpx.GPX, GPXPoints]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Extract coordinates and elevations from a GPX source.
+
+    Track points are used when present, otherwise route points. Missing
+    elevations are set to 0.
+
+    Args:
+        gpx: Parsed gpxpy GPX object or columnar GPXPoints from read_gpx
+
+    Returns:
+        Tuple of (latitudes, longitudes, elevations) arrays
+    """
+    if isinstance(gpx, GPXPoints):
+        elevations = np.nan_to_num(gpx.elevation, nan=0.0)
+        return gpx.latitude, gpx.longitude, elevations
+
+    points = [point for track in gpx.tracks for segment in track.segments for point in segment.points]
+    if len(points) == 0:
+        points = [point for route in gpx.routes for point in route.points]
+
+    latitudes = np.array([point.latitude for point in points], dtype=float)
+    longitudes = np.array([point.longitude for point in points], dtype=float)
+    elevations = np.array([point.elevation if point.elevation else 0 for point in points], dtype=float)
+    return latitudes, longitudes, elevations
+
+
+# Planned routes are densified to a point at least every ROUTE_SPACING_M meters,
+# close to the point spacing of the recorded tracks the model was trained on
+ROUTE_SPACING_M = 10.0
+
+SEGMENT_COLUMNS = ('distance_km', 'elevation_m', 'slope_percent', 'predicted_speed_kmh',
+                   'cumulative_time_hours', 'cumulative_distance_km')
+
+
+class SegmentTable:
+    """
+    Per-segment prediction results as parallel float64 arrays.
+
+    Columns are attributes named as in SEGMENT_COLUMNS. distance_km is the
+    distance at the start of the segment, the same values as
+    cumulative_distance_km, and shares its array. Indexing and iteration
+    return the per-segment dictionaries predict_hike_time used to build.
+    """
+
+    __slots__ = ('elevation_m', 'slope_percent', 'predicted_speed_kmh',
+                 'cumulative_time_hours', 'cumulative_distance_km')
+
+    def __init__(self, elevation_m, slope_percent, predicted_speed_kmh,
+                 cumulative_time_hours, cumulative_distance_km):
+        self.elevation_m = np.asarray(elevation_m, dtype=np.float64)
+        self.slope_percent = np.asarray(slope_percent, dtype=np.float64)
+        self.predicted_speed_kmh = np.asarray(predicted_speed_kmh, dtype=np.float64)
+        self.cumulative_time_hours = np.asarray(cumulative_time_hours, dtype=np.float64)
+        self.cumulative_distance_km = np.asarray(cumulative_distance_km, dtype=np.float64)
+
+    @property
+    def distance_km(self) -> np.ndarray:
+        return self.cumulative_distance_km
+
+    def column(self, name: str) -> np.ndarray:
+        """Return one column by name."""
+        if name not in SEGMENT_COLUMNS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __len__(self) -> int:
+        return len(self.cumulative_time_hours)
+
+    def __getitem__(self, index: int) -> Dict[str, float]:
+        """Segment dictionary, as in the former list-of-dicts results."""
+        return {name: float(getattr(self, name)[index]) for name in SEGMENT_COLUMNS}
+
+    def __iter__(self):
+        columns = [getattr(self, name).tolist() for name in SEGMENT_COLUMNS]
+        for values in zip(*columns):
+            yield dict(zip(SEGMENT_COLUMNS, values))
+
+    def to_dicts(self) -> List[Dict[str, float]]:
+        """All segments as a list of dictionaries."""
+        return list(self)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+
+class RoutePipeline:
+    """
+    predict_hike_time split into memoized stages for one route.
+
+    Stages run in order: points -> distances -> smoothed elevation -> profile
+    -> slopes -> speeds -> time bands (if requested). Each stage keeps its
+    last result together with the parameters it was computed from, so a
+    parameter change only recomputes the stages after the one it affects: a
+    new start fatigue re-runs the speed and band stages only, a new slope
+    window the slope, speed and band stages.
+
+    The points stage densifies planned routes (route points without track
+    points) with geodesy.densify. The profile stage can resample the
+    smoothed elevation profile of recorded tracks onto a fixed distance step
+    with geodesy.resample_profile, so slopes and speeds scale with the length
+    of the track rather than its GPS sampling rate.
+
+    Every computed stage is timed: timings holds the seconds spent in each
+    stage itself (not in the stages it pulled in), summed over recomputes.
+    """
+
+    def __init__(self, gpx: Union[gpxpy.gpx.GPX, GPXPoints]):
+        self.latitudes, self.longitudes, self.elevations = extract_points(gpx)
+        if isinstance(gpx, GPXPoints):
+            self.is_route = gpx.kind == 'route'
+        else:
+            self.is_route = not any(segment.points for track in gpx.tracks for segment in track.segments)
+        self._stages: Dict[str, Tuple[tuple, object]] = {}
+        self.computed: Dict[str, int] = {}
+        self.timings: Dict[str, float] = {}
+        # Time spent in stages computed by the stage being computed
+        self._nested_s = 0.0
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    def _stage(self, name: str, key: tuple, compute):
+        """Return the stage result for key, computing it only if key changed."""
+        cached = self._stages.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        outer_nested_s, self._nested_s = self._nested_s, 0.0
+        start = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - start
+        self.timings[name] = self.timings.get(name, 0.0) + elapsed - self._nested_s
+        self._nested_s = outer_nested_s + elapsed
+        self._stages[name] = (key, value)
+        self.computed[name] = self.computed.get(name, 0) + 1
+        return value
+
+    def points(self, route_spacing_m: Optional[float] = ROUTE_SPACING_M,
+               distance_method: str = 'vincenty') -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Latitudes, longitudes and elevations, densified for planned routes (None or 0: never)."""
+        if not (self.is_route and route_spacing_m):
+            return self.latitudes, self.longitudes, self.elevations
+        return self._stage('points', (route_spacing_m, distance_method), lambda: densify(
+            self.latitudes, self.longitudes, self.elevations, spacing_m=route_spacing_m,
+            method=distance_method))
+
+    def distances(self, distance_method: str = 'vincenty',
+                  route_spacing_m: Optional[float] = ROUTE_SPACING_M) -> np.ndarray:
+        """Cumulative distance of every point in meters."""
+        def compute():
+            latitudes, longitudes, _ = self.points(route_spacing_m, distance_method)
+            return cumulative_distances(latitudes, longitudes, method=distance_method)
+        return self._stage('distances', (distance_method, route_spacing_m), compute)
+
+    def smoothed(self, distance_method: str = 'vincenty', smoothing_window_m: float = 100.0,
+                 route_spacing_m: Optional[float] = ROUTE_SPACING_M) -> Tuple[np.ndarray, float, float]:
+        """Smoothed elevations with the elevation gain and loss they imply."""
+        def compute():
+            distances = self.distances(distance_method, route_spacing_m)
+            elevations = self.points(route_spacing_m, distance_method)[2]
+            elevations_smoothed = smooth_elevation(elevations, distances, window_m=smoothing_window_m)
+            # Sequential sums (cumsum adds in order) like the former per-point loop
+            steps = np.diff(elevations_smoothed)
+            elevation_gain_m = np.cumsum(np.maximum(steps, 0))[-1]
+            elevation_loss_m = np.cumsum(np.maximum(-steps, 0))[-1]
+            return elevations_smoothed, elevation_gain_m, elevation_loss_m
+        return self._stage('smoothed', (distance_method, smoothing_window_m, route_spacing_m), compute)
+
+    def profile(self, distance_method: str = 'vincenty', smoothing_window_m: float = 100.0,
+                route_spacing_m: Optional[float] = ROUTE_SPACING_M,
+                track_spacing_m: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Cumulative distances and smoothed elevations, resampled for recorded tracks (None or 0: never)."""
+        distances = self.distances(distance_method, route_spacing_m)
+        elevations_smoothed = self.smoothed(distance_method, smoothing_window_m, route_spacing_m)[0]
+        if self.is_route or not track_spacing_m:
+            return distances, elevations_smoothed
+        return self._stage('profile', (distance_method, smoothing_window_m, track_spacing_m),
+                           lambda: resample_profile(distances, elevations_smoothed, track_spacing_m))
+
+    def slopes(self, distance_method: str = 'vincenty', smoothing_window_m: float = 100.0,
+               slope_window_m: float = 100.0, route_spacing_m: Optional[float] = ROUTE_SPACING_M,
+               track_spacing_m: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices of the segments of at least 1 m and their slopes."""
+        def compute():
+            distances, elevations_smoothed = self.profile(distance_method, smoothing_window_m, route_spacing_m,
+                                                          track_spacing_m)
+            segment_indices = np.nonzero(np.diff(distances) >= 1)[0]
+            slopes = calculate_slopes(elevations_smoothed, distances, window_m=slope_window_m,
+                                      indices=segment_indices)
+            return segment_indices, slopes
+        return self._stage('slopes', (distance_method, smoothing_window_m, slope_window_m, route_spacing_m,
+                                      track_spacing_m), compute)
+
+    def speeds(self, model, feature_cols: list, inference: str = 'exact',
+               distance_method: str = 'vincenty', smoothing_window_m: float = 100.0,
+               slope_window_m: float = 100.0, start_fatigue_hours: float = 0.0,
+               route_spacing_m: Optional[float] = ROUTE_SPACING_M,
+               track_spacing_m: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Predicted speed and cumulative time of every segment."""
+        def compute():
+            distances = self.profile(distance_method, smoothing_window_m, route_spacing_m, track_spacing_m)[0]
+            segment_indices, slopes = self.slopes(distance_method, smoothing_window_m, slope_window_m,
+                                                  route_spacing_m, track_spacing_m)
+            return predict_segment_speeds(
+                slopes, distances[segment_indices + 1] - distances[segment_indices],
+                model, feature_cols, inference=inference, start_fatigue_hours=start_fatigue_hours,
+            )
+        key = (id(model), inference, distance_method, smoothing_window_m, slope_window_m, start_fatigue_hours,
+               route_spacing_m, track_spacing_m)
+        return self._stage('speeds', key, compute)
+
+    def bands(self, time_bands, model, feature_cols: list, inference: str = 'exact',
+              distance_method: str = 'vincenty', smoothing_window_m: float = 100.0,
+              slope_window_m: float = 100.0, start_fatigue_hours: float = 0.0,
+              route_spacing_m: Optional[float] = ROUTE_SPACING_M,
+              track_spacing_m: Optional[float] = None) -> Dict:
+        """Cumulative time curves of the speed quantiles (see time_bands.TimeBands.cumulative_times)."""
+        def compute():
+            distances = self.profile(distance_method, smoothing_window_m, route_spacing_m, track_spacing_m)[0]
+            segment_indices, slopes = self.slopes(distance_method, smoothing_window_m, slope_window_m,
+                                                  route_spacing_m, track_spacing_m)
+            cumulative_hours = self.speeds(model, feature_cols, inference, distance_method, smoothing_window_m,
+                                           slope_window_m, start_fatigue_hours, route_spacing_m,
+                                           track_spacing_m)[1]
+            segment_km = (distances[segment_indices + 1] - distances[segment_indices]) / 1000
+            return time_bands.cumulative_times(slopes, segment_km, cumulative_hours, start_fatigue_hours)
+        key = (id(time_bands), id(model), inference, distance_method, smoothing_window_m, slope_window_m,
+               start_fatigue_hours, route_spacing_m, track_spacing_m)
+        return self._stage('bands', key, compute)
+
+    def predict(self, model, feature_cols: list, inference: str = 'exact',
+                distance_method: str = 'vincenty', smoothing_window_m: float = 100.0,
+                slope_window_m: float = 100.0, start_fatigue_hours: float = 0.0,
+                route_spacing_m: Optional[float] = ROUTE_SPACING_M, track_spacing_m: Optional[float] = None,
+                time_bands=None, diagnostics: bool = False) -> Dict:
+        """Run the stages whose parameters changed and assemble the results (see predict_hike_time)."""
+        start = time.perf_counter()
+        timings_before = dict(self.timings)
+        usage_before = model_usage()
+        if len(self) < 2:
+            return {
+                'success': False,
+                'error': 'Route has too few points'
+            }
+
+        # Elevation gain and loss always come from the full-resolution profile
+        elevation_gain_m, elevation_loss_m = self.smoothed(distance_method, smoothing_window_m, route_spacing_m)[1:]
+        distances, elevations_smoothed = self.profile(distance_method, smoothing_window_m, route_spacing_m,
+                                                      track_spacing_m)
+        segment_indices, slopes = self.slopes(distance_method, smoothing_window_m, slope_window_m, route_spacing_m,
+                                              track_spacing_m)
+        speeds, cumulative_hours = self.speeds(model, feature_cols, inference, distance_method,
+                                               smoothing_window_m, slope_window_m, start_fatigue_hours,
+                                               route_spacing_m, track_spacing_m)
+
+        segments = SegmentTable(
+            elevation_m=elevations_smoothed[segment_indices],
+            slope_percent=slopes,
+            predicted_speed_kmh=speeds,
+            cumulative_time_hours=cumulative_hours,
+            cumulative_distance_km=distances[segment_indices] / 1000,
+        )
+
+        # Calculate summary statistics
+        total_distance_km = distances[-1] / 1000
+        total_time_hours = cumulative_hours[-1] if len(cumulative_hours) else 0
+
+        results = {
+            'success': True,
+            'total_distance_km': total_distance_km,
+            'total_time_hours': total_time_hours,
+            'elevation_gain_m': elevation_gain_m,
+            'elevation_loss_m': elevation_loss_m,
+            'average_speed_kmh': total_distance_km / total_time_hours if total_time_hours > 0 else 0,
+            'segments': segments,
+        }
+        if time_bands is not None and len(segments):
+            results['time_bands'] = self.bands(time_bands, model, feature_cols, inference, distance_method,
+                                               smoothing_window_m, slope_window_m, start_fatigue_hours,
+                                               route_spacing_m, track_spacing_m)
+        if diagnostics:
+            calls, rows = model_usage()
+            results['diagnostics'] = {
+                # Stages computed by this call; memoized stages are left out
+                'stage_seconds': {name: seconds - timings_before.get(name, 0.0)
+                                  for name, seconds in self.timings.items()
+                                  if seconds != timings_before.get(name)},
+                'total_seconds': time.perf_counter() - start,
+                'points_in': len(self),
+                # After densification or resampling
+                'points': len(distances),
+                'segments': len(segments),
+                'model_calls': calls - usage_before[0],
+                'model_rows': rows - usage_before[1],
+            }
+        return results
+
+
+def predict_hike_time(gpx: Union[gpxpy.gpx.GPX, GPXPoints], model, feature_cols: list,
+                      inference: str = 'exact', distance_method: str = 'vincenty',
+                      smoothing_window_m: float = 100.0, slope_window_m: float = 100.0,
+                      start_fatigue_hours: float = 0.0,
+                      route_spacing_m: Optional[float] = ROUTE_SPACING_M, track_spacing_m: Optional[float] = None,
+                      time_bands=None, diagnostics: bool = False) -> Dict:
+    """
+    Predict hiking time for a GPX route.
+
+    To re-predict one route with other parameters, keep a RoutePipeline
+    instead: it only recomputes the stages the changed parameters affect.
+
+    Args:
+        gpx: Parsed GPX object or GPXPoints from read_gpx
+        model: Trained prediction model
+        feature_cols: List of feature column names
+        inference: Fatigue resolution mode, see predict_segment_speeds
+        distance_method: Distance kernel, see geodesy.segment_distances
+        smoothing_window_m: Distance window for elevation smoothing
+        slope_window_m: Distance window for slope calculation
+        start_fatigue_hours: Hours already walked before the route starts
+        route_spacing_m: Densify planned routes to a point at least every
+                         route_spacing_m meters (None or 0: keep the waypoints)
+        track_spacing_m: Resample the smoothed profile of recorded tracks to a
+                         point every track_spacing_m meters before slopes and
+                         speeds are computed (None or 0: every point)
+        time_bands: time_bands.TimeBands of the model; adds 'time_bands', the
+                    cumulative time curves of its quantiles (None: no bands)
+        diagnostics: Add a 'diagnostics' dictionary to the results: seconds
+                     per computed stage and in total, points in and after
+                     densification or resampling, segments kept, model
+                     calls and rows
+
+    Returns:
+        Dictionary with prediction results; 'segments' is a SegmentTable
+    """
+    return RoutePipeline(gpx).predict(
+        model, feature_cols, inference=inference, distance_method=distance_method,
+        smoothing_window_m=smoothing_window_m, slope_window_m=slope_window_m,
+        start_fatigue_hours=start_fatigue_hours, route_spacing_m=route_spacing_m,
+        track_spacing_m=track_spacing_m, time_bands=time_bands, diagnostics=diagnostics,
+    )
@@ -0,0 +1,173 @@
+"""
+Content-addressed cache for route predictions.
+Keys combine a hash of the uploaded GPX bytes, a fingerprint of the model
+file and the pipeline parameters, so re-uploads of a popular route skip the
+whole parse/smooth/predict pipeline and a new model invalidates everything.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+# Bumped whenever the shape of predict_hike_time results changes, so entries
+# written by an older version (e.g. in HIKING_CACHE_DIR) are not served
+RESULT_FORMAT_VERSION = 2
+
+_fingerprints: Dict[str, Tuple[Tuple[int, int], str]] = {}
+_fingerprints_lock = threading.Lock()
+
+
+def model_fingerprint(model_path: Union[str, os.PathLike]) -> str:
+    """
+    SHA-256 of a model file's contents.
+
+    The hash is memoized per path and recomputed whenever the file's mtime or
+    size changes, so swapping the model file yields a new fingerprint.
+
+    Args:
+        model_path: Path to the model file
+
+    Returns:
+        Hex digest identifying the model version
+    """
+    path = str(model_path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _fingerprints_lock:
+        cached = _fingerprints.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    fingerprint = digest.hexdigest()
+
+    with _fingerprints_lock:
+        _fingerprints[path] = (version, fingerprint)
+    return fingerprint
+
+
+class PredictionCache:
+    """
+    Two-tier prediction cache: an in-process LRU bounded by entry count and
+    total bytes, plus an optional on-disk tier that survives restarts.
+
+    Results are stored pickled, so every hit returns a fresh copy that callers
+    may modify freely.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024,
+                 disk_dir: Optional[Union[str, os.PathLike]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(gpx_bytes: bytes, model_fingerprint: str, params: Dict) -> str:
+        """
+        Build the cache key for one prediction.
+
+        Args:
+            gpx_bytes: Raw uploaded GPX file
+            model_fingerprint: Fingerprint of the model used
+            params: Pipeline parameters passed to predict_hike_time
+
+        Returns:
+            Hex digest key
+        """
+        digest = hashlib.sha256()
+        digest.update(f"v{RESULT_FORMAT_VERSION}".encode())
+        digest.update(hashlib.sha256(gpx_bytes).digest())
+        digest.update(model_fingerprint.encode())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.pkl"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a copy of the cached result, or None on a miss."""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(payload)
+
+        if self.disk_dir is not None:
+            try:
+                payload = self._disk_path(key).read_bytes()
+                result = pickle.loads(payload)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+            else:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._insert(key, payload)
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, result: Dict):
+        """Store a result in memory and, if configured, on disk."""
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._insert(key, payload)
+
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp_path.write_bytes(payload)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Error writing prediction cache entry: {e}")
+
+    def _insert(self, key: str, payload: bytes):
+        """Insert under the lock, evicting least recently used entries."""
+        if len(payload) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = payload
+        self._bytes += len(payload)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop all in-memory entries (the disk tier is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and current memory usage."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
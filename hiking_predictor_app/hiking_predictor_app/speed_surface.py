@@ -0,0 +1,175 @@
+"""
+Precomputed slope x fatigue speed surface.
+
+All eight model features are functions of the slope and the cumulative
+hiking time (fatigue), so the model is a 2-D function. SpeedSurface samples
+it once on a regular grid and answers queries by bilinear interpolation.
+
+It has a predict(X) method taking the usual feature matrix, so it can stand
+in for the model anywhere, including the notebook's validation functions:
+
+    surface = SpeedSurface.from_model(model, feature_cols)
+    predicted_speeds_kmh = surface.predict(day_data[feature_cols])
+"""
+
+import weakref
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .model_utils import build_feature_matrix, predict_raw
+
+# Default grid: slope in percent, fatigue in hours
+SLOPE_RANGE = (-60.0, 60.0)
+SLOPE_STEP = 0.25
+FATIGUE_RANGE = (0.0, 24.0)
+FATIGUE_STEP = 0.05
+
+
+class SpeedSurface:
+    """
+    Model speeds sampled on a regular slope x fatigue grid.
+
+    Queries outside the grid are clamped to its edges, except that resolve()
+    stops where the fatigue leaves the grid. Like the model, predict()
+    returns raw speeds; the 0.5 km/h floor is applied by callers.
+    """
+
+    def __init__(self, grid: np.ndarray, slope_start: float, slope_step: float,
+                 fatigue_start: float, fatigue_step: float, feature_cols: List[str]):
+        self.grid = np.asarray(grid, dtype=np.float64)
+        self.slope_start = float(slope_start)
+        self.slope_step = float(slope_step)
+        self.fatigue_start = float(fatigue_start)
+        self.fatigue_step = float(fatigue_step)
+        self.feature_cols = list(feature_cols)
+        # Plain list for the per-segment recurrence, where NumPy scalars are slow
+        self._flat = self.grid.ravel().tolist()
+
+    @classmethod
+    def from_model(cls, model, feature_cols: List[str], slope_range: Tuple[float, float] = SLOPE_RANGE,
+                   slope_step: float = SLOPE_STEP, fatigue_range: Tuple[float, float] = FATIGUE_RANGE,
+                   fatigue_step: float = FATIGUE_STEP) -> 'SpeedSurface':
+        """
+        Sample a model on a slope x fatigue grid.
+
+        Args:
+            model: Trained prediction model
+            feature_cols: List of feature column names
+            slope_range: (min, max) slope in percent
+            slope_step: Grid spacing in slope percent
+            fatigue_range: (min, max) cumulative hours
+            fatigue_step: Grid spacing in hours
+
+        Returns:
+            SpeedSurface covering the given ranges
+        """
+        slopes = np.linspace(*slope_range, round((slope_range[1] - slope_range[0]) / slope_step) + 1)
+        fatigue = np.linspace(*fatigue_range, round((fatigue_range[1] - fatigue_range[0]) / fatigue_step) + 1)
+        slope_grid, fatigue_grid = np.meshgrid(slopes, fatigue, indexing='ij')
+        X = build_feature_matrix(slope_grid.ravel(), fatigue_grid.ravel(), feature_cols)
+        grid = predict_raw(model, X).reshape(slope_grid.shape)
+        return cls(grid, slopes[0], slopes[1] - slopes[0], fatigue[0], fatigue[1] - fatigue[0], feature_cols)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.grid.shape
+
+    def speed(self, slopes, fatigue) -> np.ndarray:
+        """
+        Interpolated model speed for arrays of slopes and cumulative hours.
+
+        Args:
+            slopes: Slope percentage per segment
+            fatigue: Cumulative hiking time in hours per segment
+
+        Returns:
+            Array of speeds in km/h
+        """
+        n_slopes, n_fatigue = self.grid.shape
+        s = np.clip((np.asarray(slopes, dtype=float) - self.slope_start) / self.slope_step, 0, n_slopes - 1)
+        f = np.clip((np.asarray(fatigue, dtype=float) - self.fatigue_start) / self.fatigue_step, 0, n_fatigue - 1)
+        i = np.minimum(s.astype(np.intp), n_slopes - 2)
+        j = np.minimum(f.astype(np.intp), n_fatigue - 2)
+        t = s - i
+        u = f - j
+        g = self.grid
+        return ((1 - t) * ((1 - u) * g[i, j] + u * g[i, j + 1])
+                + t * ((1 - u) * g[i + 1, j] + u * g[i + 1, j + 1]))
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Drop-in replacement for model.predict on a feature matrix.
+
+        Args:
+            X: Feature matrix (array or DataFrame) with columns in feature_cols order
+
+        Returns:
+            Array of interpolated speeds, one per row
+        """
+        X = np.asarray(X, dtype=float)
+        return self.speed(X[:, self.feature_cols.index('slope')], X[:, self.feature_cols.index('fatigue')])
+
+    def resolve(self, slopes, segment_km, start_hours: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run the fatigue recurrence segment by segment on the surface.
+
+        The recurrence stops before the first segment whose fatigue is past
+        the end of the grid rather than clamping it, so a route longer than
+        the fatigue range returns fewer values than it has segments; the
+        caller finishes the rest on the model.
+
+        Args:
+            slopes: Slope percentage per segment
+            segment_km: Segment lengths in km
+            start_hours: Fatigue (hours) before the first segment
+
+        Returns:
+            Tuple of (predicted_speeds_kmh, cumulative_time_hours) per resolved
+            segment, where the cumulative time starts from start_hours
+        """
+        flat = self._flat
+        n_slopes, n_fatigue = self.grid.shape
+        s_max, f_max = n_slopes - 1, n_fatigue - 1
+        s0, ds = self.slope_start, self.slope_step
+        f0, df = self.fatigue_start, self.fatigue_step
+
+        speeds = []
+        cumulative = []
+        hours = float(start_hours)
+        for slope, km in zip(np.asarray(slopes, dtype=float).tolist(),
+                             np.asarray(segment_km, dtype=float).tolist()):
+            f = (hours - f0) / df
+            if f > f_max:
+                break
+            s = min(max((slope - s0) / ds, 0.0), s_max)
+            f = max(f, 0.0)
+            i = min(int(s), s_max - 1)
+            j = min(int(f), f_max - 1)
+            t = s - i
+            u = f - j
+            k = i * n_fatigue + j
+            speed = ((1 - t) * ((1 - u) * flat[k] + u * flat[k + 1])
+                     + t * ((1 - u) * flat[k + n_fatigue] + u * flat[k + n_fatigue + 1]))
+            speed = max(0.5, speed)  # Minimum 0.5 km/h
+            hours += km / speed
+            speeds.append(speed)
+            cumulative.append(hours)
+        return np.array(speeds), np.array(cumulative)
+
+
+_surfaces: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def surface_for(model, feature_cols: List[str]) -> SpeedSurface:
+    """
+    The default-grid surface of a model, built on first use and cached for
+    the model's lifetime. A SpeedSurface is returned unchanged.
+    """
+    if isinstance(model, SpeedSurface):
+        return model
+    surface: Optional[SpeedSurface] = _surfaces.get(model)
+    if surface is None or surface.feature_cols != list(feature_cols):
+        surface = SpeedSurface.from_model(model, feature_cols)
+        _surfaces[model] = surface
+    return surface
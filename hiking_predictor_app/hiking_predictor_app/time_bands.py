@@ -0,0 +1,140 @@
+"""
+Uncertainty bands of the predicted hiking time from quantile models of the speed.
+
+Training can fit quantile models of the segment speed next to the main
+model (e.g. the 10th, 50th and 90th percentile, see training.train_model);
+they are stored in the model pickle under 'quantile_models' and in the .npz
+artifact as one stacked tree ensemble. After the main prediction, every
+quantile model predicts every segment from one shared feature matrix (the
+slopes and the fatigue of the main prediction) in a single pass, and the
+segment times are accumulated into one cumulative time curve per quantile:
+
+    bands = load_time_bands('data/hiking_speed_model.npz')
+    results = predict_hike_time(gpx, model, feature_cols, time_bands=bands)
+    results['time_bands']['cumulative_time_hours']  # (quantiles, segments)
+
+Summing per-segment quantiles treats the errors of a hike as fully
+correlated (a slow hiker is slow all day), so the bands are wide rather
+than the narrow ones independent segments would give.
+"""
+
+import os
+import pickle
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .model_artifact import StackedTreeEnsemble, load_artifact_bands, stack_ensembles
+from .model_utils import (NATIVE_MAX_ROWS, build_feature_matrix, count_model_call, evaluate_tree_ensemble,
+                          native_ensemble, predict_raw)
+
+# Quantiles training fits by default: an optimistic, a median and a pessimistic time
+DEFAULT_QUANTILES = (0.1, 0.5, 0.9)
+
+
+class TimeBands:
+    """
+    Speed quantile models evaluated together.
+
+    Args:
+        quantiles: Speed quantile of each model, increasing
+        models: One fitted model per quantile, or a StackedTreeEnsemble with
+                one output per quantile
+        feature_cols: Feature names in model input order
+    """
+
+    def __init__(self, quantiles: Sequence[float], models: Union[List, StackedTreeEnsemble],
+                 feature_cols: List[str]):
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+        self.feature_cols = list(feature_cols)
+        self.models = models
+        if isinstance(models, StackedTreeEnsemble):
+            self._stacked = models
+        else:
+            ensembles = [native_ensemble(model) for model in models]
+            self._stacked = None if any(e is None for e in ensembles) else stack_ensembles(ensembles)
+
+    def __len__(self) -> int:
+        return len(self.quantiles)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Raw speed predictions of every quantile model for one feature matrix.
+
+        Flattened ensembles are evaluated in one stacked pass when they come
+        from the artifact or the batch is small; otherwise each sklearn model
+        predicts the same matrix.
+
+        Returns:
+            Array of shape (quantiles, rows)
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if self._stacked is not None and (self._stacked is self.models or len(X) <= NATIVE_MAX_ROWS):
+            count_model_call(len(X))
+            return evaluate_tree_ensemble(self._stacked, X)
+        return np.stack([predict_raw(model, X) for model in self.models])
+
+    def cumulative_times(self, slopes: np.ndarray, segment_km: np.ndarray, cumulative_hours: np.ndarray,
+                         start_fatigue_hours: float = 0.0) -> Dict:
+        """
+        Cumulative time curves of the quantiles along a predicted route.
+
+        Args:
+            slopes: Slope percentage per segment
+            segment_km: Segment lengths in kilometers
+            cumulative_hours: Cumulative time of the main prediction (see
+                              predict_segment_speeds), which sets the fatigue
+                              feature of every quantile model
+            start_fatigue_hours: Hours already walked before the route starts
+
+        Returns:
+            Dictionary with 'quantiles', the time quantile of each curve
+            (one minus the speed quantile, increasing), and
+            'cumulative_time_hours', an array of shape (quantiles, segments)
+            ordered from the fastest to the slowest curve
+        """
+        fatigue = start_fatigue_hours + np.concatenate(([0.0], cumulative_hours[:-1]))
+        speeds = np.maximum(self.predict(build_feature_matrix(slopes, fatigue, self.feature_cols)), 0.5)
+        # Independently fitted quantiles can cross; sorting per segment keeps the curves ordered
+        speeds = -np.sort(-speeds, axis=0)
+        return {
+            'quantiles': np.round(1 - self.quantiles[::-1], 6).tolist(),
+            'cumulative_time_hours': np.cumsum(segment_km / speeds, axis=1),
+        }
+
+
+def _read_model_pickle(model_path: Union[str, os.PathLike]) -> Optional[Dict]:
+    try:
+        with open(model_path, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"Error loading quantile models: {e}")
+        return None
+
+
+def load_quantile_models(model_path: Union[str, os.PathLike]) -> Optional[Dict[float, object]]:
+    """The {quantile: model} dictionary of a model pickle, or None if it has none."""
+    model_data = _read_model_pickle(model_path)
+    return (model_data or {}).get('quantile_models') or None
+
+
+def load_time_bands(model_path: Union[str, os.PathLike]) -> Optional[TimeBands]:
+    """
+    Load the speed quantile models stored with a model.
+
+    Args:
+        model_path: Model pickle, or .npz artifact written by
+                    model_artifact.export_model
+
+    Returns:
+        TimeBands, or None if the model has no quantile models
+    """
+    if str(model_path).endswith('.npz'):
+        quantiles, stacked = load_artifact_bands(model_path)
+        return None if stacked is None else TimeBands(quantiles, stacked, stacked.feature_cols)
+    model_data = _read_model_pickle(model_path) or {}
+    quantile_models = model_data.get('quantile_models')
+    if not quantile_models:
+        return None
+    quantiles = sorted(quantile_models)
+    return TimeBands(quantiles, [quantile_models[q] for q in quantiles], model_data['feature_cols'])
@@ -0,0 +1,384 @@
+"""
+Training of the hiking speed model, with a choice of estimator and a
+cross-validated hyperparameter search.
+
+'gbr' is the notebook's GradientBoostingRegressor; 'hgb' is sklearn's
+HistGradientBoostingRegressor, which bins the features once and trains in
+a fraction of the time on large archives. Segments are split and
+cross-validated by hike (track_name), so the segments of one hike are never
+both trained on and scored. Search candidates and folds run in parallel on
+every core.
+
+Every trained model is reported with its accuracy on held-out hikes, its
+training wall time and its prediction latency, and saved in the
+{'model', 'feature_cols'} pickle load_model reads. With --quantiles, quantile
+models of the speed are fitted with the same parameters and stored with it
+under 'quantile_models' for the time uncertainty bands (time_bands):
+
+    python -m hiking_predictor_app.training gaiagps_tracks/ -o data/hiking_speed_model.pkl --kind gbr hgb --search
+    python -m hiking_predictor_app.training gaiagps_tracks/ -o data/hiking_speed_model.pkl --quantiles 0.1 0.5 0.9
+
+Only 'gbr' models (and their quantile models) can be exported as .npz
+artifacts; model_artifact skips 'hgb' models, which the app serves from the
+pickle.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
+from sklearn.metrics import mean_absolute_percentage_error, r2_score
+from sklearn.model_selection import GridSearchCV, GroupKFold, GroupShuffleSplit, RandomizedSearchCV
+
+from .batch_predict import find_gpx_files
+from .time_bands import DEFAULT_QUANTILES
+from .training_data import FEATURE_COLUMNS, track_segments
+
+# Segments of one hike share this value and stay on the same side of every split
+HIKE_COLUMN = 'track_name'
+TARGET_COLUMN = 'speed_kmh'
+
+# Estimators and their default parameters ('gbr' is the notebook's model)
+MODEL_KINDS = {
+    'gbr': (GradientBoostingRegressor,
+            {'n_estimators': 200, 'max_depth': 5, 'learning_rate': 0.05, 'random_state': 42}),
+    'hgb': (HistGradientBoostingRegressor,
+            {'max_iter': 200, 'max_leaf_nodes': 31, 'learning_rate': 0.05, 'early_stopping': False,
+             'random_state': 42}),
+}
+
+# Hyperparameter search spaces
+PARAM_GRIDS = {
+    'gbr': {'n_estimators': [100, 200, 400], 'max_depth': [3, 5, 7], 'learning_rate': [0.03, 0.05, 0.1]},
+    'hgb': {'max_iter': [200, 400], 'max_leaf_nodes': [15, 31, 63], 'learning_rate': [0.05, 0.1],
+            'min_samples_leaf': [20, 100]},
+}
+
+# Parameter selecting the quantile loss of each kind, and the quantile it is fitted for
+QUANTILE_PARAMS = {
+    'gbr': lambda q: {'loss': 'quantile', 'alpha': q},
+    'hgb': lambda q: {'loss': 'quantile', 'quantile': q},
+}
+
+# Rows of the batch the per-row prediction latency is measured on
+LATENCY_ROWS = 10_000
+
+
+def make_model(kind: str, **params):
+    """
+    An unfitted estimator of the given kind.
+
+    Args:
+        kind: Key of MODEL_KINDS
+        **params: Parameters overriding the kind's defaults
+
+    Returns:
+        sklearn regressor
+    """
+    try:
+        estimator, defaults = MODEL_KINDS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown model kind {kind!r}, expected one of {list(MODEL_KINDS)}")
+    return estimator(**{**defaults, **params})
+
+
+def split_hikes(segments: pd.DataFrame, test_size: float = 0.2,
+                random_state: int = 42) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Split segments into training and test sets of whole hikes.
+
+    Args:
+        segments: DataFrame from training_data.prepare_features
+        test_size: Fraction of the hikes held out
+        random_state: Seed of the split
+
+    Returns:
+        Tuple of (training segments, test segments)
+
+    Raises:
+        ValueError: With fewer than two hikes
+    """
+    if segments[HIKE_COLUMN].nunique() < 2:
+        raise ValueError("At least two hikes are needed to hold some out")
+    splitter = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+    train_rows, test_rows = next(splitter.split(segments, groups=segments[HIKE_COLUMN]))
+    return segments.iloc[train_rows], segments.iloc[test_rows]
+
+
+def search_params(segments: pd.DataFrame, kind: str, feature_cols: List[str] = FEATURE_COLUMNS,
+                  param_grid: Optional[Dict[str, list]] = None, n_splits: int = 5,
+                  n_iter: Optional[int] = None, n_jobs: int = -1,
+                  random_state: int = 42) -> Tuple[Dict, pd.DataFrame]:
+    """
+    Cross-validated hyperparameter search, folds split by hike.
+
+    Candidates and folds are fitted in parallel by n_jobs processes. The
+    score is the mean absolute percentage error on the held-out fold.
+
+    Args:
+        segments: Training segments (features, speed_kmh and track_name)
+        kind: Key of MODEL_KINDS
+        feature_cols: Feature columns to train on
+        param_grid: Search space (PARAM_GRIDS[kind] by default)
+        n_splits: Folds, at most one per hike
+        n_iter: Sample this many candidates instead of trying the whole grid
+        n_jobs: Parallel processes (-1: every core)
+        random_state: Seed of the candidate sampling
+
+    Returns:
+        Tuple of (best parameters, one row per candidate with its params,
+        cv_mape_pct and fit_seconds, best first)
+
+    Raises:
+        ValueError: With fewer than two hikes
+    """
+    n_hikes = segments[HIKE_COLUMN].nunique()
+    if n_hikes < 2:
+        raise ValueError("At least two hikes are needed for cross-validation")
+    param_grid = param_grid or PARAM_GRIDS[kind]
+    common = dict(scoring='neg_mean_absolute_percentage_error', cv=GroupKFold(n_splits=min(n_splits, n_hikes)),
+                  n_jobs=n_jobs, refit=False)
+    if n_iter is None:
+        search = GridSearchCV(make_model(kind), param_grid, **common)
+    else:
+        search = RandomizedSearchCV(make_model(kind), param_grid, n_iter=n_iter, random_state=random_state,
+                                    **common)
+    search.fit(segments[feature_cols], segments[TARGET_COLUMN], groups=segments[HIKE_COLUMN])
+
+    results = pd.DataFrame({
+        'params': search.cv_results_['params'],
+        'cv_mape_pct': -search.cv_results_['mean_test_score'] * 100,
+        'fit_seconds': search.cv_results_['mean_fit_time'],
+    }).sort_values('cv_mape_pct', kind='stable').reset_index(drop=True)
+    return search.best_params_, results
+
+
+def prediction_latency(model, X: pd.DataFrame, repeat: int = 5) -> Dict[str, float]:
+    """
+    Prediction latency of a fitted model (best of repeat runs).
+
+    Returns:
+        Dictionary with us_per_row, on a batch of up to LATENCY_ROWS rows,
+        and single_row_ms, one call with one row (the per-call overhead)
+    """
+    X = X.iloc[:LATENCY_ROWS]
+    batch, single = float('inf'), float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict(X)
+        batch = min(batch, time.perf_counter() - start)
+        start = time.perf_counter()
+        model.predict(X.iloc[:1])
+        single = min(single, time.perf_counter() - start)
+    return {'us_per_row': batch / len(X) * 1e6, 'single_row_ms': single * 1e3}
+
+
+def fit_quantile_models(segments: pd.DataFrame, kind: str, quantiles: Sequence[float],
+                        feature_cols: List[str] = FEATURE_COLUMNS,
+                        params: Optional[Dict] = None) -> Dict[float, object]:
+    """
+    Fit one quantile-loss model of the speed per quantile.
+
+    Args:
+        segments: Training segments
+        kind: Key of MODEL_KINDS
+        quantiles: Speed quantiles in (0, 1)
+        feature_cols: Feature columns to train on
+        params: Parameters overriding the kind's defaults (e.g. the main model's)
+
+    Returns:
+        Dictionary of {quantile: fitted model}
+    """
+    if any(not 0 < q < 1 for q in quantiles):
+        raise ValueError(f"Quantiles must lie strictly between 0 and 1, got {list(quantiles)}")
+    models = {}
+    for q in sorted(set(quantiles)):
+        model = make_model(kind, **{**(params or {}), **QUANTILE_PARAMS[kind](q)})
+        models[float(q)] = model.fit(segments[feature_cols], segments[TARGET_COLUMN])
+    return models
+
+
+def train_model(segments: pd.DataFrame, kind: str = 'gbr', feature_cols: List[str] = FEATURE_COLUMNS,
+                params: Optional[Dict] = None, search: bool = False, search_iter: Optional[int] = None,
+                n_jobs: int = -1, test_size: float = 0.2, random_state: int = 42) -> Tuple[object, Dict]:
+    """
+    Train a speed model on whole hikes and report its accuracy and speed.
+
+    A test set of hikes is held out; with search, the parameters are first
+    chosen by a cross-validated search on the training hikes.
+
+    Args:
+        segments: DataFrame from training_data.prepare_features
+        kind: Key of MODEL_KINDS
+        feature_cols: Feature columns to train on
+        params: Parameters overriding the kind's defaults (and the search)
+        search: Run search_params on the training hikes first
+        search_iter: Candidates sampled by the search (None: the whole grid)
+        n_jobs: Parallel processes of the search (-1: every core)
+        test_size: Fraction of the hikes held out
+        random_state: Seed of the split and the search
+
+    Returns:
+        Tuple of (model fitted on the training hikes, report dictionary with
+        the parameters, row and hike counts, search_seconds, fit_seconds,
+        train/test MAPE (%) and R², and the prediction latency)
+    """
+    train, test = split_hikes(segments, test_size=test_size, random_state=random_state)
+    report = {'kind': kind, 'train_rows': len(train), 'test_rows': len(test),
+              'train_hikes': int(train[HIKE_COLUMN].nunique()), 'test_hikes': int(test[HIKE_COLUMN].nunique())}
+
+    chosen = {}
+    if search:
+        start = time.perf_counter()
+        chosen, candidates = search_params(train, kind, feature_cols, n_iter=search_iter, n_jobs=n_jobs,
+                                           random_state=random_state)
+        report['search_seconds'] = time.perf_counter() - start
+        report['search_candidates'] = len(candidates)
+        report['cv_mape_pct'] = float(candidates['cv_mape_pct'].iloc[0])
+    chosen.update(params or {})
+
+    model = make_model(kind, **chosen)
+    start = time.perf_counter()
+    model.fit(train[feature_cols], train[TARGET_COLUMN])
+    report['fit_seconds'] = time.perf_counter() - start
+    report['params'] = {name: value for name, value in model.get_params().items()
+                        if name in MODEL_KINDS[kind][1] or name in chosen}
+
+    for name, rows in (('train', train), ('test', test)):
+        predicted = model.predict(rows[feature_cols])
+        report[f"{name}_mape_pct"] = float(mean_absolute_percentage_error(rows[TARGET_COLUMN], predicted) * 100)
+        report[f"{name}_r2"] = float(r2_score(rows[TARGET_COLUMN], predicted))
+    report.update(prediction_latency(model, test[feature_cols]))
+    return model, report
+
+
+def train_quantile_models(segments: pd.DataFrame, kind: str, quantiles: Sequence[float],
+                          feature_cols: List[str] = FEATURE_COLUMNS, params: Optional[Dict] = None,
+                          test_size: float = 0.2, random_state: int = 42) -> Tuple[Dict[float, object], Dict]:
+    """
+    Train the speed quantile models of the time bands on the hikes train_model trains on.
+
+    Args:
+        segments: DataFrame from training_data.prepare_features
+        kind: Key of MODEL_KINDS
+        quantiles: Speed quantiles in (0, 1)
+        feature_cols: Feature columns to train on
+        params: Parameters of the main model (e.g. its report's 'params')
+        test_size: Fraction of the hikes held out
+        random_state: Seed of the split
+
+    Returns:
+        Tuple of ({quantile: model}, report dictionary with the quantiles,
+        band_fit_seconds and band_coverage_pct, the share of test segments
+        whose speed lies between the lowest and highest quantile models)
+    """
+    train, test = split_hikes(segments, test_size=test_size, random_state=random_state)
+    start = time.perf_counter()
+    quantile_models = fit_quantile_models(train, kind, quantiles, feature_cols, params)
+    quantiles = list(quantile_models)
+    report = {'quantiles': quantiles, 'band_fit_seconds': time.perf_counter() - start}
+    low, high = (quantile_models[q].predict(test[feature_cols]) for q in (quantiles[0], quantiles[-1]))
+    actual = test[TARGET_COLUMN].to_numpy()
+    report['band_coverage_pct'] = float(((actual >= low) & (actual <= high)).mean() * 100)
+    return quantile_models, report
+
+
+def save_model(model, feature_cols: List[str], path: Union[str, os.PathLike],
+               training_stats: Optional[Dict] = None,
+               quantile_models: Optional[Dict[float, object]] = None) -> Path:
+    """
+    Write a model as the pickle load_model reads, replacing path atomically.
+
+    Args:
+        model: Fitted speed model
+        feature_cols: Feature names in model input order
+        path: Output .pkl path
+        training_stats: Report to store alongside (e.g. from train_model)
+        quantile_models: {quantile: model} of the time bands (see
+                         fit_quantile_models)
+
+    Returns:
+        Path of the written model
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+    model_data = {'model': model, 'feature_cols': list(feature_cols), 'training_stats': training_stats or {}}
+    if quantile_models:
+        model_data['quantile_models'] = dict(quantile_models)
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(model_data, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Train the hiking speed model on recorded tracks")
+    parser.add_argument('inputs', nargs='+', help='GPX track files, directories or glob patterns')
+    parser.add_argument('-o', '--output', type=Path, default=None,
+                        help='Save the model with the lowest test MAPE here (.pkl)')
+    parser.add_argument('--kind', choices=list(MODEL_KINDS), nargs='+', default=['gbr'],
+                        help="Model kinds to train and compare (only 'gbr' can be exported as .npz)")
+    parser.add_argument('--search', action='store_true', help='Cross-validated hyperparameter search first')
+    parser.add_argument('--search-iter', type=int, default=None,
+                        help='Sample this many candidates instead of the whole grid')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel search processes (default: every core)')
+    parser.add_argument('--test-size', type=float, default=0.2, help='Fraction of the hikes held out')
+    parser.add_argument('--store', type=Path, default=Path('.gpx_store'), help='GPXStore directory')
+    parser.add_argument('--report', type=Path, default=None, help='Write the reports as JSON')
+    parser.add_argument('--quantiles', type=float, nargs='+', default=None,
+                        help='Also fit speed quantile models for the time bands of the saved model '
+                             f"(e.g. {' '.join(map(str, DEFAULT_QUANTILES))})")
+    args = parser.parse_args(argv)
+
+    files = find_gpx_files(args.inputs)
+    if not files:
+        raise SystemExit("No GPX files found")
+    segments = track_segments(files, store_dir=args.store)
+    if segments is None:
+        raise SystemExit("No hiking segments in the tracks")
+    print(f"{len(segments)} segments from {segments[HIKE_COLUMN].nunique()} hikes in {len(files)} files")
+
+    trained = []
+    print(f"{'kind':<5} {'search':>8} {'fit':>8} {'cv MAPE':>8} {'test MAPE':>9} {'test R2':>8} "
+          f"{'us/row':>7} {'1 row':>8}")
+    for kind in args.kind:
+        try:
+            model, report = train_model(segments, kind, search=args.search, search_iter=args.search_iter,
+                                        n_jobs=args.jobs, test_size=args.test_size)
+        except ValueError as e:
+            raise SystemExit(f"Cannot train {kind}: {e}")
+        trained.append((model, report))
+        search_s, cv_mape = '-', '-'
+        if args.search:
+            search_s, cv_mape = f"{report['search_seconds']:.1f}s", f"{report['cv_mape_pct']:.2f}%"
+        print(f"{kind:<5} {search_s:>8} {report['fit_seconds']:>7.2f}s {cv_mape:>8} "
+              f"{report['test_mape_pct']:>8.2f}% {report['test_r2']:>8.4f} {report['us_per_row']:>7.2f} "
+              f"{report['single_row_ms']:>6.2f}ms")
+
+    model, report = min(trained, key=lambda item: item[1]['test_mape_pct'])
+    quantile_models = None
+    if args.quantiles:
+        try:
+            quantile_models, band_report = train_quantile_models(segments, report['kind'], args.quantiles,
+                                                                 params=report['params'], test_size=args.test_size)
+        except ValueError as e:
+            raise SystemExit(f"Cannot train the quantile models: {e}")
+        report.update(band_report)
+        print(f"\n{report['kind']} speed quantiles {report['quantiles']}: fit {report['band_fit_seconds']:.2f}s, "
+              f"{report['band_coverage_pct']:.1f}% of test segments within the outer quantiles")
+
+    if args.report is not None:
+        args.report.write_text(json.dumps([report for _, report in trained], indent=1, default=str))
+    if args.output is not None:
+        save_model(model, FEATURE_COLUMNS, args.output, report, quantile_models)
+        print(f"\nSaved the {report['kind']} model ({report['test_mape_pct']:.2f}% test MAPE) to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
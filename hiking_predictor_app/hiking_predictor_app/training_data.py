@@ -0,0 +1,353 @@
+"""
+Training data for the hiking speed model.
+Vectorized versions of the notebook's track-ingest steps: long-break
+filtering, elevation smoothing, per-segment metrics and model features.
+
+Distances, smoothing, slopes and features come from the same functions the app
+uses for predictions, so a model trained on this data sees exactly the inputs
+it is served with. Every step works on a points DataFrame with the columns
+produced by the notebook's load_all_tracks (latitude, longitude, elevation,
+time, track_name, file_name).
+"""
+
+import os
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .geodesy import segment_distances
+from .gpx_reader import GPXPoints
+from .gpx_store import GPXStore
+from .model_utils import build_feature_matrix, calculate_slopes, smooth_elevation
+
+
+FEATURE_COLUMNS = ['slope', 'fatigue', 'uphill', 'downhill',
+                   'downhill_fatigue', 'uphill_fatigue',
+                   'slope_squared', 'fatigue_squared']
+
+METRIC_COLUMNS = ['track_name', 'file_name', 'time', 'date', 'distance_m', 'elevation_change_m',
+                  'slope_percent', 'time_delta_s', 'speed_kmh', 'speed_ms', 'cumulative_hours',
+                  'latitude', 'longitude', 'elevation']
+
+# Segment filters of calculate_hiking_metrics
+DAY_RESET_S = 3600          # a longer gap starts a new hiking day
+STATIONARY_S = 300          # a longer gap with less than STATIONARY_M of movement is a GPS artefact
+STATIONARY_M = 5
+MIN_SEGMENT_M = 1           # shorter segments are GPS noise
+MAX_SPEED_KMH = 15          # faster segments are not hiking
+
+
+def points_frame(points_by_file: Dict[Path, GPXPoints], name_column: str = 'track_name') -> pd.DataFrame:
+    """
+    Build the notebook's points DataFrame from GPXStore.ingest output.
+
+    Args:
+        points_by_file: Mapping of GPX path to its points
+        name_column: Column holding the track (or route) name, which falls
+                     back to the file name without extension
+
+    Returns:
+        DataFrame with latitude, longitude, elevation, time (UTC, NaT where
+        missing), name_column and file_name columns, files in input order
+    """
+    counts = [len(points) for points in points_by_file.values()]
+    columns = {
+        col: np.concatenate([getattr(points, col) for points in points_by_file.values()] or [np.zeros(0)])
+        for col in ('latitude', 'longitude', 'elevation', 'time')
+    }
+    return pd.DataFrame({
+        'latitude': columns['latitude'],
+        'longitude': columns['longitude'],
+        'elevation': columns['elevation'],
+        'time': pd.to_datetime(columns['time'], unit='s', utc=True),
+        name_column: np.repeat([points.name or Path(path).stem
+                                for path, points in points_by_file.items()], counts),
+        'file_name': np.repeat([Path(path).name for path in points_by_file], counts),
+    })
+
+
+def _track_next(df: pd.DataFrame, column: str) -> pd.Series:
+    """Value of column at the next point of the same track (NaN/NaT after the last one)."""
+    return df.groupby('track_name', sort=False)[column].shift(-1)
+
+
+def _group_tracks(df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Order points track by track (first-seen order), by time within a track.
+
+    Returns:
+        Tuple of (reordered frame with a fresh index, track start rows, track end rows)
+    """
+    codes = pd.factorize(df['track_name'])[0]
+    ordered = (df.assign(_track=codes)
+               .sort_values(['_track', 'time'], kind='stable')
+               .drop(columns='_track')
+               .reset_index(drop=True))
+    codes = np.sort(codes, kind='stable')
+    starts = np.flatnonzero(np.diff(codes, prepend=-1))
+    ends = np.append(starts[1:], len(codes))
+    return ordered, starts, ends
+
+
+def _run_cumsum(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Cumulative sum restarting at every index in starts (np.cumsum within each run)."""
+    out = np.empty(len(values))
+    for start, end in zip(starts, np.append(starts[1:], len(values))):
+        out[start:end] = np.cumsum(values[start:end])
+    return out
+
+
+def _track_distances(df: pd.DataFrame, starts: np.ndarray,
+                     distance_method: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Distances of a frame ordered by _group_tracks.
+
+    Returns:
+        Tuple of (distance to the next point of the same track, NaN after a
+        track's last point; cumulative distance from the start of the track,
+        as geodesy.cumulative_distances computes it)
+    """
+    steps = np.append(segment_distances(df['latitude'], df['longitude'], method=distance_method), np.nan)
+    # The step out of a track's last point leads into the next track
+    steps[starts[1:] - 1] = np.nan
+    increments = np.insert(steps[:-1], 0, 0.0)
+    increments[starts] = 0.0
+    return steps, _run_cumsum(increments, starts)
+
+
+def long_breaks(df: pd.DataFrame, break_threshold_minutes: float = 60) -> pd.DataFrame:
+    """
+    Find gaps between consecutive points of a track longer than the threshold.
+
+    Args:
+        df: DataFrame with GPS points (must have time and track_name columns)
+        break_threshold_minutes: Time gap to consider a "long break"
+
+    Returns:
+        DataFrame with one row per break: track, gap_minutes, time_before,
+        time_after, and the index of the point before the gap as index
+    """
+    df = df.sort_values('time')
+    time_after = _track_next(df, 'time')
+    gap = time_after - df['time']
+    is_break = (gap > timedelta(minutes=break_threshold_minutes)).to_numpy()
+
+    breaks = pd.DataFrame({
+        'track': df['track_name'],
+        'gap_minutes': gap.dt.total_seconds() / 60,
+        'time_before': df['time'],
+        'time_after': time_after,
+    })[is_break]
+    # Report track by track, in the order tracks first appear
+    track_order = pd.factorize(df['track_name'])[0][is_break]
+    return breaks.iloc[np.argsort(track_order, kind='stable')]
+
+
+def filter_long_breaks(df: Optional[pd.DataFrame], break_threshold_minutes: float = 60,
+                       verbose: bool = False) -> Optional[pd.DataFrame]:
+    """
+    Remove LONG breaks only (lunch, camping) while preserving short pauses.
+
+    The first point of every gap longer than the threshold is dropped, which
+    makes calculate_hiking_metrics restart the cumulative time after it.
+
+    Args:
+        df: DataFrame with GPS points (must have time and track_name columns)
+        break_threshold_minutes: Time gap to consider a "long break" (default: 60 min)
+        verbose: Print the removed breaks
+
+    Returns:
+        Time-sorted DataFrame with long breaks removed and a fresh index
+    """
+    if df is None or len(df) < 2:
+        return df
+
+    df = df.sort_values('time').reset_index(drop=True)
+    breaks = long_breaks(df, break_threshold_minutes)
+    filtered_df = df.drop(index=breaks.index).reset_index(drop=True)
+
+    if verbose:
+        removed_count = len(df) - len(filtered_df)
+        removed_pct = (removed_count / len(df)) * 100
+        print(f"Long break filter: Removed {removed_count} points ({removed_pct:.1f}%) "
+              f"marking breaks >{break_threshold_minutes}min")
+        print(f"  Found {len(breaks)} breaks longer than {break_threshold_minutes} minutes:")
+        for brk in breaks.itertuples():
+            print(f"    - {brk.track}: {brk.gap_minutes:.1f} min gap at "
+                  f"{brk.time_before.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    return filtered_df
+
+
+def smooth_track_elevations(df: Optional[pd.DataFrame], window_distance_m: float = 100,
+                            distance_method: str = 'vincenty',
+                            verbose: bool = False) -> Optional[pd.DataFrame]:
+    """
+    Smooth elevations track by track with the app's distance-based Gaussian smoothing.
+
+    Args:
+        df: DataFrame with GPS points (must have latitude, longitude, elevation)
+        window_distance_m: Distance window for smoothing (default: 100m)
+        distance_method: Distance kernel, see geodesy.segment_distances
+        verbose: Print the average reduction of cumulative elevation change
+
+    Returns:
+        Copy of df with an 'elevation_smoothed' column
+    """
+    if df is None or len(df) < 2:
+        return df
+
+    ordered, starts, ends = _group_tracks(df.rename_axis('_row').reset_index())
+    _, distances = _track_distances(ordered, starts, distance_method)
+    elevations = ordered['elevation'].to_numpy(dtype=float)
+
+    smoothed = np.empty(len(ordered))
+    for start, end in zip(starts, ends):
+        smoothed[start:end] = smooth_elevation(elevations[start:end], distances[start:end],
+                                               window_m=window_distance_m)
+
+    df = df.copy()
+    df['elevation_smoothed'] = pd.Series(smoothed, index=ordered['_row'].to_numpy())
+
+    if verbose:
+        tracks = df['track_name']
+        elev_changes = df['elevation'].groupby(tracks).diff().abs().groupby(tracks).sum()
+        smooth_changes = df['elevation_smoothed'].groupby(tracks).diff().abs().groupby(tracks).sum()
+        reduction_pct = ((elev_changes - smooth_changes) / elev_changes * 100).mean()
+        print(f"Elevation smoothing ({window_distance_m}m window): Reduced noise by {reduction_pct:.1f}%")
+
+    return df
+
+
+def calculate_hiking_metrics(df: Optional[pd.DataFrame], slope_window_distance_m: float = 100,
+                             distance_method: str = 'vincenty') -> Optional[pd.DataFrame]:
+    """
+    Per-segment hiking metrics, short pauses included.
+
+    Each segment joins two consecutive points of a track. Gaps over an hour
+    start a new hiking day (cumulative time restarts at 0); stationary GPS
+    drift, sub-metre hops, non-positive time steps and speeds over 15 km/h
+    are dropped. Slopes use the app's calculate_slopes window, falling back
+    to the point-to-point slope on tracks shorter than half the window.
+
+    Args:
+        df: DataFrame with GPS points and an 'elevation_smoothed' column
+        slope_window_distance_m: Distance over which to calculate slope (default: 100m)
+        distance_method: Distance kernel, see geodesy.segment_distances
+
+    Returns:
+        DataFrame with one row per kept segment (METRIC_COLUMNS)
+    """
+    if df is None or len(df) < 2:
+        return None
+
+    df, starts, ends = _group_tracks(df)
+    distance_m, cumulative_m = _track_distances(df, starts, distance_method)
+    time_delta = (_track_next(df, 'time') - df['time']).dt.total_seconds().to_numpy()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed_ms = distance_m / time_delta
+    speed_kmh = speed_ms * 3.6
+
+    day_reset = time_delta > DAY_RESET_S
+    keep = ~(np.isnan(time_delta) | day_reset
+             | ((time_delta > STATIONARY_S) & (distance_m < STATIONARY_M))
+             | (distance_m < MIN_SEGMENT_M)
+             | ~(time_delta > 0)
+             | (speed_kmh > MAX_SPEED_KMH))
+
+    # Cumulative time restarts with every track and day reset and only counts kept segments
+    track_start = np.zeros(len(df), dtype=bool)
+    track_start[starts] = True
+    day = np.cumsum(track_start | day_reset)[keep]
+    cumulative_hours = _run_cumsum(time_delta[keep] / 3600, np.flatnonzero(np.diff(day, prepend=-1)))
+
+    smoothed = df['elevation_smoothed'].to_numpy(dtype=float)
+    slopes = np.empty(len(df))
+    for start, end in zip(starts, ends):
+        slopes[start:end] = calculate_slopes(smoothed[start:end], cumulative_m[start:end],
+                                             window_m=slope_window_distance_m)
+
+    # Point-to-point elevation change, zero when either elevation is missing or 0
+    next_smoothed = np.append(smoothed[1:], np.nan)
+    has_elevation = (smoothed != 0) & (next_smoothed != 0)
+    elev_change_m = np.where(has_elevation, next_smoothed - smoothed, 0.0)
+
+    # No point half a window behind or ahead: the window spans a single point
+    half_window = slope_window_distance_m / 2
+    track_length = np.repeat(cumulative_m[ends - 1], ends - starts)
+    single_point = ~(cumulative_m >= half_window) & ~(track_length - cumulative_m >= half_window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = np.where(single_point, elev_change_m / distance_m * 100, slopes)
+
+    segments = df[keep].reset_index(drop=True)
+    return pd.DataFrame({
+        'track_name': segments['track_name'],
+        'file_name': segments['file_name'],
+        'time': segments['time'],
+        'date': segments['time'].dt.date,
+        'distance_m': distance_m[keep],
+        'elevation_change_m': elev_change_m[keep],
+        'slope_percent': slopes[keep],
+        'time_delta_s': time_delta[keep],
+        'speed_kmh': speed_kmh[keep],
+        'speed_ms': speed_ms[keep],
+        'cumulative_hours': cumulative_hours,
+        'latitude': segments['latitude'],
+        'longitude': segments['longitude'],
+        'elevation': smoothed[keep],
+    })
+
+
+def prepare_features(metrics: pd.DataFrame, feature_cols: List[str] = FEATURE_COLUMNS) -> pd.DataFrame:
+    """
+    Add the model features to per-segment metrics.
+
+    Uses model_utils.build_feature_matrix, the function the app predicts with.
+
+    Args:
+        metrics: DataFrame from calculate_hiking_metrics
+        feature_cols: Feature columns to add (FEATURE_COLUMNS by default)
+
+    Returns:
+        Copy of metrics with one column per feature
+    """
+    features = build_feature_matrix(metrics['slope_percent'].to_numpy(dtype=float),
+                                    metrics['cumulative_hours'].to_numpy(dtype=float), feature_cols)
+    features_df = metrics.copy()
+    features_df[list(feature_cols)] = features
+    return features_df
+
+
+def track_segments(paths: Iterable[Union[str, os.PathLike]], feature_cols: List[str] = FEATURE_COLUMNS,
+                   store_dir: Union[str, os.PathLike] = '.gpx_store', break_threshold_minutes: float = 60,
+                   window_distance_m: float = 100) -> Optional[pd.DataFrame]:
+    """
+    Training segments of recorded tracks, built as the notebook builds them.
+
+    Parses the files through a GPXStore, then filters long breaks, smooths
+    elevations and computes the hiking metrics and features.
+
+    Args:
+        paths: GPX track files
+        feature_cols: Feature columns to add (FEATURE_COLUMNS by default)
+        store_dir: GPXStore directory for the parsed points
+        break_threshold_minutes: Long break threshold of filter_long_breaks
+        window_distance_m: Elevation smoothing and slope window
+
+    Returns:
+        DataFrame from prepare_features, or None without usable segments
+    """
+    tracks = GPXStore(store_dir).ingest(paths)
+    if not tracks:
+        return None
+    points = points_frame(tracks).sort_values('time').reset_index(drop=True)
+    points = filter_long_breaks(points, break_threshold_minutes=break_threshold_minutes)
+    points = smooth_track_elevations(points, window_distance_m=window_distance_m)
+    metrics = calculate_hiking_metrics(points, slope_window_distance_m=window_distance_m)
+    if metrics is None or len(metrics) == 0:
+        return None
+    return prepare_features(metrics, feature_cols)
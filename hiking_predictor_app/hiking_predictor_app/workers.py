@@ -0,0 +1,374 @@
+"""
+Off-event-loop execution of the parse and predict pipeline.
+Runs jobs in a process pool (default) or thread pool with a bounded number
+of pending jobs, per-job timeouts and cancellation.
+"""
+
+import asyncio
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .gpx_reader import read_gpx
+from .model_artifact import preferred_model_path
+from .model_utils import load_model, predict_hike_time
+from .prediction_cache import model_fingerprint
+from .speed_surface import surface_for
+from .time_bands import load_time_bands
+
+
+class ExecutorBusyError(RuntimeError):
+    """Raised when the number of pending jobs has reached max_pending."""
+
+
+class JobTimeoutError(TimeoutError):
+    """Raised when a job does not finish within its timeout."""
+
+
+class JobCancelledError(Exception):
+    """Raised to waiters of a job cancelled with PredictionExecutor.cancel."""
+
+
+EXECUTOR_KINDS = ('process', 'thread')
+
+
+# Model loaded once per worker process (or once for all threads)
+_worker_model: Optional[tuple] = None
+_worker_model_lock = threading.Lock()
+
+# (fingerprint, TimeBands or None) of the worker's model, loaded on first use
+_worker_bands: Optional[tuple] = None
+
+# Whether the worker samples the speed surface whenever it (re)loads the model
+_worker_surface = False
+
+
+def init_worker(model_path: str, inference: str = 'exact'):
+    """
+    Pool initializer: load the model before the first job arrives.
+
+    With inference='surface' the model's speed surface is sampled as well,
+    now and on every reload, so the first job does not pay for the grid.
+
+    Args:
+        model_path: Path to the pickled model
+        inference: Inference mode the worker's jobs use
+    """
+    global _worker_surface
+    if inference == 'surface':
+        _worker_surface = True
+    model, feature_cols = get_worker_model(model_path)
+    if model is not None and _worker_surface:
+        surface_for(model, feature_cols)
+
+
+def get_worker_model(model_path: str) -> tuple:
+    """
+    Return this process's copy of the model, reloading only if the model file changed.
+
+    The .npz artifact next to the pickle is preferred when it is up to date;
+    its arrays are memory-mapped, so all workers share one read-only copy.
+
+    Args:
+        model_path: Path to the pickled model
+
+    Returns:
+        Tuple of (model, feature_cols), or (None, None) if it cannot be loaded
+    """
+    global _worker_model
+    path = preferred_model_path(model_path)
+    fingerprint = model_fingerprint(path)
+    with _worker_model_lock:
+        if _worker_model is None or _worker_model[0] != fingerprint:
+            model, feature_cols = load_model(str(path))
+            if model is not None and _worker_surface:
+                # Sample the surface now rather than on the first upload
+                surface_for(model, feature_cols)
+            _worker_model = (fingerprint, model, feature_cols)
+        return _worker_model[1], _worker_model[2]
+
+
+def _get_worker_bands(model_path: str):
+    """Return the model's time_bands.TimeBands (None without quantile models), reloading as the model does."""
+    global _worker_bands
+    path = preferred_model_path(model_path)
+    fingerprint = model_fingerprint(path)
+    with _worker_model_lock:
+        if _worker_bands is None or _worker_bands[0] != fingerprint:
+            _worker_bands = (fingerprint, load_time_bands(path))
+        return _worker_bands[1]
+
+
+def pipeline_params(model_path: str, params: Dict) -> Dict:
+    """
+    Turn request parameters into keyword arguments for predict_hike_time.
+
+    Args:
+        model_path: Path to the pickled model
+        params: Request parameters; a true 'time_bands' stands for the
+                model's quantile models
+
+    Returns:
+        params with the 'time_bands' flag replaced by this process's
+        time_bands.TimeBands (None without quantile models)
+    """
+    if 'time_bands' not in params:
+        return params
+    return {**params, 'time_bands': _get_worker_bands(model_path) if params['time_bands'] else None}
+
+
+def run_pipeline(model_path: str, gpx_bytes: bytes, params: Dict) -> Dict:
+    """
+    Parse a GPX upload and predict its hiking time (runs inside a worker).
+
+    Args:
+        model_path: Path to the model file
+        gpx_bytes: Raw GPX file contents
+        params: Keyword arguments for predict_hike_time; a true 'time_bands'
+                stands for the model's quantile models
+
+    Returns:
+        Dictionary with prediction results
+    """
+    model, feature_cols = get_worker_model(model_path)
+    if model is None or feature_cols is None:
+        return {'success': False, 'error': 'Prediction model not loaded'}
+    start = time.perf_counter()
+    gpx = read_gpx(gpx_bytes)
+    parse_s = time.perf_counter() - start
+    results = predict_hike_time(gpx, model, feature_cols, **pipeline_params(model_path, params))
+    if 'diagnostics' in results:
+        results['diagnostics']['stage_seconds'] = {'parse': parse_s, **results['diagnostics']['stage_seconds']}
+        results['diagnostics']['total_seconds'] += parse_s
+    return results
+
+
+class _Job:
+    """A submitted job: the pool future and the outcome waiters await."""
+
+    def __init__(self, future: concurrent.futures.Future):
+        self.future = future
+        # Resolved from the pool future, or cancelled directly so waiters are
+        # released even if the worker cannot be interrupted
+        self.outcome: concurrent.futures.Future = concurrent.futures.Future()
+        self.cancelled = False
+
+
+class PredictionExecutor:
+    """
+    Runs run_pipeline jobs away from the event loop.
+
+    Jobs are submitted with submit(), awaited with result() and can be
+    cancelled with cancel(). A job that is already running in a worker cannot
+    be interrupted; cancelling or timing it out releases the waiter at once
+    and the job's result is discarded when it finishes.
+    """
+
+    def __init__(self, model_path: str, kind: str = 'process', max_workers: Optional[int] = None,
+                 max_pending: int = 16, timeout_s: Optional[float] = 120.0, inference: str = 'exact'):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind {kind!r}, expected one of {EXECUTOR_KINDS}")
+        self.model_path = str(model_path)
+        self.kind = kind
+        # Workers started for 'surface' sample the speed surface when they load the model
+        self.inference = inference
+        self.max_workers = max_workers
+        # Passed to the pool explicitly so warm_up starts exactly this many workers
+        self.worker_count = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout_s = timeout_s
+        self._pool: Optional[concurrent.futures.Executor] = None
+        self._jobs: Dict[str, _Job] = {}
+        self._active = 0
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def _get_pool(self) -> concurrent.futures.Executor:
+        if self._pool is None:
+            if self.kind == 'process':
+                # spawn: forking a server process with live threads is unsafe
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.worker_count,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=init_worker,
+                    initargs=(self.model_path, self.inference),
+                )
+            else:
+                self._pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.worker_count,
+                    thread_name_prefix='prediction',
+                    initializer=init_worker,
+                    initargs=(self.model_path, self.inference),
+                )
+        return self._pool
+
+    def warm_up(self) -> List[concurrent.futures.Future]:
+        """
+        Start the workers and load the model (and, for 'surface' inference,
+        its speed surface) in each of them now, so the first upload does not
+        pay for process start-up and model loading.
+
+        Returns:
+            Futures that complete once each worker has loaded the model
+        """
+        pool = self._get_pool()
+        return [pool.submit(init_worker, self.model_path, self.inference) for _ in range(self.worker_count)]
+
+    def submit(self, gpx_bytes: bytes, params: Dict) -> str:
+        """
+        Queue a prediction job.
+
+        Args:
+            gpx_bytes: Raw GPX file contents
+            params: Keyword arguments for predict_hike_time
+
+        Returns:
+            Job id to pass to result() or cancel()
+
+        Raises:
+            ExecutorBusyError: If max_pending jobs are already queued or running
+        """
+        with self._lock:
+            if self._active >= self.max_pending:
+                self.rejected += 1
+                raise ExecutorBusyError("Too many routes are being analyzed, please retry shortly")
+            job_id = f"job-{next(self._ids)}"
+            job = _Job(self._get_pool().submit(run_pipeline, self.model_path, gpx_bytes, params))
+            self._jobs[job_id] = job
+            self._active += 1
+        job.future.add_done_callback(lambda f: self._finish(job))
+        return job_id
+
+    def _finish(self, job: _Job):
+        """Pool callback: release the job's slot and resolve its outcome."""
+        future = job.future
+        with self._lock:
+            self._active -= 1
+            if job.cancelled:
+                pass
+            elif future.cancelled():
+                self.cancelled += 1
+            elif future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+        if job.outcome.done():
+            return
+        if future.cancelled():
+            job.outcome.cancel()
+        elif future.exception() is not None:
+            job.outcome.set_exception(future.exception())
+        else:
+            job.outcome.set_result(future.result())
+
+    async def result(self, job_id: str, timeout_s: Optional[float] = None) -> Dict:
+        """
+        Wait for a job without blocking the event loop.
+
+        Args:
+            job_id: Id returned by submit()
+            timeout_s: Seconds to wait (defaults to the executor timeout)
+
+        Returns:
+            Dictionary with prediction results
+
+        Raises:
+            JobTimeoutError: If the job did not finish in time (it is cancelled)
+            JobCancelledError: If the job was cancelled with cancel()
+            KeyError: If the job id is unknown or its result was already collected
+        """
+        with self._lock:
+            job = self._jobs[job_id]
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(job.outcome), timeout_s)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            self._discard(job_id)
+            raise JobTimeoutError(f"Prediction did not finish within {timeout_s:g} s") from None
+        except asyncio.CancelledError:
+            if job.cancelled:
+                raise JobCancelledError(job_id) from None
+            # The waiting task itself was cancelled (e.g. client disconnected)
+            self._discard(job_id)
+            raise
+        finally:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+
+    async def run(self, gpx_bytes: bytes, params: Dict, timeout_s: Optional[float] = None) -> Dict:
+        """Submit a job and wait for its result."""
+        return await self.result(self.submit(gpx_bytes, params), timeout_s)
+
+    def _discard(self, job_id: str) -> Optional[_Job]:
+        """Stop a job if it has not started yet and release its waiters."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.cancelled or job.future.done():
+                return None
+            job.cancelled = True
+        job.future.cancel()
+        job.outcome.cancel()
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job; result() waiters get JobCancelledError.
+
+        Returns:
+            True if the job was still queued or running
+        """
+        if self._discard(job_id) is None:
+            return False
+        with self._lock:
+            self.cancelled += 1
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """Job counters and the number of queued or running jobs."""
+        with self._lock:
+            return {
+                'active': self._active,
+                'completed': self.completed,
+                'failed': self.failed,
+                'cancelled': self.cancelled,
+                'timeouts': self.timeouts,
+                'rejected': self.rejected,
+            }
+
+    def shutdown(self, wait: bool = False):
+        """Stop the worker pool, cancelling queued jobs."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+
+def executor_from_env(model_path: str, inference: str = 'exact') -> PredictionExecutor:
+    """
+    Build the app's executor from environment variables.
+
+    HIKING_EXECUTOR ('process' or 'thread'), HIKING_WORKERS (pool size,
+    default: CPU count), HIKING_MAX_PENDING (queued plus running jobs before
+    uploads are refused) and HIKING_JOB_TIMEOUT_S (seconds per job).
+    inference is the mode of the app's jobs, passed on to the workers.
+    """
+    workers = os.environ.get('HIKING_WORKERS')
+    return PredictionExecutor(
+        model_path,
+        kind=os.environ.get('HIKING_EXECUTOR', 'process'),
+        max_workers=int(workers) if workers else None,
+        max_pending=int(os.environ.get('HIKING_MAX_PENDING', 16)),
+        timeout_s=float(os.environ.get('HIKING_JOB_TIMEOUT_S', 120)),
+        inference=inference,
+    )
@@ -0,0 +1,70 @@
+"""
+GPXStore: stored points equal a fresh parse, and only new or changed files are parsed again.
+"""
+
+import shutil
+
+import numpy as np
+import pytest
+
+from hiking_predictor_app.gpx_reader import read_gpx
+from hiking_predictor_app.gpx_store import GPXStore
+from hiking_predictor_app.training_data import points_frame
+from benchmarks.bench_gpx_store import gpxpy_frame
+from benchmarks.samples import sample_gpx_files
+
+
+@pytest.fixture
+def archive(tmp_path):
+    directory = tmp_path / 'archive'
+    directory.mkdir()
+    for path in sample_gpx_files(kinds=('tracks',)):
+        shutil.copy(path, directory / path.name)
+    return directory
+
+
+def test_ingest_matches_fresh_parse(archive, tmp_path):
+    paths = sorted(archive.glob('*.gpx'))
+    points = GPXStore(tmp_path / 'store', max_workers=2).ingest(paths)
+
+    assert list(points) == [path.resolve() for path in paths]
+    for path, stored in points.items():
+        parsed = read_gpx(path)
+        assert (stored.kind, stored.name) == (parsed.kind, parsed.name)
+        for column in ('latitude', 'longitude', 'elevation', 'time'):
+            assert np.array_equal(getattr(stored, column), getattr(parsed, column), equal_nan=True), column
+
+    frame = points_frame(points).sort_values('time').reset_index(drop=True)
+    expected = gpxpy_frame(paths)
+    assert frame[['latitude', 'longitude', 'elevation']].equals(expected[['latitude', 'longitude', 'elevation']])
+
+
+def test_only_new_or_changed_files_are_parsed(archive, tmp_path):
+    store_dir = tmp_path / 'store'
+    paths = sorted(archive.glob('*.gpx'))
+    GPXStore(store_dir).ingest(paths)
+
+    store = GPXStore(store_dir)
+    store.ingest(paths)
+    assert store.stats() == {'parsed': 0, 'reused': len(paths), 'errors': 0}
+
+    with open(paths[0], 'ab') as f:
+        f.write(b"<!-- edited -->\n")
+    new_path = archive / 'renamed.gpx'
+    shutil.copy(paths[1], new_path)
+    store = GPXStore(store_dir)
+    points = store.ingest(paths + [new_path])
+    # The edited file is parsed again; the copy hashes to arrays already stored
+    assert store.stats() == {'parsed': 1, 'reused': len(paths), 'errors': 0}
+    assert np.array_equal(points[paths[0].resolve()].latitude, read_gpx(paths[0]).latitude)
+
+
+def test_unreadable_files_are_reported(archive, tmp_path):
+    broken = archive / 'broken.gpx'
+    broken.write_text('<gpx><trk><trkseg><trkpt lat="1"')
+    missing = archive / 'missing.gpx'
+    store = GPXStore(tmp_path / 'store', max_workers=1)
+    points = store.ingest([broken, missing, *sorted(archive.glob('rando-*.gpx'))])
+
+    assert set(store.errors) == {broken.resolve(), missing.resolve()}
+    assert len(points) == len(sample_gpx_files(kinds=('tracks',)))
@@ -0,0 +1,71 @@
+"""
+The vectorized model_utils functions against the original implementations.
+"""
+
+import warnings
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from hiking_predictor_app.geodesy import cumulative_distances
+from hiking_predictor_app.gpx_reader import read_gpx
+from hiking_predictor_app.model_utils import (build_feature_matrix, calculate_slope_window, calculate_slopes,
+                                             evaluate_tree_ensemble, load_model, native_ensemble,
+                                             smooth_elevation)
+from benchmarks.bench_slopes import profiles
+from benchmarks.bench_smoothing import TOLERANCE_M, synthetic_profile
+from benchmarks.bench_tree_eval import TOLERANCE
+from benchmarks.reference import smooth_elevation_reference
+from benchmarks.samples import MODEL_PATH, sample_gpx_files
+
+
+def sample_profiles():
+    """Raw elevations and cumulative distances of the bundled tracks and routes."""
+    for path in sample_gpx_files():
+        points = read_gpx(path)
+        yield path.name, np.nan_to_num(points.elevation), cumulative_distances(points.latitude, points.longitude)
+
+
+@pytest.mark.parametrize('window_m', [50.0, 100.0])
+def test_smooth_elevation_matches_reference(window_m):
+    profiles = [('synthetic', *synthetic_profile(5000))] + list(sample_profiles())
+    for name, elevations, distances in profiles:
+        # The reference is O(n) per row, so check an evenly spread sample of rows
+        rows = np.linspace(0, len(elevations) - 1, 300).astype(int)
+        expected = smooth_elevation_reference(elevations, distances, window_m=window_m, rows=rows)
+        smoothed = smooth_elevation(elevations, distances, window_m=window_m)
+        assert np.abs(smoothed[rows] - expected).max() <= TOLERANCE_M, name
+
+
+@pytest.mark.parametrize('window_m', [50.0, 100.0])
+def test_calculate_slopes_matches_per_index_scan(window_m):
+    # Bundled samples plus a synthetic profile with repeated points (zero-length spans)
+    for name, elevations, distances in profiles([5000]):
+        smoothed = smooth_elevation(elevations, distances, window_m=window_m)
+        expected = np.array([calculate_slope_window(smoothed, distances, i, window_m=window_m)
+                             for i in range(len(distances))], dtype=float)
+        assert np.array_equal(calculate_slopes(smoothed, distances, window_m=window_m), expected), name
+
+        indices = np.flatnonzero(np.diff(distances) >= 1)
+        assert np.array_equal(calculate_slopes(smoothed, distances, window_m=window_m, indices=indices),
+                              expected[indices]), name
+
+
+@pytest.mark.parametrize('rows', [1, 16, 4096])
+def test_tree_ensemble_matches_sklearn(rows):
+    model, feature_cols = load_model(str(MODEL_PATH))
+    ensemble = native_ensemble(model)
+    assert ensemble is not None
+
+    rng = np.random.default_rng(rows)
+    X = build_feature_matrix(rng.uniform(-40, 40, rows), rng.uniform(0, 10, rows), feature_cols)
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        expected = model.predict(X)
+    assert np.abs(evaluate_tree_ensemble(ensemble, X) - expected).max() <= TOLERANCE
+
+
+def test_unsupported_models_are_not_flattened():
+    model = LinearRegression().fit(np.eye(3), np.arange(3.0))
+    assert native_ensemble(model) is None
@@ -0,0 +1,57 @@
+"""
+training_data against the notebook's track-ingest functions on the bundled tracks.
+
+Each stage gets the same input on both sides, as in benchmarks.bench_training_data:
+rows, text and time columns must match exactly, float columns up to the distance
+kernel (geopy's geodesic vs Vincenty) and the features bit for bit.
+"""
+
+import pytest
+
+from hiking_predictor_app.training_data import (FEATURE_COLUMNS, calculate_hiking_metrics, filter_long_breaks,
+                                                prepare_features, smooth_track_elevations)
+from benchmarks.bench_training_data import compare, load_tracks
+from benchmarks.reference import (calculate_hiking_metrics_reference, filter_long_breaks_reference,
+                                  prepare_features_reference, smooth_track_elevations_reference)
+
+
+@pytest.fixture(scope='module')
+def points():
+    return load_tracks(1)
+
+
+@pytest.fixture(scope='module')
+def filtered(points):
+    return filter_long_breaks(points)
+
+
+@pytest.fixture(scope='module')
+def smoothed(filtered):
+    return smooth_track_elevations(filtered)
+
+
+@pytest.fixture(scope='module')
+def metrics(smoothed):
+    return calculate_hiking_metrics(smoothed)
+
+
+def test_filter_long_breaks(points, filtered):
+    expected = filter_long_breaks_reference(points)
+    assert 0 < len(filtered) < len(points)
+    assert compare(expected, filtered, points.columns)[0]
+
+
+def test_smooth_track_elevations(filtered, smoothed):
+    expected = smooth_track_elevations_reference(filtered)
+    assert compare(expected, smoothed, ['elevation_smoothed'])[0]
+
+
+def test_calculate_hiking_metrics(smoothed, metrics):
+    expected = calculate_hiking_metrics_reference(smoothed)
+    assert len(metrics) > 0
+    assert compare(expected, metrics, expected.columns)[0]
+
+
+def test_prepare_features(metrics):
+    expected = prepare_features_reference(metrics)
+    assert prepare_features(metrics)[FEATURE_COLUMNS].equals(expected[FEATURE_COLUMNS])